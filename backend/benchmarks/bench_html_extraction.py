@@ -0,0 +1,87 @@
+# bench_html_extraction.py
+# Per-page CPU time of the web page extractors, on a generated API reference page.
+# Run from backend/: python benchmarks/bench_html_extraction.py [--functions 400] [--runs 20]
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from src.loader.html_extraction import (
+    extract_page,
+    markdownify_extractor,
+    soup_metadata_extractor,
+)
+
+URL = "https://example.com/api/reference/"
+
+
+def api_reference_page(functions: int) -> str:
+    """An API reference page in the shape of generated docs: a large sidebar, then one section per function."""
+    sidebar = "".join(
+        f'<li><a href="/api/reference/#func_{i}">func_{i}</a></li>'
+        for i in range(functions)
+    )
+    sections = "".join(f"""<section id="func_{i}">
+          <h2>func_{i}<a class="headerlink" href="#func_{i}">#</a></h2>
+          <pre><code class="language-python">def func_{i}(query: str, top_k: int = 5, filters: dict = None) -&gt; list:</code></pre>
+          <p>Returns the <strong>top_k</strong> nodes matching <code>query</code>, see <a href="/guide/{i}">the guide</a>.</p>
+          <table>
+            <tr><th>Parameter</th><th>Type</th><th>Description</th></tr>
+            <tr><td>query</td><td>str</td><td>The query string.</td></tr>
+            <tr><td>top_k</td><td>int</td><td>Number of nodes returned.</td></tr>
+            <tr><td>filters</td><td>dict</td><td>Metadata filters applied first.</td></tr>
+          </table>
+          <ul><li>Raises <code>ValueError</code> if top_k is negative.</li><li>Thread safe.</li></ul>
+        </section>""" for i in range(functions))
+    return f"""<!DOCTYPE html><html lang="en"><head><title>API Reference</title>
+      <meta name="description" content="Generated API reference">
+      <script>{"var x = 1;" * 2000}</script><style>{"p { margin: 0 }" * 500}</style></head>
+      <body><header><a href="/">Home</a></header><nav><ul>{sidebar}</ul></nav>
+      <main><h1>API Reference</h1>{sections}</main><footer>Copyright</footer></body></html>"""
+
+
+def legacy_extractor(html: str):
+    return markdownify_extractor(html), soup_metadata_extractor(html, URL)
+
+
+def single_parse_extractor(html: str):
+    return extract_page(html, URL)
+
+
+def measure(extractor, html: str, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.process_time()
+        extractor(html)
+        timings.append((time.process_time() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--functions", type=int, default=400)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    html = api_reference_page(args.functions)
+    print(f"Page size: {len(html) / 1024:.0f} KiB, {args.runs} runs")
+    results = {}
+    for name, extractor in (
+        ("regex + markdownify + BeautifulSoup", legacy_extractor),
+        ("single lxml parse", single_parse_extractor),
+    ):
+        timings = measure(extractor, html, args.runs)
+        results[name] = statistics.median(timings)
+        print(
+            f"{name:<38} median {results[name]:8.1f} ms  min {min(timings):8.1f} ms  max {max(timings):8.1f} ms"
+        )
+    legacy, single = results.values()
+    print(f"Speedup: {legacy / single:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
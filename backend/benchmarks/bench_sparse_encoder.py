@@ -0,0 +1,93 @@
+# bench_sparse_encoder.py
+# Ingestion overhead of the BM25 sparse encoder, on generated documentation chunks, next to the tiktoken tokenization
+# the embedding model already runs on every node.
+# Run from backend/: python benchmarks/bench_sparse_encoder.py [--nodes 2000] [--batch-size 100] [--runs 5]
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from functools import partial
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from llama_index.utils import get_tokenizer
+
+from src.services.sparse_encoder import BM25SparseEncoder, TermStatistics
+
+WORDS = """the request returns a list of nodes matching query filters metadata collection vector index embedding
+batch retry timeout token limit deployment endpoint claim denial code payer billing invoice patient provider
+configure install upgrade kubernetes cluster pod service ingress helm chart secret volume autoscaling""".split()
+
+
+def chunks(count: int, seed: int = 0) -> list:
+    """Markdown-ish chunks of 200 to 400 words, with identifiers and codes mixed in."""
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(200, 400))]
+        words[rng.randrange(len(words))] = f"E{rng.randint(1000, 9999)}"
+        words[rng.randrange(len(words))] = f"config_{i}.yaml"
+        texts.append(f"file_name: doc_{i}.pdf\n\n## Section {i}\n\n" + " ".join(words))
+    return texts
+
+
+def measure(function, texts: list, batch_size: int) -> float:
+    # Wall time, the SQLite statistics spend part of theirs writing to disk
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        function(texts[i : i + batch_size])
+    return (time.perf_counter() - start) * 1000
+
+
+def tiktoken_tokenization(tmp: str, run: int):
+    tokenizer = get_tokenizer()
+    return lambda batch: [tokenizer(text) for text in batch]
+
+
+def sparse_encoder_in_memory(tmp: str, run: int):
+    return partial(BM25SparseEncoder().encode_documents, "bench")
+
+
+def sparse_encoder_sqlite(tmp: str, run: int):
+    statistics_db = TermStatistics(os.path.join(tmp, f"terms_{run}.db"))
+    return partial(BM25SparseEncoder(statistics_db).encode_documents, "bench")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = chunks(args.nodes)
+    tokenizer = get_tokenizer()
+    print(
+        f"{args.nodes} nodes, {statistics.mean(len(tokenizer(t)) for t in texts):.0f} tokens each on average, "
+        f"batches of {args.batch_size}, {args.runs} runs"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, make_function in (
+            ("tiktoken (already paid by embedding)", tiktoken_tokenization),
+            ("BM25 sparse encoder, in-memory stats", sparse_encoder_in_memory),
+            ("BM25 sparse encoder, SQLite stats", sparse_encoder_sqlite),
+        ):
+            # A fresh encoder per run, so every run starts from empty statistics
+            timings = [
+                measure(make_function(tmp, run), texts, args.batch_size)
+                for run in range(args.runs)
+            ]
+            median = statistics.median(timings)
+            print(
+                f"{name:<38} median {median:8.1f} ms  {median / args.nodes:6.3f} ms/node  "
+                f"{args.nodes / median * 1000:8.0f} nodes/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
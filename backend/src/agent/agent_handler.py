@@ -166,8 +166,11 @@ class AgentHandler:
         # Store the tools list in the agent handler instance to be returned later
         self.agent_tools = tools_enabled
 
+        # Agents can pick the reranker used by their document searches, see DocumentSearch.reranker_type()
+        reranker = self.AGENT_CONFIGS.get(chat_agent, {}).get("reranker")
+
         return tool_setup_instance.setup_tools(
-            tools_enabled, self.arize_phoenix_instance
+            tools_enabled, self.arize_phoenix_instance, reranker=reranker
         )
 
     def _setup_prompt_template(self, chat_agent: str) -> PromptTemplate:
@@ -5,7 +5,11 @@ from src.agent.agent_handler import AgentHandler, get_agent_handler
 from src.scraper.scraper import run_web_scraper
 from src.loader.document import DocumentLoader
 from src.loader.web_document import WebDocumentLoader
-from src.tools.doc_search import DocumentSearch
+from src.loader.ingestion_jobs import IngestionJob, get_ingestion_job_manager
+from src.loader.enrichment import enrich_collection
+from src.loader.metadata_extraction import ExtractionProfile
+from src.services.embedding_cache import get_embedding_cache_stats
+from src.tools.doc_search import get_document_search
 from src.history.chat_history_handler import ChatHistoryHandler
 from src.api.models import (
     ChatInput,
@@ -13,6 +17,11 @@ from src.api.models import (
     DocumentLoaderRequest,
     DocumentLoaderResponse,
     DocumentSearchRequest,
+    EmbeddingCacheStatsResponse,
+    EnrichmentRequest,
+    EnrichmentResponse,
+    IngestionJobResponse,
+    IngestionProgressResponse,
     ScrapeRequest,
     WebDocumentLoaderRequest,
     WebDocumentLoaderResponse,
@@ -22,6 +31,7 @@ from src.api.models import (
 from fastapi import Depends, HTTPException
 
 # Utilities
+import asyncio
 import logging
 import json
 
@@ -96,7 +106,7 @@ async def handle_web_doc_load(data: WebDocumentLoaderRequest):
 
     # Run the web document loader and return the result.
     loader = WebDocumentLoader(phoenix_tracer=None)
-    result = loader.load_documents(url=data.url.strip())
+    result = await loader.aload_documents(url=data.url.strip())
     if result:
         message = "Web document loaded successfully"
     else:
@@ -149,38 +159,191 @@ async def handle_process_documents(
     HTTPException: If there are any errors during the document loading process.
     """
     try:
-        processor = DocumentLoader(
-            source_dir=data.source_dir,
-            collection_name=data.collection_name,
-            move_after_processing=data.move_after_processing,
-            re_process_files=data.re_process_files,
-            extensions_to_process=data.extensions_to_process,
-        )
-        (
-            successfully_processed_files,
-            failed_to_process_files,
-            already_processed_files,
-        ) = (
+        processor = _build_document_loader(data)
+        result = (
             await processor.load_documents()
         )  # This should block until processing is complete
-        return DocumentLoaderResponse(
-            status="success",
-            message="Documents processed successfully",
-            successfully_processed_files=successfully_processed_files,
-            failed_to_process_files=failed_to_process_files,
-            already_processed_files=already_processed_files,
-        )
+        return _document_loader_response(result, _submit_deferred_enrichment(data))
     except Exception as e:
         logging.error(f"Error processing documents: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def _build_document_loader(data: DocumentLoaderRequest) -> DocumentLoader:
+    return DocumentLoader(
+        source_dir=data.source_dir,
+        collection_name=data.collection_name,
+        move_after_processing=data.move_after_processing,
+        re_process_files=data.re_process_files,
+        extensions_to_process=data.extensions_to_process,
+        # Deferred enrichment gets the documents searchable first, the LLM metadata is added by a later job
+        extraction_profile=(
+            ExtractionProfile.FAST if data.defer_enrichment else data.extraction_profile
+        ),
+    )
+
+
+def _submit_deferred_enrichment(data: DocumentLoaderRequest) -> IngestionJob:
+    if not data.defer_enrichment:
+        return None
+    return _submit_enrichment_job(data.collection_name)
+
+
+def _document_loader_response(
+    result, enrichment_job: IngestionJob = None
+) -> DocumentLoaderResponse:
+    (
+        successfully_processed_files,
+        failed_to_process_files,
+        already_processed_files,
+    ) = result
+    message = "Documents processed successfully"
+    if enrichment_job is not None:
+        message += f", metadata enrichment job {enrichment_job.job_id} submitted"
+    return DocumentLoaderResponse(
+        status="success",
+        message=message,
+        successfully_processed_files=successfully_processed_files,
+        failed_to_process_files=failed_to_process_files,
+        already_processed_files=already_processed_files,
+    )
+
+
+# ===== INGESTION JOB HANDLERS =====
+def _ingestion_job_response(job: IngestionJob) -> IngestionJobResponse:
+    return IngestionJobResponse(
+        job_id=job.job_id,
+        status=job.status.value,
+        description=job.description,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        progress=IngestionProgressResponse(**job.progress.to_dict()),
+        result=job.result,
+        error=job.error,
+    )
+
+
+def _get_ingestion_job_or_404(job_id: str) -> IngestionJob:
+    job = get_ingestion_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    return job
+
+
+async def handle_submit_ingestion_job(
+    data: DocumentLoaderRequest,
+) -> IngestionJobResponse:
+    """
+    Starts document processing as a background job and returns immediately.
+
+    The job runs the same DocumentLoader as handle_process_documents, its progress
+    can be polled with handle_get_ingestion_job and its result uses the
+    DocumentLoaderResponse shape once it completes.
+
+    Args:
+    data (DocumentLoaderRequest): The data containing the source directory and the
+                                  collection name to which the documents should be loaded.
+
+    Returns:
+    IngestionJobResponse: The newly submitted job.
+    """
+
+    async def run(progress):
+        # Building the loader connects to Qdrant and Azure, keep that off the event loop too
+        processor = await asyncio.to_thread(_build_document_loader, data)
+        result = await processor.load_documents(progress=progress)
+        return _document_loader_response(result, _submit_deferred_enrichment(data))
+
+    job = get_ingestion_job_manager().submit(
+        run,
+        description=f"Process {data.source_dir} into {data.collection_name}",
+    )
+    return _ingestion_job_response(job)
+
+
+def handle_list_ingestion_jobs() -> list:
+    """
+    Lists all known ingestion jobs, oldest first.
+
+    Returns:
+    List[IngestionJobResponse]: The state of every job still tracked.
+    """
+    return [_ingestion_job_response(job) for job in get_ingestion_job_manager().list()]
+
+
+def handle_get_ingestion_job(job_id: str) -> IngestionJobResponse:
+    """
+    Returns the status, progress and, once finished, the result of an ingestion job.
+
+    Args:
+    job_id (str): The id returned when the job was submitted.
+
+    Raises:
+    HTTPException: If no job with that id exists.
+    """
+    return _ingestion_job_response(_get_ingestion_job_or_404(job_id))
+
+
+def handle_cancel_ingestion_job(job_id: str) -> IngestionJobResponse:
+    """
+    Cancels a pending or running ingestion job. Batches already indexed are kept.
+
+    Args:
+    job_id (str): The id returned when the job was submitted.
+
+    Raises:
+    HTTPException: If no job with that id exists.
+    """
+    _get_ingestion_job_or_404(job_id)
+    return _ingestion_job_response(get_ingestion_job_manager().cancel(job_id))
+
+
+def _submit_enrichment_job(collection_name: str) -> IngestionJob:
+    async def run(progress):
+        enriched_nodes = await enrich_collection(collection_name, progress=progress)
+        return EnrichmentResponse(status="success", enriched_nodes=enriched_nodes)
+
+    return get_ingestion_job_manager().submit(
+        run,
+        description=f"Enrich metadata of {collection_name}",
+    )
+
+
+async def handle_submit_enrichment_job(data: EnrichmentRequest) -> IngestionJobResponse:
+    """
+    Starts a background job that extracts LLM metadata for the points of a collection
+    that were ingested with the "fast" profile, patching their payloads in place.
+
+    Args:
+    data (EnrichmentRequest): The collection to enrich.
+
+    Returns:
+    IngestionJobResponse: The newly submitted job, its result is an EnrichmentResponse.
+    """
+    return _ingestion_job_response(_submit_enrichment_job(data.collection_name))
+
+
+# ===== EMBEDDING CACHE HANDLER =====
+def handle_embedding_cache_stats() -> list:
+    """
+    Returns the hit and miss counters of every embedding cache opened by this process.
+
+    Returns:
+    List[EmbeddingCacheStatsResponse]: One entry per cache database.
+    """
+    return [
+        EmbeddingCacheStatsResponse(db_file=db_file, **stats)
+        for db_file, stats in get_embedding_cache_stats().items()
+    ]
+
+
 # ===== DOCUMENT SEARCHER HANDLER =====
 def handle_document_search(data: DocumentSearchRequest) -> str:
     """Handles document search request and returns the raw response.
 
     This function receives a DocumentSearchRequest containing the collection
-    name and user query input. It instantiates a DocumentSearch object and
+    name and user query input. It gets the shared DocumentSearch object and
     calls search_documents() to perform the actual search.
 
     The search_documents() method is returning a raw string response rather
@@ -213,11 +376,13 @@ def handle_document_search(data: DocumentSearchRequest) -> str:
         ```
     """
     try:
-        document_search = DocumentSearch(
-            collection_name=data.collection_name, user_input=data.user_input
-        )
+        document_search = get_document_search()
 
-        results = document_search.search_documents()
+        results = document_search.search_documents(
+            collection_name=data.collection_name,
+            query=data.user_input,
+            reranker=data.reranker,
+        )
         logging.debug(f"Raw results: {results}")
 
         return str(results)
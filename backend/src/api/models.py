@@ -3,7 +3,8 @@
 # Utilities
 from pydantic import BaseModel
 from typing import Optional, Any
-from typing import List
+from typing import List, Dict, Union
+from datetime import datetime
 import uuid
 
 
@@ -156,6 +157,15 @@ class DocumentLoaderRequest(BaseModel):
                                     Several edge cases where files will be re-processed even if this is False.
                                     Default is False.
     extensions_to_process (List[str]): List of file extensions that will be tested for processing.
+    extraction_profile (str): How much metadata to extract for each node.
+                              "fast" uses local heuristics only (title from headings, RAKE keywords, no summaries) and makes no LLM calls,
+                              suited to bulk backfills. "standard" adds LLM titles, keywords and node summaries.
+                              "full" also adds neighbouring summaries and questions answered.
+                              Default is "full".
+    defer_enrichment (bool): Whether to make the documents searchable first and extract LLM metadata later.
+                             Documents are ingested with the "fast" profile, then a background enrichment job fills in
+                             summaries, keywords and questions answered on the indexed points.
+                             Default is False.
     """
 
     source_dir: str = "src/scraper/scraped_data/"
@@ -163,6 +173,120 @@ class DocumentLoaderRequest(BaseModel):
     move_after_processing: bool = True
     re_process_files: bool = False
     extensions_to_process: List[str] = [".md", ".pdf", ".docx", ".txt", ".pptx"]
+    extraction_profile: str = "full"
+    defer_enrichment: bool = False
+
+
+# === Ingestion Job Models ===
+
+
+class EnrichmentRequest(BaseModel):
+    """
+    Model representing the request to enrich a collection's metadata in the background.
+
+    Attributes:
+    collection_name (str): The collection whose points ingested with the "fast" profile should be enriched.
+                           Default is "techdocs".
+    """
+
+    collection_name: str = "techdocs"
+
+
+class EnrichmentResponse(BaseModel):
+    """
+    Model representing the result of a metadata enrichment job.
+
+    Attributes:
+    status (str): It will be 'success' once the collection has been enriched.
+    enriched_nodes (int): Number of points whose payloads were patched.
+    """
+
+    status: str
+    enriched_nodes: int
+
+
+class IngestionProgressResponse(BaseModel):
+    """
+    Model representing the progress of a background ingestion job.
+
+    Attributes:
+    total_files (int): Number of files the job is tracking, including skipped ones.
+    queued_files (int): Number of files waiting to be processed.
+    processed_files (int): Number of files loaded into the vector store so far.
+    skipped_files (int): Number of files skipped because they were already processed.
+    failed_files (int): Number of files that failed to convert or load.
+    nodes (int): Number of nodes inserted into the vector store so far.
+    tokens (int): Number of tokens embedded so far.
+    elapsed_seconds (float): Time the job has been running for.
+    files_per_second (float): Processed files per second.
+    nodes_per_second (float): Inserted nodes per second.
+    tokens_per_second (float): Embedded tokens per second.
+    files (Dict[str, str]): Status of each file, one of queued, processed, skipped or failed.
+    """
+
+    total_files: int = 0
+    queued_files: int = 0
+    processed_files: int = 0
+    skipped_files: int = 0
+    failed_files: int = 0
+    nodes: int = 0
+    tokens: int = 0
+    elapsed_seconds: float = 0.0
+    files_per_second: float = 0.0
+    nodes_per_second: float = 0.0
+    tokens_per_second: float = 0.0
+    files: Dict[str, str] = {}
+
+
+class IngestionJobResponse(BaseModel):
+    """
+    Model representing the state of a background ingestion job.
+
+    Attributes:
+    job_id (str): Unique identifier of the job, used to poll or cancel it.
+    status (str): One of pending, running, completed, failed or cancelled.
+    description (Optional[str]): What the job is processing.
+    created_at (datetime): When the job was submitted.
+    started_at (Optional[datetime]): When the job started running.
+    finished_at (Optional[datetime]): When the job completed, failed or was cancelled.
+    progress (IngestionProgressResponse): Per-file progress and throughput of the job.
+    result (Optional[Union[EnrichmentResponse, DocumentLoaderResponse]]): Final result, set once the job has completed.
+    error (Optional[str]): Error message if the job failed.
+    """
+
+    job_id: str
+    status: str
+    description: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: IngestionProgressResponse
+    result: Optional[Union[EnrichmentResponse, DocumentLoaderResponse]] = None
+    error: Optional[str] = None
+
+
+# === Embedding Cache Models ===
+
+
+class EmbeddingCacheStatsResponse(BaseModel):
+    """
+    Model representing the hit and miss counters of an embedding cache.
+
+    Attributes:
+    db_file (str): SQLite database file backing the cache.
+    hits (int): Texts served from the cache since the process started.
+    misses (int): Texts that had to be sent to the embeddings deployment since the process started.
+    hit_rate (float): hits / (hits + misses).
+    entries (int): Embeddings currently stored.
+    max_entries (int): Embeddings kept before the least recently used are evicted.
+    """
+
+    db_file: str
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    max_entries: int
 
 
 # === Document Search Models ===
@@ -175,7 +299,9 @@ class DocumentSearchRequest(BaseModel):
     Attributes:
     collection_name (str): The name of the collection to be queried.
     user_input (str): The user input query for searching documents.
+    reranker (Optional[str]): Reranker to use instead of the configured one: "bm25", "rank_gpt" or "none".
     """
 
     collection_name: str
     user_input: str
+    reranker: Optional[str] = None
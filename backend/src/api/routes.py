@@ -5,6 +5,7 @@ import logging
 
 # Primary Components
 from fastapi import APIRouter
+from typing import List
 
 # Internal Modules
 from src.api.models import (
@@ -18,6 +19,9 @@ from src.api.models import (
     DocumentLoaderResponse,
     DocumentSearchRequest,
     ChatHistoryOutput,
+    IngestionJobResponse,
+    EmbeddingCacheStatsResponse,
+    EnrichmentRequest,
 )
 from src.api.handlers import (
     handle_chat,
@@ -26,6 +30,12 @@ from src.api.handlers import (
     handle_web_doc_load,
     handle_process_documents,
     handle_document_search,
+    handle_submit_ingestion_job,
+    handle_list_ingestion_jobs,
+    handle_get_ingestion_job,
+    handle_cancel_ingestion_job,
+    handle_submit_enrichment_job,
+    handle_embedding_cache_stats,
 )
 from src.agent.agent_handler import get_agent_handler
 
@@ -127,6 +137,78 @@ async def process_documents_endpoint(
     return await handle_process_documents(data)
 
 
+# === Ingestion Job Endpoints ===
+@router.post("/process-documents/jobs/", response_model=IngestionJobResponse)
+async def submit_ingestion_job_endpoint(
+    data: DocumentLoaderRequest,
+) -> IngestionJobResponse:
+    """
+    Endpoint to start the document loading process as a background job.
+
+    Returns as soon as the job is queued, poll /process-documents/jobs/{job_id}
+    for per-file progress, throughput and the final DocumentLoaderResponse.
+
+    Args:
+    data (DocumentLoaderRequest): The data containing the source directory
+                                  and the collection name to which the documents should be loaded.
+
+    Returns:
+    IngestionJobResponse: The submitted job, including its job_id.
+    """
+    return await handle_submit_ingestion_job(data)
+
+
+@router.get("/process-documents/jobs/", response_model=List[IngestionJobResponse])
+def list_ingestion_jobs_endpoint() -> List[IngestionJobResponse]:
+    """
+    Endpoint to list all known ingestion jobs.
+    """
+    return handle_list_ingestion_jobs()
+
+
+@router.get("/process-documents/jobs/{job_id}", response_model=IngestionJobResponse)
+def get_ingestion_job_endpoint(job_id: str) -> IngestionJobResponse:
+    """
+    Endpoint to get the status, progress and result of an ingestion job.
+    """
+    return handle_get_ingestion_job(job_id)
+
+
+@router.delete("/process-documents/jobs/{job_id}", response_model=IngestionJobResponse)
+def cancel_ingestion_job_endpoint(job_id: str) -> IngestionJobResponse:
+    """
+    Endpoint to cancel a pending or running ingestion job.
+    """
+    return handle_cancel_ingestion_job(job_id)
+
+
+# === Metadata Enrichment Endpoint ===
+@router.post("/process-documents/enrich/", response_model=IngestionJobResponse)
+async def submit_enrichment_job_endpoint(
+    data: EnrichmentRequest,
+) -> IngestionJobResponse:
+    """
+    Endpoint to fill in LLM metadata for documents that were loaded with the "fast" profile
+    or with defer_enrichment. Runs as a background job, poll /process-documents/jobs/{job_id}.
+
+    Args:
+    data (EnrichmentRequest): The collection to enrich.
+
+    Returns:
+    IngestionJobResponse: The submitted job, including its job_id.
+    """
+    return await handle_submit_enrichment_job(data)
+
+
+# === Embedding Cache Endpoint ===
+@router.get("/embedding-cache/stats/", response_model=List[EmbeddingCacheStatsResponse])
+def embedding_cache_stats_endpoint() -> List[EmbeddingCacheStatsResponse]:
+    """
+    Endpoint to get the hit and miss counters of the embedding cache.
+    """
+    return handle_embedding_cache_stats()
+
+
 # === Document Search Endpoint ===
 @router.post("/search-documents/", response_model=str)
 def search_documents_endpoint(data: DocumentSearchRequest) -> str:
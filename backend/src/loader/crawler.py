@@ -0,0 +1,373 @@
+# /src/loader/crawler.py
+# Asynchronous web crawler used by WebDocumentLoader. Pages are fetched concurrently over a pooled HTTP client and
+# handed to the caller as they arrive, so ingestion of the first pages overlaps with fetching the rest of the site.
+
+# Utilities
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urldefrag, urlparse
+from urllib.robotparser import RobotFileParser
+
+# Primary Components
+import httpx
+from langchain_core.utils.html import extract_sub_links
+
+# Internal Modules
+from src.loader.http_cache import HttpCache, body_hash
+
+DEFAULT_USER_AGENT = "PitchCardGenerator-Crawler/1.0"
+# Content types whose body is kept and searched for links, everything else (images, archives, PDFs) is skipped
+CRAWLABLE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+
+def normalize_url(url: str) -> str:
+    """Drop the fragment so links to anchors within a page don't fetch it again."""
+    url, _ = urldefrag(url.strip())
+    return url
+
+
+class CrawledPage:
+    """
+    A page fetched by the crawler.
+
+    Attributes:
+    url (str): Final url of the page, after redirects.
+    depth (int): Number of links followed from the start url, the start url is depth 0.
+    status_code (int): HTTP status of the response.
+    content_type (str): Media type of the response, without parameters.
+    text (str): Decoded body of the response, None if the page wasn't downloaded because it hasn't changed.
+    requested_url (str): The url that was requested, before redirects.
+    changed (bool): False if the server answered 304 Not Modified or sent the same body as the last crawl.
+    links (List[str]): Absolute links found on the page.
+    etag (str): ETag header of the response.
+    last_modified (str): Last-Modified header of the response.
+    content_hash (str): sha256 of the response body, None if it wasn't downloaded.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        depth: int,
+        status_code: int,
+        content_type: str,
+        text: str,
+        requested_url: str = None,
+        changed: bool = True,
+        links=None,
+        etag: str = None,
+        last_modified: str = None,
+        content_hash: str = None,
+    ):
+        self.url = url
+        self.depth = depth
+        self.status_code = status_code
+        self.content_type = content_type
+        self.text = text
+        self.requested_url = requested_url or url
+        self.changed = changed
+        self.links = links or []
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+
+
+class RobotsPolicy:
+    """
+    Fetches and caches robots.txt per origin. Origins whose robots.txt is missing or unreachable allow everything.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, user_agent: str):
+        self.client = client
+        self.user_agent = user_agent
+        self._parsers = {}
+        self._locks = {}
+
+    async def _parser(self, url: str) -> RobotFileParser:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        lock = self._locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            if origin not in self._parsers:
+                parser = RobotFileParser(f"{origin}/robots.txt")
+                try:
+                    response = await self.client.get(f"{origin}/robots.txt")
+                    if response.status_code in (401, 403):
+                        parser.disallow_all = True
+                    elif response.status_code >= 400:
+                        parser.allow_all = True
+                    else:
+                        parser.parse(response.text.splitlines())
+                except httpx.HTTPError as e:
+                    logging.warning(f"Could not fetch robots.txt for {origin}: {e}")
+                    parser.allow_all = True
+                self._parsers[origin] = parser
+            return self._parsers[origin]
+
+    async def can_fetch(self, url: str) -> bool:
+        return (await self._parser(url)).can_fetch(self.user_agent, url)
+
+    async def crawl_delay(self, url: str) -> float:
+        return (await self._parser(url)).crawl_delay(self.user_agent) or 0.0
+
+
+class HostLimiter:
+    """
+    Bounds the number of requests in flight to each host and spaces requests to the same host at least
+    1 / requests_per_second seconds apart.
+    """
+
+    def __init__(self, concurrency: int = 2, requests_per_second: float = None):
+        """
+        :param concurrency: Requests allowed in flight per host.
+        :param requests_per_second: Request rate allowed per host, None for no limit.
+        """
+        self.concurrency = concurrency
+        self.min_interval = 1 / requests_per_second if requests_per_second else 0.0
+        self._semaphores = {}
+        self._next_request_at = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str, min_interval: float = 0.0):
+        """
+        Hold one of host's request slots for the duration of the block.
+
+        :param min_interval: Additional lower bound on the spacing of requests, e.g. a robots.txt Crawl-delay.
+        """
+        semaphore = self._semaphores.setdefault(
+            host, asyncio.Semaphore(self.concurrency)
+        )
+        async with semaphore:
+            interval = max(self.min_interval, min_interval)
+            now = time.monotonic()
+            request_at = max(now, self._next_request_at.get(host, now))
+            self._next_request_at[host] = request_at + interval
+            if request_at > now:
+                await asyncio.sleep(request_at - now)
+            yield
+
+
+class AsyncWebCrawler:
+    """
+    Breadth first crawler with a deduplicated URL frontier.
+
+    max_depth and max_documents are enforced while crawling, so no requests are made for pages that would be
+    dropped. Pages are yielded by crawl() as soon as they are fetched.
+    """
+
+    def __init__(
+        self,
+        max_depth: int = 1,
+        max_documents: int = None,
+        max_concurrency: int = 8,
+        per_host_concurrency: int = 2,
+        per_host_requests_per_second: float = None,
+        timeout: float = 10,
+        user_agent: str = DEFAULT_USER_AGENT,
+        respect_robots_txt: bool = True,
+        prevent_outside: bool = True,
+        check_response_status: bool = True,
+        client: httpx.AsyncClient = None,
+        http_cache: HttpCache = None,
+        conditional_requests: bool = True,
+    ):
+        """
+        :param max_depth: Depth of links followed, 1 only fetches the start url, 2 also fetches the pages it links to.
+        :param max_documents: Number of pages yielded before the crawl stops, None for no limit.
+        :param max_concurrency: Requests in flight across all hosts, also the size of the connection pool.
+        :param per_host_concurrency: Requests in flight per host.
+        :param per_host_requests_per_second: Request rate per host, None for no limit.
+        :param timeout: Seconds allowed for each request.
+        :param user_agent: User-Agent header, also the agent robots.txt rules are matched against.
+        :param respect_robots_txt: Skip urls disallowed by robots.txt and honour its Crawl-delay.
+        :param prevent_outside: Only follow links below the start url.
+        :param check_response_status: Skip pages that returned a 4xx or 5xx status.
+        :param client: Optional httpx.AsyncClient to use instead of creating one per crawl.
+        :param http_cache: Optional HttpCache, pages seen before are requested conditionally and yielded
+            with changed=False when they haven't changed. The crawler only reads it, pages are stored with
+            remember() once the caller has processed them.
+        :param conditional_requests: Send the validators stored in http_cache. When False every page is downloaded
+            in full and the cache is only updated, e.g. to force re-processing.
+        """
+        self.max_depth = max_depth
+        self.max_documents = max_documents
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.respect_robots_txt = respect_robots_txt
+        self.prevent_outside = prevent_outside
+        self.check_response_status = check_response_status
+        self.host_limiter = HostLimiter(
+            concurrency=per_host_concurrency,
+            requests_per_second=per_host_requests_per_second,
+        )
+        self.client = client
+        self.http_cache = http_cache
+        self.conditional_requests = conditional_requests
+
+    @asynccontextmanager
+    async def _client(self):
+        if self.client is not None:
+            yield self.client
+            return
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        async with httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=limits,
+            follow_redirects=True,
+            headers={"User-Agent": self.user_agent},
+        ) as client:
+            yield client
+
+    async def _fetch(self, client, robots, url: str, depth: int) -> CrawledPage:
+        crawl_delay = 0.0
+        if robots is not None:
+            if not await robots.can_fetch(url):
+                logging.info(f"Skipping {url}, disallowed by robots.txt")
+                return None
+            crawl_delay = await robots.crawl_delay(url)
+
+        cached = None
+        if self.http_cache is not None:
+            cached = await asyncio.to_thread(self.http_cache.get, url)
+        headers = {}
+        if cached is not None and self.conditional_requests:
+            headers = cached.conditional_headers()
+
+        async with self.host_limiter.slot(urlparse(url).netloc, crawl_delay):
+            response = await client.get(url, headers=headers)
+
+        if response.status_code == 304 and cached is not None:
+            return CrawledPage(
+                url=url,
+                depth=depth,
+                status_code=response.status_code,
+                content_type=None,
+                text=None,
+                requested_url=url,
+                changed=False,
+                links=cached.links,
+            )
+        if self.check_response_status and response.status_code >= 400:
+            logging.warning(f"Skipping {url}, status {response.status_code}")
+            return None
+        content_type = response.headers.get("content-type", "text/html")
+        content_type = content_type.split(";")[0].strip().lower()
+        if content_type not in CRAWLABLE_CONTENT_TYPES:
+            logging.debug(f"Skipping {url}, content type {content_type}")
+            return None
+        page_url = normalize_url(str(response.url))
+        links = []
+        if content_type != "text/plain":
+            links = extract_sub_links(
+                response.text,
+                page_url,
+                prevent_outside=False,
+                continue_on_failure=True,
+            )
+        content_hash = body_hash(response.content)
+        return CrawledPage(
+            url=page_url,
+            depth=depth,
+            status_code=response.status_code,
+            content_type=content_type,
+            text=response.text,
+            requested_url=url,
+            # Catches servers that don't send validators, or change them on every response
+            changed=cached is None or cached.content_hash != content_hash,
+            links=links,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+            content_hash=content_hash,
+        )
+
+    def remember(self, pages):
+        """
+        Store the validators of pages in http_cache. Only pass pages that were processed successfully, a page
+        fetched but dropped, or whose ingestion failed, must be downloaded in full again by the next crawl.
+
+        :param pages: CrawledPages yielded by crawl().
+        """
+        if self.http_cache is None:
+            return
+        for page in pages:
+            # A 304 leaves the entry that answered it as it is
+            if page.status_code == 304:
+                continue
+            self.http_cache.put(
+                page.requested_url,
+                etag=page.etag,
+                last_modified=page.last_modified,
+                content_hash=page.content_hash,
+                links=page.links,
+            )
+
+    def _links(self, page: CrawledPage, start_url: str) -> list:
+        if not self.prevent_outside:
+            return page.links
+        return [link for link in page.links if link.startswith(start_url)]
+
+    async def crawl(self, url: str):
+        """
+        Crawl from url, yielding a CrawledPage for every page fetched.
+
+        :param url: The start url.
+        """
+        start_url = normalize_url(url)
+        frontier = asyncio.Queue()
+        pages = asyncio.Queue()
+        seen = {start_url}
+        accepted = 0
+        frontier.put_nowait((start_url, 0))
+
+        async with self._client() as client:
+            robots = (
+                RobotsPolicy(client, self.user_agent)
+                if self.respect_robots_txt
+                else None
+            )
+
+            async def worker():
+                nonlocal accepted
+                while True:
+                    page_url, depth = await frontier.get()
+                    try:
+                        if self.max_documents and accepted >= self.max_documents:
+                            continue
+                        page = await self._fetch(client, robots, page_url, depth)
+                        if page is None:
+                            continue
+                        if self.max_documents and accepted >= self.max_documents:
+                            continue
+                        accepted += 1
+                        # The final url after redirects counts as seen too
+                        seen.add(page.url)
+                        if depth + 1 < self.max_depth:
+                            for link in self._links(page, start_url):
+                                link = normalize_url(link)
+                                if link not in seen:
+                                    seen.add(link)
+                                    frontier.put_nowait((link, depth + 1))
+                        await pages.put(page)
+                    except Exception as e:
+                        logging.warning(f"Error crawling {page_url}: {e}")
+                    finally:
+                        frontier.task_done()
+
+            async def close_when_done():
+                await frontier.join()
+                await pages.put(None)
+
+            tasks = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+            tasks.append(asyncio.create_task(close_when_done()))
+            try:
+                while (page := await pages.get()) is not None:
+                    yield page
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
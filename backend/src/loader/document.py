@@ -13,21 +13,28 @@ from llama_index import (
 )
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 from llama_index.callbacks import CallbackManager
+from llama_index.schema import MetadataMode
+from llama_index.utils import get_tokenizer
 from src.utils.arize_phoenix import ArizePhoenix
 from src.logging.logger_config import configure_logger
 
 # Custom modules
 from src.services.azure_llm_service import AzureLlmBuilder, LLmType
-from src.loader.metadata_extraction import MetadataIngestionPipeline
+from src.loader.metadata_extraction import (
+    MetadataIngestionPipeline,
+    ExtractionProfile,
+)
 from src.utils.config import load_config
 from src.loader.file_hash_manager import (
     create_database,
-    get_file_hash,
-    calculate_file_hash,
+    afilter_unchanged_files,
     hash_and_store_processed_files,
 )
 from src.utils.qdrant import QdrantManager
-from src.utils.covert_pptx_to_pdf import PPTXToPDFConverter
+from src.services.sparse_encoder import get_sparse_encoder, hybrid_vector_store_kwargs
+from src.utils.covert_pptx_to_pdf import PPTXConversionPool
+from src.utils.conversion_cache import ConversionCache
+from src.loader.ingestion_jobs import IngestionFileStatus
 
 config = load_config()
 logger_level = getattr(logging, config["Logging"]["level"].upper())
@@ -44,52 +51,90 @@ class DocumentLoader:
         move_after_processing=True,
         re_process_files=False,
         extensions_to_process=[".md", ".pdf", ".docx", ".txt", ".pptx"],
+        extraction_profile=ExtractionProfile.FULL,
     ):
         self.source_dir = source_dir
         self.collection_name = collection_name
         self.move_after_processing = move_after_processing
         self.re_process_files = re_process_files
         self.extensions_to_process = extensions_to_process
+        # Validate up front so an unknown profile fails before any work is done
+        self.extraction_profile = ExtractionProfile(extraction_profile)
         self.CONFIG = load_config()
         # (self.CONFIG)
-        self.embed_model = AzureLlmBuilder().get_llm(LLmType.AZURE_EMBEDDINGS)
+        # A model of its own, the ServiceContext built by each load replaces its callback manager
+        self.embed_model = AzureLlmBuilder().get_llm(
+            LLmType.AZURE_EMBEDDINGS, shared=False
+        )
         self.qdrant = QdrantManager()
         self.phoenix_tracer = ArizePhoenix()
         self.hashes_db_name = f"{collection_name}_file_hashes.db"
+        ingestion_config = self.CONFIG.get("Ingestion") or {}
+        self.hash_workers = ingestion_config.get("hash_workers")
+        self.hash_with_processes = ingestion_config.get("hash_executor") == "process"
+        self.conversion_workers = ingestion_config.get("pptx_conversion_workers", 2)
+        self.conversion_timeout = ingestion_config.get("pptx_conversion_timeout", 300)
+        self.conversion_batch_size = ingestion_config.get(
+            "pptx_conversion_batch_size", 10
+        )
+        self.document_batch_size = max(
+            1, ingestion_config.get("document_batch_size", 20)
+        )
+        self.conversion_cache = ConversionCache(
+            cache_dir=ingestion_config.get(
+                "pptx_cache_dir", "/app/backend/cache/converted_pptx/"
+            ),
+            max_size_bytes=ingestion_config.get("pptx_cache_max_mb", 2048) * 1024**2,
+        )
+        self.pipeline_persist_dir = os.path.join(
+            ingestion_config.get(
+                "pipeline_persist_dir", "/app/backend/cache/ingestion/"
+            ),
+            collection_name,
+            "files",
+        )
+        self.transformation_cache = ingestion_config.get("transformation_cache", False)
 
         # Initialize DB for file hashes, used to check if a file has already been processed so it isn't needlessly re-processed
         create_database(self.hashes_db_name)
 
         if not self.qdrant.collection_exists(collection_name):
             self.qdrant.create_collection(collection_name, 1536)
+            # Term statistics left over from a deleted collection of the same name
+            get_sparse_encoder().statistics.reset(collection_name)
 
-    async def convert_pptx_files_to_pdf(self, pre_processed_files, hashes_db_name):
-        pptx_files = [f for f in pre_processed_files if f.endswith(".pptx")]
-
-        conversion_tasks = []
+    async def convert_pptx_files_to_pdf(
+        self, pptx_files, pre_processed_files, file_records=None
+    ):
+        """
+        Convert PPTX files to PDF so they can be loaded, PPTX files can't be processed directly.
+        Files that convert successfully are removed from pre_processed_files, their converted PDF is tracked instead.
+
+        :param pptx_files: PPTX files that need to be (re-)processed.
+        :param pre_processed_files: All files found in the source directory.
+        :param file_records: Optional dict of file path to FileHashRecord, lets unchanged decks reuse a cached conversion.
+        :return: Tuple of (converted_pdf_files, conversion_failures).
+        """
         converted_pdf_files = []  # Track converted files
-        already_processed_files = []
         conversion_failures = []  # Track failed conversions
 
-        for pptx_file in pptx_files:
-            current_hash = calculate_file_hash(pptx_file)
-            stored_hash = get_file_hash(hashes_db_name, pptx_file)
-            hash_match = current_hash == stored_hash
-
-            if hash_match and not self.re_process_files:
-                logging.info(
-                    f"Skipping file {pptx_file} because it has already been processed"
-                )
-                already_processed_files.append(pptx_file)
-                continue
-
-            pdf_file = pptx_file.replace(".pptx", ".pdf")
-            convert_pptx_to_pdf = PPTXToPDFConverter(max_retries=5)
-            task = asyncio.create_task(convert_pptx_to_pdf.convert(pptx_file, pdf_file))
-            conversion_tasks.append(task)
-
-        conversion_results = await asyncio.gather(
-            *conversion_tasks, return_exceptions=True
+        # Bound the number of LibreOffice processes, each one needs several hundred MB of memory
+        conversion_pool = PPTXConversionPool(
+            max_workers=self.conversion_workers,
+            max_retries=5,
+            timeout=self.conversion_timeout,
+            batch_size=self.conversion_batch_size,
+            cache=self.conversion_cache,
+        )
+        conversion_results = await conversion_pool.convert_all(
+            [
+                (pptx_file, pptx_file.replace(".pptx", ".pdf"))
+                for pptx_file in pptx_files
+            ],
+            source_hashes={
+                file_path: record.file_hash
+                for file_path, record in (file_records or {}).items()
+            },
         )
 
         for result, pptx_file in zip(conversion_results, pptx_files):
@@ -113,9 +158,39 @@ class DocumentLoader:
                     logging.error(f"Conversion failed for {pptx_file}")
                     conversion_failures.append(pptx_file)
 
-        return converted_pdf_files, already_processed_files, conversion_failures
+        return converted_pdf_files, conversion_failures
+
+    def _collect_candidate_files(self, pre_processed_files, required_exts):
+        """
+        Filter the files found in the source directory down to the ones SimpleDirectoryReader would load.
+        Hidden files and files with extensions that are not being processed are ignored.
+        """
+        return [
+            file
+            for file in pre_processed_files
+            if not os.path.basename(file).startswith(".")
+            and os.path.splitext(file)[1].lower() in required_exts
+        ]
+
+    @staticmethod
+    def _is_pptx(file):
+        return os.path.splitext(file)[1].lower() == ".pptx"
+
+    @staticmethod
+    def _count_tokens(nodes):
+        tokenizer = get_tokenizer()
+        return sum(
+            len(tokenizer(node.get_content(metadata_mode=MetadataMode.EMBED)))
+            for node in nodes
+        )
+
+    async def load_documents(self, progress=None):
+        """
+        Load, convert, extract metadata for and embed every new or changed file in the source directory.
 
-    async def load_documents(self):
+        :param progress: Optional IngestionProgress, updated with per-file status, node and token counts as batches finish.
+        :return: Tuple of (successfully_processed_files, failed_to_process_files, already_processed_files).
+        """
         try:
             # Prepare list of files that have already been processed to be returned later
             already_processed_files = []
@@ -137,92 +212,129 @@ class DocumentLoader:
                 ),
             )
 
-            # Create a new list from tested_extensions and remove ".pptx" from it.
-            # By creating a new list, we ensure that tested_extensions remains unchanged for future use.
-            required_exts = self.extensions_to_process.copy()
+            # Hash every candidate file up front so unchanged files never reach the reader, metadata extractors or embeddings
+            candidate_files = self._collect_candidate_files(
+                pre_processed_files, self.extensions_to_process
+            )
+            # Hashing runs on a pool so a large directory doesn't block the event loop
+            (
+                changed_files,
+                unchanged_files,
+                current_records,
+            ) = await afilter_unchanged_files(
+                candidate_files,
+                self.hashes_db_name,
+                max_workers=self.hash_workers,
+                use_processes=self.hash_with_processes,
+            )
+            if self.re_process_files:
+                files_to_process = candidate_files
+            else:
+                files_to_process = changed_files
+                for unchanged_file in unchanged_files:
+                    logging.info(
+                        f"Skipping file {unchanged_file} because it has already been processed"
+                    )
+                already_processed_files.extend(unchanged_files)
+                if progress is not None:
+                    progress.set_file_status(
+                        unchanged_files, IngestionFileStatus.SKIPPED
+                    )
+            if progress is not None:
+                progress.set_file_status(files_to_process, IngestionFileStatus.QUEUED)
+
+            files_to_load = [
+                file for file in files_to_process if not self._is_pptx(file)
+            ]
 
             # Processing of PPTX files fails, convert them to PDF first
-            # Handle pptx files
+            converted_pdf_files = []
             if ".pptx" in self.extensions_to_process:
-                (
-                    converted_pdf_files,
-                    already_processed_files_from_conversion,
-                    conversion_failures,
-                ) = await self.convert_pptx_files_to_pdf(
-                    pre_processed_files, self.hashes_db_name
+                converted_pdf_files, conversion_failures = (
+                    await self.convert_pptx_files_to_pdf(
+                        [file for file in files_to_process if self._is_pptx(file)],
+                        pre_processed_files,
+                        file_records=current_records,
+                    )
                 )
-                already_processed_files.extend(already_processed_files_from_conversion)
+                files_to_load.extend(
+                    pdf["converted_file"] for pdf in converted_pdf_files
+                )
+                if progress is not None:
+                    progress.set_file_status(
+                        conversion_failures, IngestionFileStatus.FAILED
+                    )
+            # Progress is reported against the original PPTX rather than its temporary PDF
+            original_files = {
+                pdf["converted_file"]: pdf["original_file"]
+                for pdf in converted_pdf_files
+            }
 
-                required_exts.remove(".pptx")
+            vector_store = QdrantVectorStore(
+                client=self.qdrant.get_client(),
+                aclient=self.qdrant.get_async_client(),
+                collection_name=self.collection_name,
+                prefer_grpc=True,
+                **hybrid_vector_store_kwargs(self.qdrant, self.collection_name),
+            )
+            storage_context = StorageContext.from_defaults(vector_store=vector_store)
+            # The pipeline embeds and upserts into Qdrant itself, its docstore skips unchanged documents and replaces the points of changed ones
+            pipeline = MetadataIngestionPipeline.build_pipeline(
+                vector_store=vector_store,
+                embed_model=service_context.embed_model,
+                persist_dir=self.pipeline_persist_dir,
+                transformation_cache=self.transformation_cache,
+                profile=self.extraction_profile,
+            )
 
-            documents = []
+            if not files_to_load:
+                logging.warn("No files found in directory to process")
 
+            # Stream files through the pipeline a batch at a time so memory stays bounded and vectors show up in Qdrant as each batch finishes
+            successfully_processed_files_set = set()
             try:
-                documents = SimpleDirectoryReader(
-                    input_dir=self.source_dir,
-                    required_exts=required_exts,
-                    recursive=True,
-                ).load_data()
-                logging.info("Embedding generation completed")
-
-                vector_store = QdrantVectorStore(
-                    client=self.qdrant.get_client(),
-                    collection_name=self.collection_name,
-                    prefer_grpc=True,
-                )
-                storage_context = StorageContext.from_defaults(
-                    vector_store=vector_store
-                )
-                try:
-                    pipeline = MetadataIngestionPipeline.build_pipeline()
-                    nodes = await pipeline.arun(
-                        documents=documents,
-                        in_place=True,
+                for i in range(0, len(files_to_load), self.document_batch_size):
+                    batch_files = files_to_load[i : i + self.document_batch_size]
+                    documents, nodes = await self._ingest_batch(
+                        batch_files, pipeline, storage_context, service_context
                     )
-                    index = VectorStoreIndex.from_vector_store(
-                        vector_store,
-                        storage_context=storage_context,
-                        service_context=service_context,
+
+                    # List all documents which have been processed successfully to be returned later
+                    batch_processed_files = {
+                        doc.metadata["file_path"] for doc in documents
+                    }
+                    successfully_processed_files_set.update(batch_processed_files)
+                    if progress is not None:
+                        progress.record_batch(
+                            [original_files.get(file, file) for file in batch_files],
+                            nodes=len(nodes),
+                            tokens=self._count_tokens(nodes),
+                        )
+
+                    # Hash each batch as soon as it is indexed, so a failure later in the run doesn't lose completed work
+                    await asyncio.to_thread(
+                        hash_and_store_processed_files,
+                        batch_processed_files,
+                        converted_pdf_files,
+                        self.hashes_db_name,
+                        known_records=current_records,
                     )
-                    index.insert_nodes(nodes=nodes)
-                except KeyError as e:
-                    logging.warn(f"Metadata Extraction failed: {e}")
-                    index = VectorStoreIndex.from_documents(
-                        documents,
-                        storage_context=storage_context,
-                        service_context=service_context,
+                    logging.info(
+                        f"Processed {len(successfully_processed_files_set)} of {len(files_to_load)} files"
                     )
+            finally:
+                # Saved once per run rather than per batch, rewriting the whole docstore after every batch gets
+                # slower as it grows. Also saved when a batch fails or the job is cancelled, so the next run skips
+                # the batches that finished
+                await asyncio.to_thread(
+                    MetadataIngestionPipeline.persist_pipeline,
+                    pipeline,
+                    self.pipeline_persist_dir,
+                )
 
-            # Except SimpleDirectoryReader error when no files as okay
-            except ValueError:
-                logging.warn("No files found in directory to process")
-
-            except Exception as e:
-                logging.error(f"Error generating embeddings: {e}")
-                # Print full stack trace
-                logging.error(e)
-                # Log error type so I can see it and write an except for it
-                logging.error(type(e))
-                raise e
-
-            # List all documents which have been processed successfully to be returned later
-            successfully_processed_files_set = {
-                doc.metadata["file_path"] for doc in documents
-            }
+            logging.info("Embedding generation completed")
             successfully_processed_files = successfully_processed_files_set
 
-            # Hash successfully processed files so they aren't re-processed in the future
-            # NOTE: Only pptx converted to pdf actually have their hashes checked, other files always get re-processed
-            # ToDo: Add functionality to check hashes of other files before processing
-            if "converted_pdf_files" not in locals() or converted_pdf_files is None:
-                converted_pdf_files = []
-
-            hash_and_store_processed_files(
-                successfully_processed_files_set,
-                converted_pdf_files,
-                self.hashes_db_name,
-            )
-
             if ".pptx" in self.extensions_to_process:
                 # Delete all converted PDF files which were converted from PPTX files, now that processing is done
                 for pdf in converted_pdf_files:
@@ -249,6 +361,11 @@ class DocumentLoader:
                 - successfully_processed_files_set
                 - set(already_processed_files)
             )
+            if progress is not None:
+                progress.set_file_status(
+                    set(failed_to_process_files) & set(files_to_process),
+                    IngestionFileStatus.FAILED,
+                )
 
             # Move the files after successfully loading them to the vector index
             if self.move_after_processing:
@@ -265,6 +382,57 @@ class DocumentLoader:
             logging.error(f"load_documents: Error - {str(e)}")
             raise e
 
+    async def _ingest_batch(
+        self, batch_files, pipeline, storage_context, service_context
+    ):
+        """
+        Load, extract metadata for, embed and insert one batch of files.
+
+        :return: Tuple of (documents, nodes), the documents that were loaded and the nodes inserted for them.
+        """
+        try:
+            # File paths as document ids let the pipeline's docstore recognise a file it has already ingested
+            documents = await asyncio.to_thread(
+                SimpleDirectoryReader(
+                    input_files=batch_files, filename_as_id=True
+                ).load_data
+            )
+            if self.re_process_files:
+                MetadataIngestionPipeline.mark_for_reprocessing(
+                    pipeline, [doc.doc_id for doc in documents]
+                )
+            try:
+                nodes = await pipeline.arun(
+                    documents=documents,
+                    in_place=True,
+                    store_doc_text=False,
+                )
+                # Ids are per page, pages a changed file no longer has would otherwise stay searchable
+                await MetadataIngestionPipeline.adelete_stale_documents(
+                    pipeline, documents
+                )
+            except KeyError as e:
+                logging.warn(f"Metadata Extraction failed: {e}")
+                # The pipeline didn't record the documents' hashes, so the next run extracts their metadata
+                # and replaces the points inserted here
+                await asyncio.to_thread(
+                    VectorStoreIndex.from_documents,
+                    documents,
+                    storage_context=storage_context,
+                    service_context=service_context,
+                )
+                # The nodes built by from_documents aren't returned, report the documents in their place
+                nodes = documents
+            return documents, nodes
+
+        except Exception as e:
+            logging.error(f"Error generating embeddings: {e}")
+            # Print full stack trace
+            logging.error(e)
+            # Log error type so I can see it and write an except for it
+            logging.error(type(e))
+            raise e
+
     def move_files_to_out(self):
         out_dir = "src/scraper/out"
         if not os.path.exists(out_dir):
@@ -0,0 +1,125 @@
+# /src/loader/enrichment.py
+# Second phase of deferred ingestion. Documents loaded with the "fast" profile are searchable as soon as their nodes
+# are embedded, the LLM metadata (summaries, keywords, questions answered) is filled in afterwards by patching the
+# payloads of the points already in Qdrant, without re-embedding them.
+
+# Utilities
+import asyncio
+import logging
+
+# Primary Components
+from llama_index.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+from qdrant_client.http import models as qdrant_models
+
+# Internal Modules
+from src.loader.metadata_extraction import MetadataIngestionPipeline
+from src.utils.config import load_config
+from src.utils.qdrant import QdrantManager
+
+# Only the LLM extractors fill section_summary, so points without one are still waiting for enrichment
+PENDING_ENRICHMENT_FILTER = qdrant_models.Filter(
+    must=[
+        qdrant_models.IsEmptyCondition(
+            is_empty=qdrant_models.PayloadField(key="section_summary")
+        )
+    ]
+)
+
+
+class MetadataEnricher:
+    """
+    Runs metadata extractors over points that were indexed without LLM metadata and writes the results back
+    into their Qdrant payloads with set_payload.
+    """
+
+    def __init__(self, client, collection_name: str, extractors, batch_size: int = 32):
+        """
+        :param client: QdrantClient used to scroll and patch points.
+        :param collection_name: Collection whose points are enriched.
+        :param extractors: llama_index metadata extractors run on each batch of nodes, in order.
+        :param batch_size: Number of points read, enriched and patched at a time.
+        """
+        self.client = client
+        self.collection_name = collection_name
+        self.extractors = extractors
+        self.batch_size = batch_size
+
+    def _pending_points(self) -> list:
+        points, _ = self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=PENDING_ENRICHMENT_FILTER,
+            limit=self.batch_size,
+            with_payload=True,
+            with_vectors=False,
+        )
+        return points
+
+    def _patch_points(self, points, nodes):
+        # The node is rebuilt from _node_content at query time, so it has to be rewritten along with the
+        # top level metadata keys used for filtering
+        operations = [
+            qdrant_models.SetPayloadOperation(
+                set_payload=qdrant_models.SetPayload(
+                    payload=node_to_metadata_dict(node), points=[point.id]
+                )
+            )
+            for point, node in zip(points, nodes)
+        ]
+        self.client.batch_update_points(
+            collection_name=self.collection_name, update_operations=operations
+        )
+
+    async def enrich(self, progress=None) -> int:
+        """
+        Enrich every pending point of the collection, one batch at a time.
+
+        :param progress: Optional IngestionProgress, the node count is updated after each batch.
+        :return: Number of points enriched.
+        """
+        enriched = 0
+        seen_ids = set()
+        while True:
+            points = await asyncio.to_thread(self._pending_points)
+            # Guards against looping forever if a patch didn't take
+            points = [point for point in points if point.id not in seen_ids]
+            if not points:
+                break
+            seen_ids.update(point.id for point in points)
+
+            nodes = [metadata_dict_to_node(point.payload) for point in points]
+            for extractor in self.extractors:
+                metadata_list = await extractor.aextract(nodes)
+                for node, metadata in zip(nodes, metadata_list):
+                    node.metadata.update(metadata)
+
+            await asyncio.to_thread(self._patch_points, points, nodes)
+            enriched += len(points)
+            if progress is not None:
+                progress.record_batch([], nodes=len(points), tokens=0)
+            logging.info(
+                f"Enriched {enriched} points in collection {self.collection_name}"
+            )
+        return enriched
+
+
+async def enrich_collection(collection_name: str, progress=None) -> int:
+    """
+    Fill in LLM metadata for every point of collection_name that was ingested with the "fast" profile.
+
+    :param collection_name: Qdrant collection to enrich.
+    :param progress: Optional IngestionProgress updated as batches complete.
+    :return: Number of points enriched.
+    """
+    ingestion_config = load_config().get("Ingestion") or {}
+
+    def build():
+        return MetadataEnricher(
+            client=QdrantManager().get_client(),
+            collection_name=collection_name,
+            extractors=MetadataIngestionPipeline.build_enrichment_extractors(),
+            batch_size=ingestion_config.get("enrichment_batch_size", 32),
+        )
+
+    # Connecting to Qdrant and Azure blocks, keep it off the event loop
+    enricher = await asyncio.to_thread(build)
+    return await enricher.enrich(progress=progress)
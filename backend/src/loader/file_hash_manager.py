@@ -9,6 +9,10 @@ import logging
 import sqlite3
 import hashlib
 import os
+import threading
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Custom modules
 from src.utils.config import load_config
@@ -21,25 +25,149 @@ logging.basicConfig(
 db_path = "/app/backend/sqlite/"
 
 
-def create_database(db_name):
+# Number of file paths sent to SQLite per query, stays well below SQLITE_MAX_VARIABLE_NUMBER
+QUERY_CHUNK_SIZE = 500
+
+# Read size used when hashing without hashlib.file_digest, large reads keep big PDFs and PPTX decks fast
+HASH_READ_SIZE = 1024 * 1024
+
+FileHashRecord = namedtuple(
+    "FileHashRecord",
+    ["file_path", "file_hash", "file_size", "mtime_ns", "inode"],
+    defaults=(None, None, None),
+)
+
+# Columns added after the original (file_path, file_hash) table, older databases are migrated in place
+FILE_HASH_COLUMNS = {
+    "file_size": "INTEGER",
+    "mtime_ns": "INTEGER",
+    "inode": "INTEGER",
+}
+
+_hash_stores = {}
+_hash_stores_lock = threading.Lock()
+
+
+class FileHashStore:
     """
-    Create a SQLite database with the specified name if it doesn't exist.
-    The database will contain a table for storing file paths and their hashes.
+    Long lived, thread safe access to a file hash SQLite database.
+
+    A single connection is kept open in WAL mode for the life of the process, and bulk reads and writes
+    run in one transaction so no-op ingestion runs are not dominated by per-file connects and fsyncs.
+    Size, mtime and inode are stored next to each hash so unchanged files can be skipped without reading them.
+    Use get_hash_store() rather than creating instances directly so connections are shared.
+    """
+
+    def __init__(self, db_name):
+        """
+        :param db_name: Name of the SQLite database file, stored under db_path.
+        """
+        if not os.path.exists(db_path):
+            os.makedirs(db_path)
+
+        self.db_name = db_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"{db_path}{db_name}", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the database consistent with NORMAL, losing the last commit on power loss only means re-processing
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_table()
+
+    def _create_table(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS file_hashes (file_path TEXT PRIMARY KEY, file_hash TEXT)"""
+            )
+            existing_columns = {
+                row[1] for row in self._conn.execute("PRAGMA table_info(file_hashes)")
+            }
+            for column, column_type in FILE_HASH_COLUMNS.items():
+                if column not in existing_columns:
+                    self._conn.execute(
+                        f"ALTER TABLE file_hashes ADD COLUMN {column} {column_type}"
+                    )
+
+    def get(self, file_path):
+        """
+        Retrieve the stored record for a single file.
+
+        :param file_path: Path of the file.
+        :return: FileHashRecord if found, otherwise None.
+        """
+        return self.get_many([file_path]).get(file_path)
+
+    def get_many(self, file_paths):
+        """
+        Retrieve the stored records for many files at once.
+
+        :param file_paths: Iterable of file paths.
+        :return: Dict of file path to FileHashRecord, files without a stored hash are left out.
+        """
+        file_paths = list(file_paths)
+        records = {}
+        with self._lock:
+            for i in range(0, len(file_paths), QUERY_CHUNK_SIZE):
+                chunk = file_paths[i : i + QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT file_path, file_hash, file_size, mtime_ns, inode FROM file_hashes WHERE file_path IN ({placeholders})",
+                    chunk,
+                )
+                for row in rows:
+                    records[row[0]] = FileHashRecord(*row)
+        return records
+
+    def upsert(self, file_path, file_hash, file_size=None, mtime_ns=None, inode=None):
+        """
+        Insert or update a single file's hash.
+
+        :param file_path: Path of the file.
+        :param file_hash: Hash of the file content.
+        :param file_size: Size of the file in bytes when it was hashed.
+        :param mtime_ns: Modification time of the file in nanoseconds when it was hashed.
+        :param inode: Inode of the file when it was hashed.
+        """
+        self.upsert_many(
+            [FileHashRecord(file_path, file_hash, file_size, mtime_ns, inode)]
+        )
+
+    def upsert_many(self, records):
+        """
+        Insert or update many files' hashes in a single transaction.
+
+        :param records: Iterable of FileHashRecord or (file_path, file_hash, file_size, mtime_ns, inode) tuples.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO file_hashes (file_path, file_hash, file_size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?)",
+                [tuple(record) for record in records],
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_hash_store(db_name) -> FileHashStore:
+    """
+    Return the shared FileHashStore for a database, opening it on first use.
 
     :param db_name: Name of the SQLite database file.
     """
-    db_name = f"{db_path}{db_name}"
+    with _hash_stores_lock:
+        if db_name not in _hash_stores:
+            _hash_stores[db_name] = FileHashStore(db_name)
+        return _hash_stores[db_name]
 
-    if not os.path.exists(db_path):
-        os.makedirs(db_path)
 
-    conn = sqlite3.connect(db_name)
-    c = conn.cursor()
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS file_hashes (file_path TEXT PRIMARY KEY, file_hash TEXT)"""
-    )
-    conn.commit()
-    conn.close()
+def create_database(db_name):
+    """
+    Create a SQLite database with the specified name if it doesn't exist.
+    The database will contain a table for storing file paths, their hashes and the stat they were hashed with.
+
+    :param db_name: Name of the SQLite database file.
+    """
+    get_hash_store(db_name)
 
 
 def insert_or_update_file_hash(db_name, file_path, file_hash):
@@ -50,15 +178,7 @@ def insert_or_update_file_hash(db_name, file_path, file_hash):
     :param file_path: Path of the file.
     :param file_hash: Hash of the file content.
     """
-    db_name = f"{db_path}{db_name}"
-    conn = sqlite3.connect(db_name)
-    c = conn.cursor()
-    c.execute(
-        "INSERT OR REPLACE INTO file_hashes (file_path, file_hash) VALUES (?, ?)",
-        (file_path, file_hash),
-    )
-    conn.commit()
-    conn.close()
+    get_hash_store(db_name).upsert(file_path, file_hash)
 
 
 def get_file_hash(db_name, file_path):
@@ -70,17 +190,12 @@ def get_file_hash(db_name, file_path):
     :return: The hash of the file if found, otherwise None.
     """
     try:
-        db_name = f"{db_path}{db_name}"
-        conn = sqlite3.connect(db_name)
-        c = conn.cursor()
-        c.execute("SELECT file_hash FROM file_hashes WHERE file_path = ?", (file_path,))
-        row = c.fetchone()
+        record = get_hash_store(db_name).get(file_path)
     except Exception as e:
         logging.error(f"Error when querying the database: {e}")
-    finally:
-        conn.close()
+        record = None
 
-    return row[0] if row else None
+    return record.file_hash if record else None
 
 
 def calculate_file_hash(file_path):
@@ -90,19 +205,190 @@ def calculate_file_hash(file_path):
     :param file_path: Path of the file.
     :return: The SHA256 hash of the file content.
     """
-    sha256_hash = hashlib.sha256()
     with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
+        # file_digest reads into a reusable buffer in C and releases the GIL, far faster than a Python read loop
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+        sha256_hash = hashlib.sha256()
+        for byte_block in iter(lambda: f.read(HASH_READ_SIZE), b""):
             sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+        return sha256_hash.hexdigest()
+
+
+def stat_matches_record(file_stat, record):
+    """
+    Check whether a file's stat still matches the stat stored when it was last hashed.
 
+    :param file_stat: os.stat_result of the file.
+    :param record: FileHashRecord stored for the file.
+    :return: True if size, mtime and inode are all unchanged.
+    """
+    return (
+        record is not None
+        and record.file_size == file_stat.st_size
+        and record.mtime_ns == file_stat.st_mtime_ns
+        and record.inode == file_stat.st_ino
+    )
 
-# In file_hash_manager.py
+
+def calculate_file_record(file_path, stored_record=None):
+    """
+    Build a FileHashRecord for a file, only reading its content if its stat changed since it was last hashed.
+
+    :param file_path: Path of the file.
+    :param stored_record: FileHashRecord stored for the file, if any.
+    :return: FileHashRecord with the current hash and stat of the file.
+    """
+    # Stat before hashing so a write during hashing is picked up as a change next time
+    file_stat = os.stat(file_path)
+    if stat_matches_record(file_stat, stored_record):
+        file_hash = stored_record.file_hash
+    else:
+        file_hash = calculate_file_hash(file_path)
+
+    return FileHashRecord(
+        file_path,
+        file_hash,
+        file_stat.st_size,
+        file_stat.st_mtime_ns,
+        file_stat.st_ino,
+    )
+
+
+def filter_unchanged_files(file_paths, hashes_db_name):
+    """
+    Split a list of files into those whose content changed since they were last processed and those that did not.
+    Files whose size, mtime and inode match the stored values are not read at all.
+
+    :param file_paths: Paths of the candidate files.
+    :param hashes_db_name: Name of the SQLite database file.
+    :return: Tuple of (changed_files, unchanged_files, current_records) where current_records maps file path to its FileHashRecord.
+    """
+    changed_files = []
+    unchanged_files = []
+    current_records = {}
+    stored_records = get_hash_store(hashes_db_name).get_many(file_paths)
+
+    for file_path in file_paths:
+        stored_record = stored_records.get(file_path)
+        try:
+            current_record = calculate_file_record(file_path, stored_record)
+        except OSError as e:
+            logging.warning(
+                f"Unable to hash file {file_path}, it will be processed: {e}"
+            )
+            changed_files.append(file_path)
+            continue
+
+        current_records[file_path] = current_record
+        if stored_record and current_record.file_hash == stored_record.file_hash:
+            unchanged_files.append(file_path)
+        else:
+            changed_files.append(file_path)
+
+    return changed_files, unchanged_files, current_records
+
+
+async def calculate_file_records_concurrently(
+    file_paths, stored_records=None, max_workers=None, use_processes=False
+):
+    """
+    Hash files on a thread or process pool, yielding results as they finish so the event loop stays responsive.
+    Threads are usually enough since hashlib releases the GIL while hashing, processes help when the stat fast path
+    is rarely hit and there are many small files.
+
+    :param file_paths: Paths of the files to hash.
+    :param stored_records: Optional dict of file path to stored FileHashRecord, enables the stat fast path.
+    :param max_workers: Size of the pool, None lets the executor pick a default based on the CPU count.
+    :param use_processes: Use a process pool instead of a thread pool.
+    :return: Async generator of (file_path, FileHashRecord) tuples, or (file_path, OSError) if the file couldn't be read.
+    """
+    if stored_records is None:
+        stored_records = {}
+
+    loop = asyncio.get_running_loop()
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+
+    with executor_class(max_workers=max_workers) as executor:
+
+        async def calculate(file_path):
+            try:
+                record = await loop.run_in_executor(
+                    executor,
+                    calculate_file_record,
+                    file_path,
+                    stored_records.get(file_path),
+                )
+                return file_path, record
+            except OSError as e:
+                return file_path, e
+
+        for next_result in asyncio.as_completed(
+            [calculate(file_path) for file_path in file_paths]
+        ):
+            yield await next_result
+
+
+async def afilter_unchanged_files(
+    file_paths, hashes_db_name, max_workers=None, use_processes=False
+):
+    """
+    Async version of filter_unchanged_files that hashes files concurrently on a pool.
+
+    :param file_paths: Paths of the candidate files.
+    :param hashes_db_name: Name of the SQLite database file.
+    :param max_workers: Size of the hashing pool.
+    :param use_processes: Use a process pool instead of a thread pool.
+    :return: Tuple of (changed_files, unchanged_files, current_records), file lists keep the order of file_paths.
+    """
+    stored_records = await asyncio.to_thread(
+        get_hash_store(hashes_db_name).get_many, file_paths
+    )
+
+    current_records = {}
+    async for file_path, result in calculate_file_records_concurrently(
+        file_paths, stored_records, max_workers, use_processes
+    ):
+        if isinstance(result, OSError):
+            logging.warning(
+                f"Unable to hash file {file_path}, it will be processed: {result}"
+            )
+            continue
+        current_records[file_path] = result
+
+    changed_files = []
+    unchanged_files = []
+    for file_path in file_paths:
+        stored_record = stored_records.get(file_path)
+        current_record = current_records.get(file_path)
+        if (
+            stored_record
+            and current_record
+            and current_record.file_hash == stored_record.file_hash
+        ):
+            unchanged_files.append(file_path)
+        else:
+            changed_files.append(file_path)
+
+    return changed_files, unchanged_files, current_records
 
 
 def hash_and_store_processed_files(
-    processed_files, converted_pdf_files, hashes_db_name
+    processed_files, converted_pdf_files, hashes_db_name, known_records=None
 ):
+    """
+    Store the hashes of successfully processed files so they are skipped next time.
+
+    :param processed_files: Paths of the files that were processed.
+    :param converted_pdf_files: List of dicts mapping converted PDFs back to their original PPTX files.
+    :param hashes_db_name: Name of the SQLite database file.
+    :param known_records: Optional dict of file path to FileHashRecord calculated before processing, avoids hashing files twice.
+    """
+    if known_records is None:
+        known_records = {}
+
+    records = []
     for file in processed_files:
         try:
             file_to_hash = file
@@ -115,9 +401,18 @@ def hash_and_store_processed_files(
                     if pdf["converted_file"] == file
                 )
 
-            current_hash = calculate_file_hash(file_to_hash)
-            insert_or_update_file_hash(hashes_db_name, file_to_hash, current_hash)
+            if file_to_hash in known_records:
+                records.append(known_records[file_to_hash])
+            else:
+                records.append(calculate_file_record(file_to_hash))
 
         except Exception as e:
             logging.warning(f"Issue hashing and storing file {file}: {e}")
             logging.warning("File will be re-processed in the future")
+
+    # Store all hashes in one transaction instead of committing once per file
+    try:
+        get_hash_store(hashes_db_name).upsert_many(records)
+    except Exception as e:
+        logging.warning(f"Issue storing file hashes in {hashes_db_name}: {e}")
+        logging.warning("Files will be re-processed in the future")
@@ -0,0 +1,153 @@
+# /src/loader/freshness_index.py
+# Records which web pages are in each collection, with the hash of their extracted text and when they were ingested,
+# so every page found by a crawl can be skipped, replaced or added instead of being embedded again.
+
+# Utilities
+import hashlib
+import os
+import threading
+import time
+from enum import Enum
+
+# Primary Components
+import sqlite3
+
+_freshness_indexes = {}
+_freshness_indexes_lock = threading.Lock()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RefreshDecision(str, Enum):
+    # Page isn't in the collection yet
+    ADD = "add"
+    # Page is in the collection and its points should be replaced
+    REPLACE = "replace"
+    # Page is in the collection and up to date
+    SKIP = "skip"
+    # Page changed but isn't due for a refresh yet, it must be fetched in full again by the next crawl
+    DEFER = "defer"
+
+
+class RefreshPolicy(str, Enum):
+    # Replace a page as soon as its text changes
+    CHANGE = "change"
+    # Replace a changed page only once its last ingestion is older than the TTL
+    TTL = "ttl"
+
+
+class FreshnessEntry:
+    """
+    Attributes:
+    url (str): Page url, also its document id.
+    content_hash (str): sha256 of the text extracted from the page when it was ingested.
+    ingested_at (float): When the page was ingested, as a unix timestamp.
+    """
+
+    def __init__(self, url: str, content_hash: str, ingested_at: float):
+        self.url = url
+        self.content_hash = content_hash
+        self.ingested_at = ingested_at
+
+
+class FreshnessIndex:
+    """
+    SQLite backed index of the web pages ingested into each collection.
+    Use get_freshness_index() rather than creating instances directly so connections are shared.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        policy: RefreshPolicy = RefreshPolicy.CHANGE,
+        ttl_seconds: float = 86400,
+    ):
+        """
+        :param db_file: Path of the SQLite database file, its directory is created if it doesn't exist.
+        :param policy: When a changed page is replaced, see RefreshPolicy.
+        :param ttl_seconds: Minimum age of an ingested page before the ttl policy replaces it.
+        """
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.db_file = db_file
+        self.policy = RefreshPolicy(policy)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS web_pages (collection TEXT, url TEXT, content_hash TEXT, ingested_at REAL, PRIMARY KEY (collection, url))"""
+            )
+
+    def get(self, collection: str, url: str) -> FreshnessEntry:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, content_hash, ingested_at FROM web_pages WHERE collection = ? AND url = ?",
+                (collection, url),
+            ).fetchone()
+        return FreshnessEntry(*row) if row is not None else None
+
+    def decide(
+        self, collection: str, url: str, text: str, now: float = None
+    ) -> RefreshDecision:
+        """
+        Decide what to do with a page found by a crawl.
+
+        :param collection: Collection the page would be loaded into.
+        :param url: Page url.
+        :param text: Text extracted from the page.
+        :param now: Current time, defaults to time.time().
+        """
+        entry = self.get(collection, url)
+        if entry is None:
+            return RefreshDecision.ADD
+        if entry.content_hash == content_hash(text):
+            return RefreshDecision.SKIP
+        if now is None:
+            now = time.time()
+        if (
+            self.policy == RefreshPolicy.TTL
+            and now - entry.ingested_at < self.ttl_seconds
+        ):
+            return RefreshDecision.DEFER
+        return RefreshDecision.REPLACE
+
+    def record(self, collection: str, pages: dict):
+        """
+        Record pages as ingested now.
+
+        :param collection: Collection the pages were loaded into.
+        :param pages: Dict of page url to the text that was ingested.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO web_pages (collection, url, content_hash, ingested_at) VALUES (?, ?, ?, ?)",
+                [
+                    (collection, url, content_hash(text), now)
+                    for url, text in pages.items()
+                ],
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_freshness_index(
+    db_file: str,
+    policy: RefreshPolicy = RefreshPolicy.CHANGE,
+    ttl_seconds: float = 86400,
+) -> FreshnessIndex:
+    """
+    Return the shared FreshnessIndex for db_file, opening it on first use.
+    """
+    with _freshness_indexes_lock:
+        index = _freshness_indexes.get(db_file)
+        if index is None:
+            index = FreshnessIndex(db_file, policy=policy, ttl_seconds=ttl_seconds)
+            _freshness_indexes[db_file] = index
+        return index
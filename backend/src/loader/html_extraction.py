@@ -0,0 +1,227 @@
+# /src/loader/html_extraction.py
+# Turns crawled HTML into the markdown text and metadata of a web Document. extract_page parses each page once with
+# lxml and produces both from the same tree, after dropping navigation, footers and other boilerplate.
+
+# Utilities
+import logging
+import re
+import threading
+from datetime import datetime
+from urllib.parse import urljoin
+
+# Primary Components
+import lxml.html
+from bs4 import BeautifulSoup
+from markdownify import markdownify as md
+
+# Elements that never hold page content. Forms are kept, some sites wrap the whole page in one, only their controls go
+BOILERPLATE_XPATH = (
+    "//script | //style | //noscript | //template | //svg | //iframe | //button | //select | //textarea"
+    " | //nav | //footer | //aside"
+    " | //*[@role='navigation' or @role='contentinfo' or @role='banner' or @role='search']"
+    " | //*[@aria-hidden='true']"
+    # Site headers, as opposed to the header of an article
+    " | //header[not(ancestor::main) and not(ancestor::article)]"
+)
+WHITESPACE = re.compile(r"\s+")
+BLANK_LINES = re.compile(r"\n\s*\n(\s*\n)+")
+CODE_LANGUAGE = re.compile(r"(?:language|lang)-([\w+#-]+)")
+HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+BLOCK_TAGS = frozenset(
+    "p div section article main header figure figcaption details summary address center".split()
+)
+
+# lxml parsers must not be shared between threads
+_parsers = threading.local()
+
+
+def _parser() -> lxml.html.HTMLParser:
+    if not hasattr(_parsers, "parser"):
+        _parsers.parser = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+    return _parsers.parser
+
+
+def _page_metadata(tree, url: str) -> dict:
+    metadata = {"url": url}
+    metadata["last_accessed_date"] = datetime.today().strftime("%Y-%m-%d")
+    if (title := tree.find(".//title")) is not None:
+        metadata["title"] = title.text_content()
+    if (keywords := tree.find(".//meta[@name='keywords']")) is not None:
+        metadata["keywords"] = keywords.get("content")
+    if (description := tree.find(".//meta[@name='description']")) is not None:
+        metadata["description"] = description.get("content")
+    metadata["language"] = tree.get("lang")
+    return metadata
+
+
+def _content_root(tree):
+    for xpath in ("//main", "//*[@role='main']", "//article"):
+        # Several matches, e.g. the posts of a blog index, are all content
+        if len(candidates := tree.xpath(xpath)) == 1:
+            return candidates[0]
+    body = tree.find("body")
+    return body if body is not None else tree
+
+
+class _MarkdownWriter:
+    """Renders an lxml element tree as markdown in a single recursive pass."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def convert(self, root) -> str:
+        return BLANK_LINES.sub("\n\n", self._inline(root)).strip()
+
+    @staticmethod
+    def _text(text) -> str:
+        return WHITESPACE.sub(" ", text) if text else ""
+
+    def _inline(self, el) -> str:
+        parts = [self._text(el.text)]
+        for child in el:
+            parts.append(self._render(child))
+            parts.append(self._text(child.tail))
+        return "".join(parts)
+
+    def _url(self, href: str) -> str:
+        return urljoin(self.base_url, href)
+
+    def _render(self, el) -> str:
+        tag = el.tag
+        if not isinstance(tag, str):
+            return ""
+        if tag in HEADINGS:
+            return f"\n\n{'#' * HEADINGS[tag]} {self._inline(el).strip()}\n\n"
+        if tag in BLOCK_TAGS:
+            return f"\n\n{self._inline(el)}\n\n"
+        if tag == "a":
+            text = self._inline(el).strip()
+            href = el.get("href")
+            if not text or not href or href.startswith(("#", "javascript:")):
+                return text
+            return f"[{text}]({self._url(href)})"
+        if tag in ("strong", "b"):
+            text = self._inline(el).strip()
+            return f"**{text}**" if text else ""
+        if tag in ("em", "i"):
+            text = self._inline(el).strip()
+            return f"*{text}*" if text else ""
+        if tag == "code":
+            return f"`{el.text_content()}`"
+        if tag == "pre":
+            return self._code_block(el)
+        if tag in ("ul", "ol"):
+            return self._list(el, ordered=tag == "ol")
+        if tag == "table":
+            return self._table(el)
+        if tag == "blockquote":
+            lines = self._inline(el).strip().split("\n")
+            return "\n\n" + "\n".join(f"> {line}" for line in lines) + "\n\n"
+        if tag == "img":
+            src = el.get("src")
+            return f"![{el.get('alt', '')}]({self._url(src)})" if src else ""
+        if tag == "br":
+            return "\n"
+        if tag == "hr":
+            return "\n\n---\n\n"
+        if tag == "dt":
+            return f"\n\n**{self._inline(el).strip()}**\n"
+        if tag == "dd":
+            return f"{self._inline(el).strip()}\n\n"
+        return self._inline(el)
+
+    def _code_block(self, el) -> str:
+        language = ""
+        for candidate in (el, *el.iterfind("code")):
+            if match := CODE_LANGUAGE.search(candidate.get("class", "")):
+                language = match.group(1)
+                break
+        code = el.text_content().strip("\n")
+        return f"\n\n```{language}\n{code}\n```\n\n"
+
+    def _list(self, el, ordered: bool) -> str:
+        items = []
+        number = 1
+        for item in el:
+            if item.tag != "li":
+                continue
+            prefix = f"{number}. " if ordered else "- "
+            number += 1
+            lines = [
+                line for line in self._inline(item).strip().split("\n") if line.strip()
+            ]
+            if not lines:
+                continue
+            items.append(prefix + lines[0].strip())
+            # Nested lists and paragraphs stay inside the item
+            items.extend(" " * len(prefix) + line for line in lines[1:])
+        return "\n\n" + "\n".join(items) + "\n\n"
+
+    def _table(self, el) -> str:
+        rows = []
+        for row in el.iter("tr"):
+            cells = [
+                self._inline(cell).strip().replace("\n", " ").replace("|", "\\|")
+                for cell in row
+                if cell.tag in ("td", "th")
+            ]
+            if cells:
+                rows.append(cells)
+        if not rows:
+            return ""
+        width = max(len(row) for row in rows)
+        rows = [row + [""] * (width - len(row)) for row in rows]
+        lines = ["| " + " | ".join(rows[0]) + " |", "|" + " --- |" * width]
+        lines.extend("| " + " | ".join(row) + " |" for row in rows[1:])
+        return "\n\n" + "\n".join(lines) + "\n\n"
+
+
+def extract_page(html: str, url: str) -> tuple:
+    """
+    Parse html once and return its markdown text and metadata.
+
+    Navigation, headers, footers, sidebars, scripts and styles are removed, and only the main or article element
+    is converted when the page has exactly one.
+
+    :param html: Raw html of the page.
+    :param url: Url of the page, relative links and images are resolved against it.
+    :return: Tuple of the markdown text and the metadata dict.
+    """
+    if not html or not html.strip():
+        return "", {
+            "url": url,
+            "last_accessed_date": datetime.today().strftime("%Y-%m-%d"),
+        }
+    tree = lxml.html.document_fromstring(html.encode("utf-8"), parser=_parser())
+    metadata = _page_metadata(tree, url)
+    for el in tree.xpath(BOILERPLATE_XPATH):
+        # The root element can't be dropped
+        if el.getparent() is not None:
+            el.drop_tree()
+    return _MarkdownWriter(url).convert(_content_root(tree)), metadata
+
+
+def markdownify_extractor(html: str) -> str:
+    """Previous extractor: regex out scripts and styles, then markdownify the whole page."""
+    strip_tags = ["script", "style"]
+    filtered_html = html
+    for tag in strip_tags:
+        filtered_html = re.sub(rf"<{tag}.*?/{tag}>", "", filtered_html, flags=re.DOTALL)
+    return md(filtered_html, strip=strip_tags)
+
+
+def soup_metadata_extractor(html: str, url: str) -> dict:
+    """Extract metadata from raw html using BeautifulSoup."""
+    logging.debug(f"Extracting metadata from: {url}")
+    metadata = {"url": url}
+    soup = BeautifulSoup(html, "html.parser")
+    metadata["last_accessed_date"] = datetime.today().strftime("%Y-%m-%d")
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if keywords := soup.find("meta", attrs={"name": "keywords"}):
+        metadata["keywords"] = keywords.get("content", None)
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", None)
+    if html_lang := soup.find("html"):
+        metadata["language"] = html_lang.get("lang", None)
+    return metadata
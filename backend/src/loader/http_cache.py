@@ -0,0 +1,129 @@
+# /src/loader/http_cache.py
+# Validators of the pages fetched by the crawler, so refreshing a site sends conditional requests and only pages that
+# actually changed are downloaded and ingested again.
+
+# Utilities
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Primary Components
+import sqlite3
+
+_http_caches = {}
+_http_caches_lock = threading.Lock()
+
+
+def body_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class HttpCacheEntry:
+    """
+    What was last seen at a url.
+
+    Attributes:
+    url (str): The requested url.
+    etag (str): ETag header of the last response, sent back as If-None-Match.
+    last_modified (str): Last-Modified header of the last response, sent back as If-Modified-Since.
+    content_hash (str): sha256 of the last response body, catches unchanged pages served without validators.
+    links (List[str]): Links found on the page, so the crawl can continue through it when it isn't downloaded again.
+    fetched_at (float): When the page was last fetched.
+    """
+
+    def __init__(self, url, etag, last_modified, content_hash, links, fetched_at):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.links = links
+        self.fetched_at = fetched_at
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """
+    SQLite backed store of HttpCacheEntry per url.
+    Use get_http_cache() rather than creating instances directly so connections are shared.
+    """
+
+    def __init__(self, db_file: str):
+        """
+        :param db_file: Path of the SQLite database file, its directory is created if it doesn't exist.
+        """
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS http_cache (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT, links TEXT, fetched_at REAL)"""
+            )
+
+    def get(self, url: str) -> HttpCacheEntry:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, etag, last_modified, content_hash, links, fetched_at FROM http_cache WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        url, etag, last_modified, content_hash, links, fetched_at = row
+        return HttpCacheEntry(
+            url, etag, last_modified, content_hash, json.loads(links), fetched_at
+        )
+
+    def put(
+        self,
+        url: str,
+        etag: str = None,
+        last_modified: str = None,
+        content_hash: str = None,
+        links=None,
+    ):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, content_hash, links, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    etag,
+                    last_modified,
+                    content_hash,
+                    json.dumps(links or []),
+                    time.time(),
+                ),
+            )
+
+    def delete(self, urls):
+        """Forget urls, so they are downloaded in full next time, e.g. because ingesting them failed."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM http_cache WHERE url = ?", [(url,) for url in urls]
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_http_cache(db_file: str) -> HttpCache:
+    """
+    Return the shared HttpCache for db_file, opening it on first use.
+    """
+    with _http_caches_lock:
+        cache = _http_caches.get(db_file)
+        if cache is None:
+            cache = HttpCache(db_file)
+            _http_caches[db_file] = cache
+        return cache
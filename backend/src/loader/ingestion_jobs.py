@@ -0,0 +1,215 @@
+# /src/loader/ingestion_jobs.py
+# Runs document ingestion in the background so HTTP requests return right away instead of holding a connection open
+# for the whole conversion, extraction, embedding and indexing run.
+
+# Utilities
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from enum import Enum
+
+# Global variable to store the job manager instance.
+_job_manager_instance = None
+
+
+class IngestionJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class IngestionFileStatus(str, Enum):
+    QUEUED = "queued"
+    PROCESSED = "processed"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+class IngestionProgress:
+    """
+    Progress of a single ingestion run, updated by DocumentLoader while it works and read by the jobs API.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files = {}
+        self.nodes = 0
+        self.tokens = 0
+        self._started_at = None
+        self._finished_at = None
+
+    def start(self):
+        with self._lock:
+            self._started_at = time.monotonic()
+
+    def finish(self):
+        with self._lock:
+            self._finished_at = time.monotonic()
+
+    def set_file_status(self, file_paths, status: IngestionFileStatus):
+        with self._lock:
+            for file_path in file_paths:
+                self.files[file_path] = status
+
+    def record_batch(self, file_paths, nodes: int, tokens: int):
+        """Mark a batch of files as processed and add its node and token counts."""
+        with self._lock:
+            for file_path in file_paths:
+                self.files[file_path] = IngestionFileStatus.PROCESSED
+            self.nodes += nodes
+            self.tokens += tokens
+
+    def _count(self, status: IngestionFileStatus) -> int:
+        return sum(1 for file_status in self.files.values() if file_status == status)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            if self._started_at is None:
+                elapsed_seconds = 0.0
+            else:
+                elapsed_seconds = (
+                    self._finished_at or time.monotonic()
+                ) - self._started_at
+            processed_files = self._count(IngestionFileStatus.PROCESSED)
+
+            def per_second(count):
+                return count / elapsed_seconds if elapsed_seconds > 0 else 0.0
+
+            return {
+                "total_files": len(self.files),
+                "queued_files": self._count(IngestionFileStatus.QUEUED),
+                "processed_files": processed_files,
+                "skipped_files": self._count(IngestionFileStatus.SKIPPED),
+                "failed_files": self._count(IngestionFileStatus.FAILED),
+                "nodes": self.nodes,
+                "tokens": self.tokens,
+                "elapsed_seconds": elapsed_seconds,
+                "files_per_second": per_second(processed_files),
+                "nodes_per_second": per_second(self.nodes),
+                "tokens_per_second": per_second(self.tokens),
+                "files": {
+                    file_path: file_status.value
+                    for file_path, file_status in self.files.items()
+                },
+            }
+
+
+class IngestionJob:
+    """
+    A single background ingestion run.
+
+    Attributes:
+    job_id (str): Unique identifier of the job.
+    status (IngestionJobStatus): Current state of the job.
+    progress (IngestionProgress): Live progress of the run.
+    result (Any): Whatever the job's run function returned, set once the job completes.
+    error (str): Error message if the job failed.
+    """
+
+    def __init__(self, description: str = None):
+        self.job_id = str(uuid.uuid4())
+        self.description = description
+        self.status = IngestionJobStatus.PENDING
+        self.progress = IngestionProgress()
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (
+            IngestionJobStatus.COMPLETED,
+            IngestionJobStatus.FAILED,
+            IngestionJobStatus.CANCELLED,
+        )
+
+
+class IngestionJobManager:
+    """
+    Schedules ingestion jobs as background tasks on the running event loop and keeps track of their state.
+    At most max_concurrent_jobs run at once, the rest wait in the pending state.
+    """
+
+    def __init__(self, max_concurrent_jobs: int = 1, max_finished_jobs: int = 100):
+        """
+        :param max_concurrent_jobs: Number of jobs allowed to run at the same time.
+        :param max_finished_jobs: Number of finished jobs kept for status lookups, the oldest are forgotten first.
+        """
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = {}
+        self._semaphore = None
+
+    def submit(self, run, description: str = None) -> IngestionJob:
+        """
+        Start a job in the background and return it immediately.
+
+        :param run: Async function called with the job's IngestionProgress, its return value becomes the job result.
+        :param description: Optional human readable description of the job.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+
+        job = IngestionJob(description=description)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job, run))
+        self._forget_old_jobs()
+        logging.info(f"Ingestion job {job.job_id} submitted: {description}")
+        return job
+
+    def get(self, job_id: str) -> IngestionJob:
+        return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        return sorted(self.jobs.values(), key=lambda job: job.created_at)
+
+    def cancel(self, job_id: str) -> IngestionJob:
+        """
+        Cancel a pending or running job. Work already indexed is kept, the job stops at its next await point.
+
+        :return: The job, or None if no job has that id.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None and not job.is_finished:
+            job.task.cancel()
+        return job
+
+    async def _run(self, job: IngestionJob, run):
+        try:
+            async with self._semaphore:
+                job.status = IngestionJobStatus.RUNNING
+                job.started_at = datetime.now()
+                job.progress.start()
+                job.result = await run(job.progress)
+                job.status = IngestionJobStatus.COMPLETED
+                logging.info(f"Ingestion job {job.job_id} completed")
+        except asyncio.CancelledError:
+            job.status = IngestionJobStatus.CANCELLED
+            logging.info(f"Ingestion job {job.job_id} cancelled")
+        except Exception as e:
+            job.status = IngestionJobStatus.FAILED
+            job.error = str(e)
+            logging.error(f"Ingestion job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = datetime.now()
+            job.progress.finish()
+
+    def _forget_old_jobs(self):
+        finished_jobs = [job for job in self.list() if job.is_finished]
+        for job in finished_jobs[: max(0, len(finished_jobs) - self.max_finished_jobs)]:
+            del self.jobs[job.job_id]
+
+
+def get_ingestion_job_manager() -> IngestionJobManager:
+    global _job_manager_instance
+    if _job_manager_instance is None:
+        _job_manager_instance = IngestionJobManager()
+    return _job_manager_instance
@@ -0,0 +1,134 @@
+# /src/loader/local_extractors.py
+# Metadata extractors that run locally without an LLM, used by the "fast" extraction profile so bulk backfills
+# aren't bound by LLM latency and cost. They fill the same metadata keys as the llama_index LLM extractors.
+
+# Utilities
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+# Primary Components
+from llama_index.bridge.pydantic import Field
+from llama_index.extractors.interface import BaseExtractor
+from llama_index.schema import BaseNode, MetadataMode
+
+MARKDOWN_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+WORD = re.compile(r"[a-zA-Z][a-zA-Z0-9+#'-]*")
+# Punctuation that ends a RAKE candidate phrase
+PHRASE_DELIMITER = re.compile(r"[.,;:!?()\[\]{}\"|/\\\n\t]+")
+MAX_TITLE_LENGTH = 120
+
+# Small English stop word list, enough to split RAKE candidate phrases without downloading a corpus
+STOP_WORDS = frozenset("""
+    a about above after again against all also am an and any are as at be because been before being below between
+    both but by can could did do does doing down during each either else etc few for from further get gets got had
+    has have having he her here hers herself him himself his how however i if in into is it its itself just let may
+    me might more most much must my myself no nor not now of off on once only or other our ours ourselves out over
+    own per same shall she should since so some such than that the their theirs them themselves then there these
+    they this those through thus to too under until up upon us use used uses using very via was we were what when
+    where whether which while who whom why will with within without would yet you your yours yourself yourselves
+    """.split())
+
+
+class HeadingTitleExtractor(BaseExtractor):
+    """
+    Sets document_title from the first markdown heading of each document, falling back to the file name or the
+    first line of text.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HeadingTitleExtractor"
+
+    @staticmethod
+    def _title_from_text(text: str):
+        if heading := MARKDOWN_HEADING.search(text):
+            return heading.group(1)
+        return None
+
+    @staticmethod
+    def _fallback_title(node: BaseNode) -> str:
+        if file_name := node.metadata.get("file_name"):
+            return os.path.splitext(file_name)[0].replace("_", " ")
+        if title := node.metadata.get("title"):
+            return title
+        first_line = next(
+            (line.strip() for line in node.get_content().splitlines() if line.strip()),
+            "",
+        )
+        return first_line
+
+    async def aextract(self, nodes: Sequence[BaseNode]) -> List[Dict]:
+        titles_by_doc_id = {}
+        for node in nodes:
+            doc_id = node.ref_doc_id
+            if titles_by_doc_id.get(doc_id) is None:
+                titles_by_doc_id[doc_id] = self._title_from_text(node.get_content())
+
+        titles = []
+        for node in nodes:
+            title = titles_by_doc_id.get(node.ref_doc_id) or self._fallback_title(node)
+            titles.append({"document_title": title[:MAX_TITLE_LENGTH]})
+        return titles
+
+
+class RakeKeywordExtractor(BaseExtractor):
+    """
+    Sets excerpt_keywords using RAKE (Rapid Automatic Keyword Extraction): candidate phrases are the runs of words
+    between stop words and punctuation, and each phrase is scored by the degree / frequency of its words.
+    """
+
+    keywords: int = Field(default=6, description="Number of keywords to extract.")
+    max_phrase_words: int = Field(
+        default=3, description="Longest candidate phrase, in words."
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "RakeKeywordExtractor"
+
+    def _candidate_phrases(self, text: str) -> List[List[str]]:
+        phrases = []
+        for fragment in PHRASE_DELIMITER.split(text.lower()):
+            phrase = []
+            for word in WORD.findall(fragment):
+                if word in STOP_WORDS or len(word) < 2:
+                    if phrase:
+                        phrases.append(phrase)
+                    phrase = []
+                else:
+                    phrase.append(word)
+            if phrase:
+                phrases.append(phrase)
+        return [phrase for phrase in phrases if len(phrase) <= self.max_phrase_words]
+
+    def extract_keywords(self, text: str) -> List[str]:
+        phrases = self._candidate_phrases(text)
+        frequency = defaultdict(int)
+        degree = defaultdict(int)
+        for phrase in phrases:
+            for word in phrase:
+                frequency[word] += 1
+                degree[word] += len(phrase)
+
+        scores = {}
+        for phrase in phrases:
+            key = " ".join(phrase)
+            if key not in scores:
+                scores[key] = sum(degree[word] / frequency[word] for word in phrase)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [phrase for phrase, _ in ranked[: self.keywords]]
+
+    async def aextract(self, nodes: Sequence[BaseNode]) -> List[Dict]:
+        return [
+            {
+                "excerpt_keywords": ", ".join(
+                    # Metadata such as file paths would only add noise to the keywords
+                    self.extract_keywords(
+                        node.get_content(metadata_mode=MetadataMode.NONE)
+                    )
+                )
+            }
+            for node in nodes
+        ]
@@ -1,3 +1,6 @@
+import os
+from enum import Enum
+
 from llama_index.extractors import (
     TitleExtractor,
     QuestionsAnsweredExtractor,
@@ -6,10 +9,166 @@ from llama_index.extractors import (
     KeywordExtractor,
 )
 from llama_index.schema import MetadataMode
-from llama_index.ingestion import IngestionPipeline
+from llama_index.ingestion import (
+    IngestionPipeline,
+    DocstoreStrategy,
+    arun_transformations,
+    run_transformations,
+)
+from llama_index.storage.docstore import SimpleDocumentStore
+from llama_index.storage.storage_context import DOCSTORE_FNAME
 from llama_index.text_splitter import SentenceSplitter
+from qdrant_client.http import models as qdrant_models
 
+from src.loader.local_extractors import HeadingTitleExtractor, RakeKeywordExtractor
 from src.services.azure_llm_service import AzureLlmBuilder, LLmType
+from src.services.llm_response_cache import CachedLLMPredictor, get_llm_response_cache
+from src.utils.config import load_config
+
+# Document hash that never matches a real one, forces a document to be treated as changed on the next run
+STALE_DOCUMENT_HASH = "stale"
+
+
+class ExtractionProfile(str, Enum):
+    # Local heuristics only, title from headings and RAKE keywords, no LLM calls
+    FAST = "fast"
+    # LLM title, keywords and a summary of each node
+    STANDARD = "standard"
+    # LLM title, keywords, prev/self/next summaries and questions answered
+    FULL = "full"
+
+
+class ReplaceAfterUpsertPipeline(IngestionPipeline):
+    """
+    IngestionPipeline whose upserts only replace a changed document's points once its new nodes are in the
+    vector store. llama_index deletes them before the document is transformed, so a failed extraction or
+    embedding call would leave a previously searchable document out of the collection.
+
+    A document's hash is recorded once its nodes are upserted, a document that fails is retried by the next run.
+    The vector store must be a QdrantVectorStore.
+    """
+
+    def run(
+        self,
+        show_progress=False,
+        documents=None,
+        nodes=None,
+        cache_collection=None,
+        in_place=True,
+        store_doc_text=True,
+        **kwargs,
+    ):
+        if self.docstore is None or self.vector_store is None:
+            return super().run(
+                show_progress=show_progress,
+                documents=documents,
+                nodes=nodes,
+                cache_collection=cache_collection,
+                in_place=in_place,
+                store_doc_text=store_doc_text,
+                **kwargs,
+            )
+        nodes_to_run = {}
+        for node in self._prepare_inputs(documents, nodes):
+            ref_doc_id = node.ref_doc_id or node.id_
+            if self.docstore.get_document_hash(ref_doc_id) != node.hash:
+                nodes_to_run[ref_doc_id] = node
+        nodes = run_transformations(
+            list(nodes_to_run.values()),
+            self.transformations,
+            show_progress=show_progress,
+            cache=self.cache if not self.disable_cache else None,
+            cache_collection=cache_collection,
+            in_place=in_place,
+            **kwargs,
+        )
+        self.vector_store.add([n for n in nodes if n.embedding is not None])
+
+        for ref_doc_id, keep_ids in self._point_ids(nodes_to_run, nodes).items():
+            self.vector_store.client.delete(
+                collection_name=self.vector_store.collection_name,
+                points_selector=self._replaced_points(ref_doc_id, keep_ids),
+            )
+            self.docstore.set_document_hash(ref_doc_id, nodes_to_run[ref_doc_id].hash)
+        self.docstore.add_documents(
+            list(nodes_to_run.values()), store_text=store_doc_text
+        )
+        return nodes
+
+    async def arun(
+        self,
+        show_progress=False,
+        documents=None,
+        nodes=None,
+        cache_collection=None,
+        in_place=True,
+        store_doc_text=True,
+        **kwargs,
+    ):
+        if self.docstore is None or self.vector_store is None:
+            return await super().arun(
+                show_progress=show_progress,
+                documents=documents,
+                nodes=nodes,
+                cache_collection=cache_collection,
+                in_place=in_place,
+                store_doc_text=store_doc_text,
+                **kwargs,
+            )
+        nodes_to_run = {}
+        for node in self._prepare_inputs(documents, nodes):
+            ref_doc_id = node.ref_doc_id or node.id_
+            if await self.docstore.aget_document_hash(ref_doc_id) != node.hash:
+                nodes_to_run[ref_doc_id] = node
+        nodes = await arun_transformations(
+            list(nodes_to_run.values()),
+            self.transformations,
+            show_progress=show_progress,
+            cache=self.cache if not self.disable_cache else None,
+            cache_collection=cache_collection,
+            in_place=in_place,
+            **kwargs,
+        )
+        await self.vector_store.async_add([n for n in nodes if n.embedding is not None])
+
+        for ref_doc_id, keep_ids in self._point_ids(nodes_to_run, nodes).items():
+            # QdrantVectorStore has no public accessor for its async client
+            await self.vector_store._aclient.delete(
+                collection_name=self.vector_store.collection_name,
+                points_selector=self._replaced_points(ref_doc_id, keep_ids),
+            )
+            await self.docstore.aset_document_hash(
+                ref_doc_id, nodes_to_run[ref_doc_id].hash
+            )
+        await self.docstore.async_add_documents(
+            list(nodes_to_run.values()), store_text=store_doc_text
+        )
+        return nodes
+
+    @staticmethod
+    def _point_ids(nodes_to_run, nodes) -> dict:
+        """Ids of the points just upserted for each document in nodes_to_run."""
+        point_ids = {ref_doc_id: [] for ref_doc_id in nodes_to_run}
+        for node in nodes:
+            if node.embedding is not None and node.ref_doc_id in point_ids:
+                point_ids[node.ref_doc_id].append(node.node_id)
+        return point_ids
+
+    @staticmethod
+    def _replaced_points(ref_doc_id, keep_ids):
+        # Also catches points left by earlier loads, e.g. by the fallback that bypasses the pipeline
+        return qdrant_models.FilterSelector(
+            filter=qdrant_models.Filter(
+                must=[
+                    qdrant_models.FieldCondition(
+                        key="doc_id", match=qdrant_models.MatchValue(value=ref_doc_id)
+                    )
+                ],
+                must_not=(
+                    [qdrant_models.HasIdCondition(has_id=keep_ids)] if keep_ids else []
+                ),
+            )
+        )
 
 
 class MetadataIngestionPipeline:
@@ -28,15 +187,50 @@ class MetadataIngestionPipeline:
         extract_summary=True,
         extract_questions_answered=True,
         vector_store=None,
+        cache_llm_responses=True,
+        embed_model=None,
+        persist_dir=None,
+        transformation_cache=False,
+        profile=ExtractionProfile.FULL,
     ) -> IngestionPipeline:
-        if llm is None:
-            if llm_type is None:
-                llm_type = LLmType.LLAMA_AZURE_OPENAI_GPT_35_TURBO
-            llm = AzureLlmBuilder().get_llm(llm_type)
+        """
+        Build the splitter, metadata extractor and (optionally) embedding pipeline.
+
+        When persist_dir is given the pipeline gets a docstore, loaded from and persisted to persist_dir, with upsert
+        semantics: documents are identified by their doc_id, unchanged documents are skipped, and when a changed
+        document is re-ingested its old points are deleted from vector_store once the new nodes are added, see
+        ReplaceAfterUpsertPipeline.
+        Use persist_pipeline() after each run to save the docstore, and the transformation cache if
+        transformation_cache is set. The transformation cache is never evicted, so it is off by default.
+
+        profile picks how much metadata is extracted, see ExtractionProfile. The extract_* flags can only
+        narrow a profile further.
+        """
+        profile = ExtractionProfile(profile)
         if text_splitter is None:
             text_splitter = SentenceSplitter()
         transformations = []
         transformations.append(text_splitter)
+
+        if profile == ExtractionProfile.FAST:
+            if extract_title:
+                transformations.append(HeadingTitleExtractor())
+            if extract_keywords:
+                transformations.append(RakeKeywordExtractor(keywords=keywords))
+            return MetadataIngestionPipeline._assemble(
+                transformations,
+                embed_model,
+                vector_store,
+                persist_dir,
+                transformation_cache,
+            )
+
+        if profile == ExtractionProfile.STANDARD:
+            extract_questions_answered = False
+            if summaries is None:
+                summaries = ["self"]
+
+        llm = MetadataIngestionPipeline._build_llm(llm, llm_type, cache_llm_responses)
         if extract_title:
             transformations.append(
                 TitleExtractor(
@@ -66,8 +260,121 @@ class MetadataIngestionPipeline:
                     llm=llm,
                     metadata_mode=metadata_mode,
                     embedding_only=False,
+                    num_workers=num_workers,
                 )
             )
-        return IngestionPipeline(
-            transformations=transformations, vector_store=vector_store
+        return MetadataIngestionPipeline._assemble(
+            transformations,
+            embed_model,
+            vector_store,
+            persist_dir,
+            transformation_cache,
+        )
+
+    @staticmethod
+    def build_enrichment_extractors(
+        llm=None,
+        llm_type=None,
+        metadata_mode=MetadataMode.EMBED,
+        keywords=6,
+        questions=3,
+        num_workers=4,
+        cache_llm_responses=True,
+    ) -> list:
+        """
+        Build the LLM extractors run by the deferred enrichment worker on nodes that were ingested with the
+        fast profile: keywords, a summary of each node and the questions it answers. The fast profile's heading
+        titles are kept, and summaries only cover the node itself since its neighbours aren't enriched together.
+        """
+        llm = MetadataIngestionPipeline._build_llm(llm, llm_type, cache_llm_responses)
+        return [
+            KeywordExtractor(llm=llm, keywords=keywords, num_workers=num_workers),
+            SummaryExtractor(summaries=["self"], llm=llm, num_workers=num_workers),
+            QuestionsAnsweredExtractor(
+                questions=questions,
+                llm=llm,
+                metadata_mode=metadata_mode,
+                embedding_only=False,
+                num_workers=num_workers,
+            ),
+        ]
+
+    @staticmethod
+    def _build_llm(llm, llm_type, cache_llm_responses):
+        if llm is None:
+            if llm_type is None:
+                llm_type = LLmType.LLAMA_AZURE_OPENAI_GPT_35_TURBO
+            llm = AzureLlmBuilder().get_llm(llm_type)
+        extraction_config = load_config().get("MetadataExtraction") or {}
+        if cache_llm_responses and extraction_config.get("llm_cache_db_file"):
+            # Re-ingesting unchanged chunks is then served from the cache instead of the LLM
+            llm = CachedLLMPredictor(
+                llm=llm,
+                cache=get_llm_response_cache(
+                    extraction_config["llm_cache_db_file"],
+                    max_entries=extraction_config.get("llm_cache_max_entries", 200000),
+                ),
+            )
+        return llm
+
+    @staticmethod
+    def _assemble(
+        transformations, embed_model, vector_store, persist_dir, transformation_cache
+    ) -> IngestionPipeline:
+        if embed_model is not None:
+            transformations.append(embed_model)
+        pipeline = ReplaceAfterUpsertPipeline(
+            transformations=transformations,
+            vector_store=vector_store,
+            docstore=SimpleDocumentStore() if persist_dir else None,
+            docstore_strategy=DocstoreStrategy.UPSERTS,
+            disable_cache=not transformation_cache,
         )
+        if persist_dir and os.path.exists(os.path.join(persist_dir, DOCSTORE_FNAME)):
+            pipeline.load(persist_dir)
+        return pipeline
+
+    @staticmethod
+    def persist_pipeline(pipeline: IngestionPipeline, persist_dir: str):
+        """Save the pipeline's docstore and transformation cache so the next run can skip unchanged documents."""
+        os.makedirs(persist_dir, exist_ok=True)
+        pipeline.persist(persist_dir)
+
+    @staticmethod
+    async def adelete_stale_documents(pipeline: IngestionPipeline, documents) -> list:
+        """
+        Delete the documents of the files in documents that weren't loaded again, from the docstore and the
+        vector store, e.g. the pages past the end of a PDF that got shorter. Documents loaded with filename_as_id
+        are identified by their file path, suffixed with _part_<n> for readers returning a document per page.
+        Run it once documents have been ingested, so their files stay searchable until then.
+
+        :return: Ids of the deleted documents.
+        """
+        if pipeline.docstore is None:
+            return []
+        doc_ids = {doc.doc_id for doc in documents}
+        file_paths = {doc.metadata["file_path"] for doc in documents}
+        known_ids = (await pipeline.docstore.aget_all_document_hashes()).values()
+        stale_ids = [
+            doc_id
+            for doc_id in known_ids
+            if doc_id not in doc_ids
+            and (doc_id in file_paths or doc_id.rsplit("_part_", 1)[0] in file_paths)
+        ]
+        for doc_id in stale_ids:
+            await pipeline.docstore.adelete_ref_doc(doc_id, raise_error=False)
+            await pipeline.docstore.adelete_document(doc_id, raise_error=False)
+            if pipeline.vector_store is not None:
+                await pipeline.vector_store.adelete(doc_id)
+        return stale_ids
+
+    @staticmethod
+    def mark_for_reprocessing(pipeline: IngestionPipeline, doc_ids):
+        """
+        Make the next run treat doc_ids as changed even if their content isn't, so they are transformed again
+        and their existing points in the vector store are replaced once the new ones are upserted.
+        """
+        if pipeline.docstore is None:
+            return
+        for doc_id in doc_ids:
+            pipeline.docstore.set_document_hash(doc_id, STALE_DOCUMENT_HASH)
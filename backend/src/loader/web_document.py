@@ -1,21 +1,18 @@
 # Utilities
+import asyncio
 import logging
-from datetime import datetime
+import os
 import re
 
 # Primary Components
 from llama_index import (
     Document,
     StorageContext,
-    VectorStoreIndex,
     ServiceContext,
 )
 
-from langchain_community.document_loaders.recursive_url_loader import RecursiveUrlLoader
 from bs4 import BeautifulSoup as BeautifulSoup
 
-from markdownify import markdownify as md
-
 # from llama_index.text_splitter import CodeSplitter
 from llama_index.node_parser import MarkdownNodeParser
 from llama_index.callbacks import CallbackManager
@@ -27,9 +24,23 @@ from llama_index.vector_stores.qdrant import QdrantVectorStore
 
 # Custom modules
 from src.services.azure_llm_service import AzureLlmBuilder, LLmType
+from src.loader.crawler import AsyncWebCrawler, DEFAULT_USER_AGENT
+from src.loader.freshness_index import (
+    FreshnessIndex,
+    RefreshDecision,
+    RefreshPolicy,
+    get_freshness_index,
+)
+from src.loader.html_extraction import (
+    extract_page,
+    markdownify_extractor,
+    soup_metadata_extractor,
+)
+from src.loader.http_cache import get_http_cache
 from src.loader.metadata_extraction import MetadataIngestionPipeline
 from src.utils.config import load_config
 from src.utils.qdrant import QdrantManager
+from src.services.sparse_encoder import get_sparse_encoder, hybrid_vector_store_kwargs
 from src.utils.arize_phoenix import ArizePhoenix
 
 
@@ -41,73 +52,164 @@ class WebDocumentLoader:
         logging.basicConfig(
             level=logger_level, format="%(asctime)s - %(levelname)s - %(message)s"
         )
-        self.embed_model = AzureLlmBuilder().get_llm(LLmType.AZURE_EMBEDDINGS)
+        # A model of its own, the ServiceContext built by each load replaces its callback manager
+        self.embed_model = AzureLlmBuilder().get_llm(
+            LLmType.AZURE_EMBEDDINGS, shared=False
+        )
         self.qdrant = QdrantManager()
         self.phoenix_tracer = phoenix_tracer
 
         if not self.qdrant.collection_exists(collection_name):
             self.qdrant.create_collection(collection_name, 1536)
+            # Term statistics left over from a deleted collection of the same name
+            get_sparse_encoder().statistics.reset(collection_name)
 
         self.vector_store = QdrantVectorStore(
             client=self.qdrant.get_client(),
+            aclient=self.qdrant.get_async_client(),
             collection_name=self.collection_name,
             prefer_grpc=True,
+            **hybrid_vector_store_kwargs(self.qdrant, self.collection_name),
         )
+        ingestion_config = self.CONFIG.get("Ingestion") or {}
+        self.pipeline_persist_dir = os.path.join(
+            ingestion_config.get(
+                "pipeline_persist_dir", "/app/backend/cache/ingestion/"
+            ),
+            collection_name,
+            "web",
+        )
+        self.transformation_cache = ingestion_config.get("transformation_cache", False)
+        self.max_concurrent_documents = ingestion_config.get(
+            "web_max_concurrent_documents", 4
+        )
+        self.insert_batch_size = ingestion_config.get("web_insert_batch_size", 5)
         self.storage_context = StorageContext.from_defaults(
             vector_store=self.vector_store
         )
 
-    def _html_markdown_extractor(html: str):
-        strip_tags = ["script", "style"]
-        filtered_html = html
-        for tag in strip_tags:
-            filtered_html = re.sub(
-                rf"<{tag}.*?/{tag}>", "", filtered_html, flags=re.DOTALL
-            )
-        return md(filtered_html, strip=strip_tags)
-
     def _html_text_extractor(html: str):
         text = BeautifulSoup(html, "html.parser").text
         filtered_text = re.sub(r"[ \t]{3,}", " ", re.sub(r"\n{3,}", "\n\n\n", text))
         return filtered_text
 
-    def _html_metadata_extractor(html: str, url: str) -> dict:
-        """Extract metadata from raw html using BeautifulSoup."""
-        logging.debug(f"Extracting metadata from: {url}")
-        metadata = {"url": url}
-        soup = BeautifulSoup(html, "html.parser")
-        metadata["last_accessed_date"] = datetime.today().strftime("%Y-%m-%d")
-        if title := soup.find("title"):
-            metadata["title"] = title.get_text()
-        if keywords := soup.find("meta", attrs={"name": "keywords"}):
-            metadata["keywords"] = keywords.get("content", None)
-        if description := soup.find("meta", attrs={"name": "description"}):
-            metadata["description"] = description.get("content", None)
-        if html_lang := soup.find("html"):
-            metadata["language"] = html_lang.get("lang", None)
-            # if links := soup.find_all("a", href=True):
-            #     metadata["links"] = [
-            #         f"[{link.text}]({link['href']})" for link in links if link["href"] not in ["", "#", "./"]
-            #     ][0:20]
-        # metadata["links"] = extract_sub_links(
-        #     raw_html=html, url=url, prevent_outside=False
-        # )
-        return metadata
-
-    def load_documents(
+    def load_documents(self, url: str, **kwargs) -> list:
+        """
+        Synchronous wrapper around aload_documents, for callers that aren't running an event loop.
+        """
+        return asyncio.run(self.aload_documents(url, **kwargs))
+
+    def _freshness_index(self) -> FreshnessIndex:
+        ingestion_config = self.CONFIG.get("Ingestion") or {}
+        if not ingestion_config.get("web_index_db_file"):
+            return None
+        return get_freshness_index(
+            ingestion_config["web_index_db_file"],
+            policy=ingestion_config.get("web_refresh_policy", RefreshPolicy.CHANGE),
+            ttl_seconds=ingestion_config.get("web_refresh_ttl_hours", 24) * 3600,
+        )
+
+    def _refresh_decision(
+        self, freshness_index: FreshnessIndex, doc: Document, re_process: bool
+    ) -> RefreshDecision:
+        if re_process:
+            return RefreshDecision.REPLACE
+        if freshness_index is None:
+            # The pipeline's docstore still skips pages it has already ingested unchanged
+            return RefreshDecision.ADD
+        decision = freshness_index.decide(self.collection_name, doc.id_, doc.text)
+        if decision == RefreshDecision.ADD and self.qdrant.check_url_in_collection(
+            collection_name=self.collection_name, url=doc.id_
+        ):
+            # Loaded before the index existed, replace it so its old points don't stay as duplicates
+            return RefreshDecision.REPLACE
+        return decision
+
+    @staticmethod
+    def _page_to_document(page, extractor, metadata_extractor) -> Document:
+        if extractor is None and metadata_extractor is None:
+            # One lxml parse gives both the text and the metadata
+            text, metadata = extract_page(page.text, page.url)
+        else:
+            text = (extractor or markdownify_extractor)(page.text)
+            metadata = (metadata_extractor or soup_metadata_extractor)(
+                page.text, page.url
+            )
+        doc = Document(text=text, metadata=metadata)
+        # Page urls as document ids let the pipeline's docstore recognise a page it has already ingested
+        doc.id_ = page.url
+        return doc
+
+    async def _aingest_batch(self, pipeline, semaphore, batch) -> tuple:
+        """
+        Run a batch of documents through the pipeline, which embeds them and inserts their nodes into Qdrant
+        in one upsert. If the batch fails its documents are retried one at a time, so a single bad page
+        doesn't lose the rest of the batch.
+
+        :return: Tuple of the nodes inserted and the ids of the documents that failed.
+        """
+        async with semaphore:
+            try:
+                nodes = await pipeline.arun(documents=batch, in_place=False)
+                logging.debug(f"Nodes: {nodes}")
+                return nodes, []
+            except Exception as e:
+                # Nothing was recorded for the batch, its pages keep their old points and are retried
+                if len(batch) == 1:
+                    logging.error(
+                        f"Error running MetadataIngestionPipeline for {batch[0].id_}: {e}"
+                    )
+                    logging.error(type(e))
+                    logging.debug(batch[0])
+                    return [], [batch[0].id_]
+                logging.warning(
+                    f"Batch of {len(batch)} web documents failed, retrying one at a time: {e}"
+                )
+        results = await asyncio.gather(
+            *(self._aingest_batch(pipeline, semaphore, [doc]) for doc in batch)
+        )
+        return (
+            [node for nodes, _ in results for node in nodes],
+            [doc_id for _, failed in results for doc_id in failed],
+        )
+
+    async def aload_documents(
         self,
         url: str,
         # extractor=_html_text_extractor,
-        extractor=_html_markdown_extractor,
-        metadata_extractor=_html_metadata_extractor,
+        extractor=None,
+        metadata_extractor=None,
         max_depth: int = 1,
-        timeout: int = 2,
+        timeout: int = None,
         check_response_status: bool = True,
         max_documents: int = 5,
         re_process: bool = False,
         retry_failed_links: bool = False,
         retry_failed_embeddings: bool = True,
+        max_concurrent_documents: int = None,
+        insert_batch_size: int = None,
     ) -> list:
+        """
+        Crawl url and ingest the pages found into the collection.
+
+        :param extractor: Optional function turning a page's html into its text, e.g. _html_text_extractor.
+        :param metadata_extractor: Optional function returning the metadata of a page from its html and url.
+            When neither is given each page is parsed once by html_extraction.extract_page.
+        :param max_depth: Depth of links followed, 1 only loads url itself.
+        :param timeout: Seconds allowed per request, defaults to Crawler.timeout.
+        :param max_documents: Number of pages loaded before the crawl stops.
+        :param max_concurrent_documents: Number of document batches run through the pipeline at once,
+            defaults to Ingestion.web_max_concurrent_documents. 1 processes the batches one after another.
+        :param insert_batch_size: Number of documents embedded and inserted into Qdrant together,
+            defaults to Ingestion.web_insert_batch_size.
+        """
+        if max_concurrent_documents is None:
+            max_concurrent_documents = self.max_concurrent_documents
+        if insert_batch_size is None:
+            insert_batch_size = self.insert_batch_size
+        crawler_config = self.CONFIG.get("Crawler") or {}
+        if timeout is None:
+            timeout = crawler_config.get("timeout", 10)
         try:
             if self.phoenix_tracer is None:
                 callback_manager = None
@@ -121,8 +223,14 @@ class WebDocumentLoader:
                 callback_manager=callback_manager,
             )
 
+            http_cache = None
+            if crawler_config.get("http_cache_db_file"):
+                http_cache = get_http_cache(crawler_config["http_cache_db_file"])
+            freshness_index = self._freshness_index()
+
             try:
-                if not re_process:
+                # With an HTTP cache or a freshness index, a site that was loaded before is refreshed page by page
+                if not re_process and http_cache is None and freshness_index is None:
                     if self.qdrant.check_url_in_collection(
                         collection_name=self.collection_name, url=url
                     ):
@@ -137,47 +245,133 @@ class WebDocumentLoader:
                 #     max_chars=3000,  # max chars per chunk
                 # )
                 # pipeline = MetadataIngestionPipeline.build_pipeline(text_splitter=md_text_splitter)
+                # The pipeline embeds and upserts into Qdrant itself, re-loading a page replaces its points instead of appending
                 pipeline = MetadataIngestionPipeline.build_pipeline(
-                    text_splitter=MarkdownNodeParser()
-                )
-                index = VectorStoreIndex.from_vector_store(
-                    self.vector_store,
-                    storage_context=self.storage_context,
-                    service_context=service_context,
+                    text_splitter=MarkdownNodeParser(),
+                    vector_store=self.vector_store,
+                    embed_model=service_context.embed_model,
+                    persist_dir=self.pipeline_persist_dir,
+                    transformation_cache=self.transformation_cache,
                 )
-                loader = RecursiveUrlLoader(
-                    url=url,
+                crawler = AsyncWebCrawler(
                     max_depth=max_depth,
-                    extractor=extractor,
-                    metadata_extractor=metadata_extractor,
+                    max_documents=max_documents,
+                    max_concurrency=crawler_config.get("max_concurrency", 8),
+                    per_host_concurrency=crawler_config.get("per_host_concurrency", 2),
+                    per_host_requests_per_second=crawler_config.get(
+                        "per_host_requests_per_second"
+                    ),
                     timeout=timeout,
+                    user_agent=crawler_config.get("user_agent", DEFAULT_USER_AGENT),
+                    respect_robots_txt=crawler_config.get("respect_robots_txt", True),
                     prevent_outside=False,
                     check_response_status=check_response_status,
+                    http_cache=http_cache,
+                    conditional_requests=not re_process,
                 )
-                documents = loader.load()
-                llama_docs = [
-                    Document.from_langchain_format(doc)
-                    for doc in documents[0:max_documents]
-                ]
-                logging.debug("Web Documents: {llama_docs}")
-                for doc in llama_docs:
-                    logging.debug(f"loaded doc:{doc.metadata['url']} id:{doc.id_}")
-                    try:
-                        nodes = pipeline.run(
-                            documents=[doc],
-                            show_progress=True,
-                            in_place=False,
+                semaphore = asyncio.Semaphore(max_concurrent_documents)
+                ingest_tasks = []
+                batch = []
+                document_ids = set()
+                # Pages are only stored in the HTTP cache once they're ingested, so a page that was dropped or
+                # failed is downloaded in full by the next crawl instead of being answered 304
+                crawled_pages = {}
+                unchanged_pages = []
+                deferred_pages = 0
+                replaced_ids = set()
+
+                ingested_texts = {}
+
+                def submit_batch(batch):
+                    ingest_tasks.append(
+                        asyncio.create_task(
+                            self._aingest_batch(pipeline, semaphore, batch)
+                        )
+                    )
+
+                # Batches are ingested while the rest of the site is still being crawled
+                async for page in crawler.crawl(url):
+                    if not page.changed and not re_process:
+                        unchanged_pages.append(page)
+                        continue
+                    doc = await asyncio.to_thread(
+                        self._page_to_document, page, extractor, metadata_extractor
+                    )
+                    # Different urls can redirect to the same page, concurrent batches must not upsert it twice
+                    if doc.id_ in document_ids:
+                        continue
+                    document_ids.add(doc.id_)
+                    decision = await asyncio.to_thread(
+                        self._refresh_decision, freshness_index, doc, re_process
+                    )
+                    logging.debug(
+                        f"loaded doc:{doc.metadata['url']} id:{doc.id_} decision:{decision.value}"
+                    )
+                    if decision == RefreshDecision.SKIP:
+                        unchanged_pages.append(page)
+                        continue
+                    if decision == RefreshDecision.DEFER:
+                        # Not remembered, or the next crawl would get a 304 and never see the change
+                        deferred_pages += 1
+                        continue
+                    if decision == RefreshDecision.REPLACE:
+                        replaced_ids.add(doc.id_)
+                        MetadataIngestionPipeline.mark_for_reprocessing(
+                            pipeline, [doc.id_]
                         )
-                        logging.debug("Nodes: {nodes}")
-                        index.insert_nodes(nodes=nodes)
-                    except Exception as e:
-                        logging.error(f"Error running MetadataIngestionPipeline: {e}")
-                        logging.error(e)
-                        logging.error(e.args[0])
-                        logging.error(type(e))
-                        logging.debug(doc)
-                        pass
-                logging.info("Embedding generation completed")
+                    crawled_pages[doc.id_] = page
+                    ingested_texts[doc.id_] = doc.text
+                    batch.append(doc)
+                    if len(batch) >= insert_batch_size:
+                        submit_batch(batch)
+                        batch = []
+                if batch:
+                    submit_batch(batch)
+                results = await asyncio.gather(*ingest_tasks)
+                failed_ids = [doc_id for _, failed in results for doc_id in failed]
+                # Old points of replaced pages, including copies left by loads from before they were indexed, are
+                # only deleted once the new ones are in, so the pages stay searchable meanwhile
+                new_node_ids = {}
+                for nodes, _ in results:
+                    for node in nodes:
+                        new_node_ids.setdefault(node.ref_doc_id, []).append(
+                            node.node_id
+                        )
+                for doc_id in replaced_ids.difference(failed_ids):
+                    await asyncio.to_thread(
+                        self.qdrant.delete_url_points,
+                        self.collection_name,
+                        doc_id,
+                        keep_ids=new_node_ids.get(doc_id),
+                    )
+                await asyncio.to_thread(
+                    crawler.remember,
+                    unchanged_pages
+                    + [
+                        page
+                        for doc_id, page in crawled_pages.items()
+                        if doc_id not in failed_ids
+                    ],
+                )
+                if freshness_index is not None:
+                    await asyncio.to_thread(
+                        freshness_index.record,
+                        self.collection_name,
+                        {
+                            doc_id: text
+                            for doc_id, text in ingested_texts.items()
+                            if doc_id not in failed_ids
+                        },
+                    )
+                await asyncio.to_thread(
+                    MetadataIngestionPipeline.persist_pipeline,
+                    pipeline,
+                    self.pipeline_persist_dir,
+                )
+                logging.info(
+                    f"Embedding generation completed, {sum(len(nodes) for nodes, _ in results)} nodes from {len(ingested_texts)} documents, "
+                    f"{len(unchanged_pages)} unchanged, {deferred_pages} deferred, {len(failed_ids)} failed"
+                )
                 return True
                 # response = self.search_documents(url=url)
                 # return response
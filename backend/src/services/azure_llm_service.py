@@ -1,15 +1,30 @@
 import os
+import threading
 from enum import Enum
 
-import openai
-from langchain_openai import AzureChatOpenAI, AzureOpenAI, AzureOpenAIEmbeddings
-from llama_index.embeddings import LangchainEmbedding
-from llama_index.llms import AzureOpenAI as LlamaAzureOpenAI
+from langchain_openai import AzureChatOpenAI, AzureOpenAI
 
+from src.services.embedding_cache import get_embedding_cache
+from src.services.embedding_service import BatchedAzureEmbedding
+from src.services.llm_clients import (
+    SharedClientAzureOpenAI,
+    get_http_client,
+    use_shared_http_client,
+)
 from src.utils.config import load_config
 
 # https://learn.microsoft.com/en-us/azure/ai-services/openai/how-to/switching-endpoints
 
+# Models built by get_llm(), shared by the whole process so their HTTP connections stay open between requests.
+_llm_instances = {}
+_llm_instances_lock = threading.Lock()
+
+
+def clear_llm_instances():
+    """Drop the shared models, e.g. after the API key or config changed. The next get_llm() calls build new ones."""
+    with _llm_instances_lock:
+        _llm_instances.clear()
+
 
 class LLmType(Enum):
     AZURE_OPENAI_GPT4 = "azure_openai_gpt4"
@@ -41,9 +56,31 @@ class AzureLlmBuilder:
         llm_type: LLmType = LLmType.AZURE_OPENAI_GPT4,
         temperature: int = 0,
         max_tokens: int = 512,
+        shared: bool = True,
     ):
+        """
+        Return the model for llm_type. Models are built once per (llm_type, temperature, max_tokens) and reused by
+        every caller, so chat steps, searches and ingestion don't pay a new TLS handshake each time.
+
+        :param llm_type: The model to return.
+        :param temperature: Sampling temperature, only used by AZURE_OPENAI_GPT_35_TURBO.
+        :param max_tokens: Maximum tokens to generate, only used by AZURE_OPENAI_GPT_35_TURBO.
+        :param shared: False always builds a new model, for callers that change its attributes. Passing a model to
+            ServiceContext.from_defaults is one, it sets the context's callback manager on the model.
+        """
+        if not shared:
+            return self._build_llm(llm_type, temperature, max_tokens)
+        key = (LLmType(llm_type), temperature, max_tokens)
+        with _llm_instances_lock:
+            llm = _llm_instances.get(key)
+            if llm is None:
+                llm = self._build_llm(llm_type, temperature, max_tokens)
+                _llm_instances[key] = llm
+            return llm
+
+    def _build_llm(self, llm_type: LLmType, temperature: int, max_tokens: int):
         if llm_type == LLmType.AZURE_OPENAI_GPT_35_TURBO:
-            return AzureOpenAI(
+            llm = AzureOpenAI(
                 model=self.CONFIG["OpenAI"]["text_summary_model"],
                 openai_api_version=self.CONFIG["OpenAI"]["openai_api_version"],
                 # openai_api_base=self.openai_api_base,
@@ -53,9 +90,10 @@ class AzureLlmBuilder:
                 temperature=temperature,
                 max_tokens=max_tokens,
             )
+            return use_shared_http_client(llm)
 
         elif llm_type == LLmType.AZURE_OPENAI_GPT4:
-            return AzureChatOpenAI(
+            llm = AzureChatOpenAI(
                 model=self.CONFIG["OpenAI"]["model"],
                 azure_endpoint=self.azure_endpoint,
                 openai_api_key=self.azure_openai_api_key,
@@ -64,8 +102,9 @@ class AzureLlmBuilder:
                 deployment_name=self.CONFIG["OpenAI"]["deployment_name"],
                 model_version=self.CONFIG["OpenAI"]["model_version"],
             )
+            return use_shared_http_client(llm)
         elif llm_type == LLmType.AZURE_OPENAI_GPT4_32K:
-            return AzureChatOpenAI(
+            llm = AzureChatOpenAI(
                 model=self.CONFIG["OpenAI"]["model_32k"],
                 azure_endpoint=self.azure_endpoint,
                 openai_api_key=self.azure_openai_api_key,
@@ -74,8 +113,9 @@ class AzureLlmBuilder:
                 deployment_name=self.CONFIG["OpenAI"]["deployment_name_32k"],
                 model_version=self.CONFIG["OpenAI"]["model_version"],
             )
+            return use_shared_http_client(llm)
         if llm_type == LLmType.LLAMA_AZURE_OPENAI_GPT_35_TURBO:
-            return LlamaAzureOpenAI(
+            return SharedClientAzureOpenAI(
                 model=self.CONFIG["OpenAI"]["text_summary_model"],
                 azure_endpoint=self.CONFIG["OpenAI"]["openai_api_base"],
                 api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
@@ -83,7 +123,7 @@ class AzureLlmBuilder:
                 api_version=self.CONFIG["OpenAI"]["openai_api_version"],
             )
         elif llm_type == LLmType.LLAMA_AZURE_OPENAI_GPT4:
-            return LlamaAzureOpenAI(
+            return SharedClientAzureOpenAI(
                 model=self.CONFIG["OpenAI"]["model"],
                 azure_endpoint=self.CONFIG["OpenAI"]["openai_api_base"],
                 api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
@@ -91,7 +131,7 @@ class AzureLlmBuilder:
                 api_version=self.CONFIG["OpenAI"]["openai_api_version"],
             )
         elif llm_type == LLmType.LLAMA_AZURE_OPENAI_GPT4_32K:
-            return LlamaAzureOpenAI(
+            return SharedClientAzureOpenAI(
                 model=self.CONFIG["OpenAI"]["model_32k"],
                 azure_endpoint=self.CONFIG["OpenAI"]["openai_api_base"],
                 api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
@@ -102,23 +142,36 @@ class AzureLlmBuilder:
             llm_type == LLmType.AZURE_EMBEDDINGS
             or llm_type == LLmType.TEXT_EMBEDDING_ADA_002
         ):
-            # Only for Azure OpenAI Embeddings we must rely on openai.api_key
-            # Docs say that we should be able to pass the key as a parameter, but it doesn't work
-            # https://api.python.langchain.com/en/latest/embeddings/langchain.embeddings.openai.OpenAIEmbeddings.html?highlight=azureopenai
-            # ToDo: Fix this so we can specify the key as a parameter like in other llm types.
-            # For now this doesn't break anything, but if we want to support multiple llm services in the future this will be a problem
-            # Langchain issue related: https://github.com/langchain-ai/langchain/issues/12959
-            openai.api_key = self.azure_openai_api_key
-
-            embeddings = AzureOpenAIEmbeddings(
+            embedding_config = self.CONFIG.get("Embeddings") or {}
+            cache = None
+            if embedding_config.get("cache_db_file"):
+                cache = get_embedding_cache(
+                    embedding_config["cache_db_file"],
+                    max_entries=embedding_config.get("cache_max_entries", 100000),
+                )
+            return BatchedAzureEmbedding(
                 azure_endpoint=self.azure_endpoint,
-                azure_deployment=self.CONFIG["OpenAI"][
+                api_key=self.azure_openai_api_key,
+                api_version=self.CONFIG["OpenAI"]["openai_api_version"],
+                deployment_name=self.CONFIG["OpenAI"][
                     "embedding_model_deployment_name"
                 ],
-                openai_api_version=self.CONFIG["OpenAI"]["openai_api_version"],
-                openai_api_key=self.azure_openai_api_key,
+                model_name=self.CONFIG["OpenAI"]["embedding_model_name"],
+                max_batch_tokens=embedding_config.get("max_batch_tokens", 64000),
+                initial_batch_size=embedding_config.get("initial_batch_size", 64),
+                min_batch_size=embedding_config.get("min_batch_size", 1),
+                max_batch_size=embedding_config.get("max_batch_size", 2048),
+                max_concurrent_requests=embedding_config.get(
+                    "max_concurrent_requests", 4
+                ),
+                requests_per_minute=embedding_config.get("requests_per_minute"),
+                target_latency_seconds=embedding_config.get(
+                    "target_latency_seconds", 10.0
+                ),
+                max_retries=embedding_config.get("max_retries", 6),
+                cache=cache,
+                http_client=get_http_client(),
             )
-            return LangchainEmbedding(embeddings)
 
         else:
             raise ValueError(f"Invalid Azure llm_type: {llm_type}")
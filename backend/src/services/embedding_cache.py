@@ -0,0 +1,160 @@
+# /src/services/embedding_cache.py
+# Content addressed cache of embeddings, so re-processing a collection, reloading a web page or repeating a question
+# doesn't send the same text to the embeddings deployment again.
+
+# Utilities
+import hashlib
+import logging
+import os
+import threading
+import time
+from array import array
+
+# Primary Components
+import sqlite3
+
+# Number of hashes sent to SQLite per query, stays well below SQLITE_MAX_VARIABLE_NUMBER
+QUERY_CHUNK_SIZE = 500
+
+_embedding_caches = {}
+_embedding_caches_lock = threading.Lock()
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so texts that only differ in spacing share an embedding."""
+    return " ".join(text.split())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite backed embedding cache keyed by (deployment name, normalized text hash).
+
+    Embeddings are stored as float32 blobs. Once the cache holds more than max_entries, the least recently
+    used entries are evicted. Hit and miss counts are kept for the life of the process.
+    Use get_embedding_cache() rather than creating instances directly so connections are shared.
+    """
+
+    def __init__(self, db_file: str, max_entries: int = 100000):
+        """
+        :param db_file: Path of the SQLite database file, its directory is created if it doesn't exist.
+        :param max_entries: Number of embeddings kept before the least recently used are evicted.
+        """
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (deployment TEXT, text_hash TEXT, embedding BLOB, last_used REAL, PRIMARY KEY (deployment, text_hash))"""
+            )
+            self._conn.execute(
+                """CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"""
+            )
+
+    def get_many(self, deployment: str, texts):
+        """
+        Look up cached embeddings for many texts at once.
+
+        :param deployment: Embedding deployment the embeddings were created with.
+        :param texts: List of texts.
+        :return: List the same length as texts, with the cached embedding or None for each text.
+        """
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        now = time.time()
+        with self._lock, self._conn:
+            unique_hashes = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique_hashes), QUERY_CHUNK_SIZE):
+                chunk = unique_hashes[i : i + QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, embedding FROM embeddings WHERE deployment = ? AND text_hash IN ({placeholders})",
+                    [deployment, *chunk],
+                )
+                for hash_value, blob in rows:
+                    found[hash_value] = array("f", blob).tolist()
+            # Bump last_used so entries still in use are evicted last
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE deployment = ? AND text_hash = ?",
+                [(now, deployment, hash_value) for hash_value in found],
+            )
+            embeddings = [found.get(hash_value) for hash_value in hashes]
+            hits = sum(1 for embedding in embeddings if embedding is not None)
+            self.hits += hits
+            self.misses += len(embeddings) - hits
+        return embeddings
+
+    def put_many(self, deployment: str, texts, embeddings):
+        """
+        Store embeddings for many texts in a single transaction, then evict old entries if over max_entries.
+
+        :param deployment: Embedding deployment the embeddings were created with.
+        :param texts: List of texts.
+        :param embeddings: List of embeddings, in the same order as texts.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (deployment, text_hash, embedding, last_used) VALUES (?, ?, ?, ?)",
+                [
+                    (deployment, text_hash(text), array("f", embedding).tobytes(), now)
+                    for text, embedding in zip(texts, embeddings)
+                ],
+            )
+            self._evict()
+
+    def _evict(self):
+        (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = entries - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            logging.info(f"Evicted {overflow} cached embeddings")
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_embedding_cache(db_file: str, max_entries: int = 100000) -> EmbeddingCache:
+    """
+    Return the shared EmbeddingCache for db_file, opening it on first use.
+    """
+    with _embedding_caches_lock:
+        cache = _embedding_caches.get(db_file)
+        if cache is None:
+            cache = EmbeddingCache(db_file, max_entries=max_entries)
+            _embedding_caches[db_file] = cache
+        return cache
+
+
+def get_embedding_cache_stats() -> dict:
+    """Hit and miss counters of every embedding cache opened by this process, keyed by database file."""
+    with _embedding_caches_lock:
+        caches = list(_embedding_caches.items())
+    return {db_file: cache.stats() for db_file, cache in caches}
@@ -0,0 +1,430 @@
+# /src/services/embedding_service.py
+# Embedding model used for ingestion and search. Node texts are packed into token bounded batches that are sent
+# several at a time under a request rate limit, and the batch size adapts to 429s and latency from the deployment.
+
+# Utilities
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+# Primary Components
+import openai
+import httpx
+from openai import AsyncAzureOpenAI, AzureOpenAI
+from llama_index.bridge.pydantic import Field, PrivateAttr
+from llama_index.callbacks import CBEventType, EventPayload
+from llama_index.embeddings import BaseEmbedding
+from llama_index.utils import get_tokenizer
+
+# Custom modules
+from src.services.embedding_cache import EmbeddingCache
+from src.services.llm_clients import LoopLocalClients
+
+# Errors that mean the deployment is overloaded and smaller batches should be sent
+BACKOFF_ERRORS = (openai.RateLimitError, openai.APITimeoutError)
+# Errors that are worth retrying as-is
+RETRYABLE_ERRORS = BACKOFF_ERRORS + (
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+MAX_RETRY_DELAY_SECONDS = 60
+
+
+class AdaptiveBatchSize:
+    """
+    Number of texts to send per embedding request, shrunk on 429s and slow responses and grown while requests stay fast.
+    """
+
+    def __init__(
+        self,
+        initial: int = 64,
+        minimum: int = 1,
+        maximum: int = 2048,
+        target_latency_seconds: float = 10.0,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.target_latency_seconds = target_latency_seconds
+        self._size = min(self.maximum, max(self.minimum, initial))
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def on_backoff(self):
+        with self._lock:
+            self._size = max(self.minimum, self._size // 2)
+            logging.info(f"Embedding batch size reduced to {self._size}")
+
+    def on_success(self, latency_seconds: float):
+        with self._lock:
+            if latency_seconds > self.target_latency_seconds:
+                self._size = max(self.minimum, int(self._size * 0.75))
+            else:
+                self._size = min(self.maximum, self._size + max(1, self._size // 4))
+
+
+class RequestRateLimiter:
+    """
+    Spaces requests evenly so no more than requests_per_minute are started, shared by threads and coroutines.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None):
+        self.interval = 60 / requests_per_minute if requests_per_minute else 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Reserve the next request slot and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            return slot - now
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class _BatchCursor:
+    """Hands out consecutive slices of texts, bounded by both a text count and a token count."""
+
+    def __init__(self, token_counts: List[int]):
+        self.token_counts = token_counts
+        self.position = 0
+        self._lock = threading.Lock()
+
+    def take(self, batch_size: int, max_batch_tokens: int):
+        with self._lock:
+            start = self.position
+            if start >= len(self.token_counts):
+                return None
+            end, batch_tokens = start, 0
+            while end < len(self.token_counts) and end - start < batch_size:
+                # A text bigger than max_batch_tokens is still sent, on its own
+                if (
+                    end > start
+                    and batch_tokens + self.token_counts[end] > max_batch_tokens
+                ):
+                    break
+                batch_tokens += self.token_counts[end]
+                end += 1
+            self.position = end
+            return start, end
+
+
+class BatchedAzureEmbedding(BaseEmbedding):
+    """
+    Azure OpenAI embeddings with token bounded batching, concurrent requests, rate limiting and adaptive batch sizes.
+    """
+
+    deployment_name: str = Field(description="The Azure embedding deployment to use.")
+    max_batch_tokens: int = Field(
+        default=64000, description="Maximum tokens sent in a single request."
+    )
+    max_concurrent_requests: int = Field(
+        default=4, description="Number of requests in flight at once."
+    )
+    max_retries: int = Field(
+        default=6,
+        description="Retries for a batch on rate limits and transient errors.",
+    )
+
+    _client: AzureOpenAI = PrivateAttr()
+    _aclients: LoopLocalClients = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+    _batch_size: AdaptiveBatchSize = PrivateAttr()
+    _rate_limiter: RequestRateLimiter = PrivateAttr()
+    _cache: Optional[EmbeddingCache] = PrivateAttr()
+
+    def __init__(
+        self,
+        azure_endpoint: str,
+        api_key: str,
+        api_version: str,
+        deployment_name: str,
+        model_name: str = "text-embedding-ada-002",
+        max_batch_tokens: int = 64000,
+        initial_batch_size: int = 64,
+        min_batch_size: int = 1,
+        max_batch_size: int = 2048,
+        max_concurrent_requests: int = 4,
+        requests_per_minute: Optional[int] = None,
+        target_latency_seconds: float = 10.0,
+        max_retries: int = 6,
+        cache: Optional[EmbeddingCache] = None,
+        http_client: Optional[httpx.Client] = None,
+        **kwargs: Any,
+    ):
+        """
+        :param azure_endpoint: Azure OpenAI endpoint.
+        :param api_key: Azure OpenAI API key.
+        :param api_version: Azure OpenAI API version.
+        :param deployment_name: Embedding deployment to send requests to.
+        :param model_name: Name of the embedding model, used for tracing.
+        :param max_batch_tokens: Maximum tokens sent in a single request.
+        :param initial_batch_size: Texts per request to start with, adapted as responses come back.
+        :param min_batch_size: Smallest batch size backoff can shrink to.
+        :param max_batch_size: Largest batch size fast responses can grow to.
+        :param max_concurrent_requests: Number of requests in flight at once.
+        :param requests_per_minute: Optional cap on requests started per minute, None for no cap.
+        :param target_latency_seconds: Responses slower than this shrink the batch size.
+        :param max_retries: Retries for a batch on rate limits and transient errors.
+        :param cache: Optional EmbeddingCache checked before any text is sent to the deployment.
+        :param http_client: Optional httpx.Client for synchronous requests, e.g. one shared with other models so
+            connections are kept alive between them. Async requests use a client per event loop.
+        """
+        super().__init__(
+            model_name=model_name,
+            deployment_name=deployment_name,
+            embed_batch_size=min(max_batch_size, 2048),
+            max_batch_tokens=max_batch_tokens,
+            max_concurrent_requests=max(1, max_concurrent_requests),
+            max_retries=max_retries,
+            **kwargs,
+        )
+        # Retries are handled here so rate limits can feed back into the batch size
+        self._client = AzureOpenAI(
+            azure_endpoint=azure_endpoint,
+            api_key=api_key,
+            api_version=api_version,
+            max_retries=0,
+            http_client=http_client,
+        )
+        self._aclients = LoopLocalClients(
+            lambda: AsyncAzureOpenAI(
+                azure_endpoint=azure_endpoint,
+                api_key=api_key,
+                api_version=api_version,
+                max_retries=0,
+            )
+        )
+        self._tokenizer = get_tokenizer()
+        self._batch_size = AdaptiveBatchSize(
+            initial=initial_batch_size,
+            minimum=min_batch_size,
+            maximum=min(max_batch_size, 2048),
+            target_latency_seconds=target_latency_seconds,
+        )
+        self._rate_limiter = RequestRateLimiter(requests_per_minute)
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BatchedAzureEmbedding"
+
+    @property
+    def batch_size(self) -> int:
+        """The current adaptive batch size."""
+        return self._batch_size.size
+
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        return self._cache
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response else None
+        try:
+            return min(MAX_RETRY_DELAY_SECONDS, float(retry_after))
+        except (TypeError, ValueError):
+            return min(MAX_RETRY_DELAY_SECONDS, 2**attempt)
+
+    def _on_error(self, error: Exception, attempt: int) -> float:
+        """Record a failed request and return how long to wait before retrying it."""
+        if attempt >= self.max_retries:
+            logging.error(
+                f"Embedding request failed after {attempt + 1} attempts: {error}"
+            )
+            raise error
+        if isinstance(error, BACKOFF_ERRORS):
+            self._batch_size.on_backoff()
+        delay = self._retry_delay(error, attempt)
+        logging.warning(f"Embedding request failed, retrying in {delay}s: {error}")
+        return delay
+
+    @staticmethod
+    def _prepare(texts: List[str]) -> List[str]:
+        # The API rejects empty inputs
+        return [text if text else " " for text in texts]
+
+    @staticmethod
+    def _embeddings_from_response(response) -> List[List[float]]:
+        return [data.embedding for data in sorted(response.data, key=lambda d: d.index)]
+
+    def _embed_request(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self._rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self._client.embeddings.create(
+                    input=self._prepare(texts), model=self.deployment_name
+                )
+            except RETRYABLE_ERRORS as e:
+                time.sleep(self._on_error(e, attempt))
+                attempt += 1
+                continue
+            self._batch_size.on_success(time.monotonic() - started)
+            return self._embeddings_from_response(response)
+
+    async def _aembed_request(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            await self._rate_limiter.aacquire()
+            started = time.monotonic()
+            try:
+                response = await self._async_client().embeddings.create(
+                    input=self._prepare(texts), model=self.deployment_name
+                )
+            except RETRYABLE_ERRORS as e:
+                await asyncio.sleep(self._on_error(e, attempt))
+                attempt += 1
+                continue
+            self._batch_size.on_success(time.monotonic() - started)
+            return self._embeddings_from_response(response)
+
+    def _async_client(self) -> AsyncAzureOpenAI:
+        # The instance is shared across event loops, and async connections can't outlive the loop that opened them
+        return self._aclients.get()
+
+    def _cursor(self, texts: List[str]) -> _BatchCursor:
+        return _BatchCursor([len(self._tokenizer(text)) for text in texts])
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        embeddings = [None] * len(texts)
+        cursor = self._cursor(texts)
+
+        def worker():
+            # Each batch is sized when it is taken, so later batches pick up the adapted batch size
+            while (
+                span := cursor.take(self.batch_size, self.max_batch_tokens)
+            ) is not None:
+                start, end = span
+                embeddings[start:end] = self._embed_request(texts[start:end])
+
+        workers = min(self.max_concurrent_requests, len(texts))
+        if workers <= 1:
+            worker()
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(worker) for _ in range(workers)]:
+                    future.result()
+        return embeddings
+
+    async def _aembed_uncached(self, texts: List[str]) -> List[List[float]]:
+        embeddings = [None] * len(texts)
+        cursor = self._cursor(texts)
+
+        async def worker():
+            while (
+                span := cursor.take(self.batch_size, self.max_batch_tokens)
+            ) is not None:
+                start, end = span
+                embeddings[start:end] = await self._aembed_request(texts[start:end])
+
+        workers = min(self.max_concurrent_requests, len(texts))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return embeddings
+
+    @staticmethod
+    def _missing(embeddings) -> List[int]:
+        return [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+    def _embed_all(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, serving whatever the cache already has and only sending the rest to the deployment."""
+        if self._cache is None:
+            return self._embed_uncached(texts)
+        embeddings = self._cache.get_many(self.deployment_name, texts)
+        if missing := self._missing(embeddings):
+            missing_texts = [texts[i] for i in missing]
+            new_embeddings = self._embed_uncached(missing_texts)
+            self._cache.put_many(self.deployment_name, missing_texts, new_embeddings)
+            for i, embedding in zip(missing, new_embeddings):
+                embeddings[i] = embedding
+        return embeddings
+
+    async def _aembed_all(self, texts: List[str]) -> List[List[float]]:
+        if self._cache is None:
+            return await self._aembed_uncached(texts)
+        embeddings = await asyncio.to_thread(
+            self._cache.get_many, self.deployment_name, texts
+        )
+        if missing := self._missing(embeddings):
+            missing_texts = [texts[i] for i in missing]
+            new_embeddings = await self._aembed_uncached(missing_texts)
+            await asyncio.to_thread(
+                self._cache.put_many,
+                self.deployment_name,
+                missing_texts,
+                new_embeddings,
+            )
+            for i, embedding in zip(missing, new_embeddings):
+                embeddings[i] = embedding
+        return embeddings
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed_all([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return (await self._aembed_all([query]))[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed_all([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aembed_all([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_all(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed_all(texts)
+
+    def get_text_embedding_batch(
+        self, texts: List[str], show_progress: bool = False, **kwargs: Any
+    ) -> List[List[float]]:
+        """Embed texts using token bounded, concurrent batches instead of fixed size sequential ones."""
+        if not texts:
+            return []
+        with self.callback_manager.event(
+            CBEventType.EMBEDDING, payload={EventPayload.SERIALIZED: self.to_dict()}
+        ) as event:
+            embeddings = self._embed_all(texts)
+            event.on_end(
+                payload={
+                    EventPayload.CHUNKS: texts,
+                    EventPayload.EMBEDDINGS: embeddings,
+                },
+            )
+        return embeddings
+
+    async def aget_text_embedding_batch(
+        self, texts: List[str], show_progress: bool = False
+    ) -> List[List[float]]:
+        """Asynchronously embed texts using token bounded, concurrent batches."""
+        if not texts:
+            return []
+        with self.callback_manager.event(
+            CBEventType.EMBEDDING, payload={EventPayload.SERIALIZED: self.to_dict()}
+        ) as event:
+            embeddings = await self._aembed_all(texts)
+            event.on_end(
+                payload={
+                    EventPayload.CHUNKS: texts,
+                    EventPayload.EMBEDDINGS: embeddings,
+                },
+            )
+        return embeddings
@@ -0,0 +1,123 @@
+# /src/services/llm_clients.py
+# HTTP clients shared by the LLM and embedding models built by AzureLlmBuilder, so requests to Azure OpenAI reuse
+# keep-alive connections instead of opening a new TLS connection for every model instance.
+
+# Utilities
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable
+
+# Primary Components
+import httpx
+from openai import AsyncAzureOpenAI, AzureOpenAI
+from openai.resources import Completions
+from llama_index.bridge.pydantic import PrivateAttr
+from llama_index.llms import AzureOpenAI as LlamaAzureOpenAI
+
+# Custom modules
+from src.utils.config import load_config
+
+# Global variable to store the shared HTTP client instance.
+_http_client_instance = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Return the process-wide httpx.Client used for synchronous requests to Azure OpenAI, creating it on first use.
+
+    Async clients aren't shared here because their connections belong to the event loop that opened them.
+    """
+    global _http_client_instance
+    with _http_client_lock:
+        if _http_client_instance is None:
+            http_config = load_config().get("OpenAI") or {}
+            _http_client_instance = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=http_config.get("http_max_connections", 20),
+                    max_keepalive_connections=http_config.get(
+                        "http_max_keepalive_connections", 20
+                    ),
+                    keepalive_expiry=http_config.get("http_keepalive_expiry", 60),
+                ),
+                # Requests made by the openai clients set their own timeout
+                timeout=httpx.Timeout(60.0, connect=10.0),
+            )
+        return _http_client_instance
+
+
+def close_http_client():
+    """Close the shared HTTP client, the next get_http_client() call opens a new one."""
+    global _http_client_instance
+    with _http_client_lock:
+        if _http_client_instance is not None:
+            _http_client_instance.close()
+            _http_client_instance = None
+
+
+def use_shared_http_client(llm):
+    """
+    Send a langchain_openai AzureChatOpenAI or AzureOpenAI model's synchronous requests over the shared HTTP client.
+
+    langchain_openai hands its http_client to both the sync and the async openai client, and the async one only
+    accepts an httpx.AsyncClient, so the shared client can't be passed when the model is built. Its async client
+    keeps connections of its own.
+    """
+    # llm.client is the completions resource of an openai client, chat.completions for chat models
+    openai_client = llm.client._client.copy(http_client=get_http_client())
+    if isinstance(llm.client, Completions):
+        llm.client = openai_client.completions
+    else:
+        llm.client = openai_client.chat.completions
+    return llm
+
+
+class LoopLocalClients:
+    """
+    One async client per event loop, created by factory on first use in each loop.
+    Clients are dropped together with their loop.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = self.factory()
+                self._clients[loop] = client
+            return client
+
+
+class SharedClientAzureOpenAI(LlamaAzureOpenAI):
+    """
+    llama_index AzureOpenAI LLM that sends synchronous requests over the shared HTTP client, and keeps one async
+    client per event loop so a shared instance can also be used from asyncio.run() calls in worker threads.
+    """
+
+    _aclients: LoopLocalClients = PrivateAttr()
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._aclients = LoopLocalClients(
+            lambda: AsyncAzureOpenAI(**self._get_credential_kwargs())
+        )
+
+    def _get_client(self) -> AzureOpenAI:
+        if self._client is None:
+            self._client = AzureOpenAI(
+                **self._get_credential_kwargs(http_client=get_http_client())
+            )
+        return self._client
+
+    def _get_aclient(self) -> AsyncAzureOpenAI:
+        return self._aclients.get()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "azure_openai_llm"
@@ -0,0 +1,176 @@
+# /src/services/llm_response_cache.py
+# Persistent cache of LLM responses for the metadata extractors. Title, keyword, summary and question extraction make
+# several calls per node, re-ingesting unchanged chunks should be served from here instead of the deployment.
+
+# Utilities
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional
+
+# Primary Components
+import sqlite3
+from llama_index.bridge.pydantic import PrivateAttr
+from llama_index.llm_predictor import LLMPredictor
+from llama_index.prompts import BasePromptTemplate
+
+_response_caches = {}
+_response_caches_lock = threading.Lock()
+
+
+class LLMResponseCache:
+    """
+    SQLite backed cache of LLM responses keyed by a hash of the model, its parameters, the prompt template and the
+    prompt arguments. Least recently used entries are evicted once the cache holds more than max_entries.
+    Use get_llm_response_cache() rather than creating instances directly so connections are shared.
+    """
+
+    def __init__(self, db_file: str, max_entries: int = 200000):
+        """
+        :param db_file: Path of the SQLite database file, its directory is created if it doesn't exist.
+        :param max_entries: Number of responses kept before the least recently used are evicted.
+        """
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_responses (cache_key TEXT PRIMARY KEY, response TEXT, last_used REAL)"""
+            )
+            self._conn.execute(
+                """CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used)"""
+            )
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Hash everything that determines an LLM response into a cache key."""
+        return hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[str]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response FROM llm_responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE llm_responses SET last_used = ? WHERE cache_key = ?",
+                (time.time(), cache_key),
+            )
+            return row[0]
+
+    def put(self, cache_key: str, response: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (cache_key, response, last_used) VALUES (?, ?, ?)",
+                (cache_key, response, time.time()),
+            )
+            (entries,) = self._conn.execute(
+                "SELECT COUNT(*) FROM llm_responses"
+            ).fetchone()
+            overflow = entries - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_responses WHERE rowid IN (SELECT rowid FROM llm_responses ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_llm_response_cache(db_file: str, max_entries: int = 200000) -> LLMResponseCache:
+    """
+    Return the shared LLMResponseCache for db_file, opening it on first use.
+    """
+    with _response_caches_lock:
+        cache = _response_caches.get(db_file)
+        if cache is None:
+            cache = LLMResponseCache(db_file, max_entries=max_entries)
+            _response_caches[db_file] = cache
+        return cache
+
+
+class CachedLLMPredictor(LLMPredictor):
+    """
+    LLMPredictor that serves repeated prompts from an LLMResponseCache.
+
+    The metadata extractors call llm.apredict(template, **prompt_args), so keying on the model, its sampling
+    parameters, the template and the prompt arguments (the node text plus any metadata the extractor includes)
+    means an extractor is only re-run when what it would send to the model actually changed.
+    """
+
+    _cache: LLMResponseCache = PrivateAttr()
+
+    def __init__(self, llm, cache: LLMResponseCache, **kwargs: Any):
+        """
+        :param llm: The LLM to call on a cache miss.
+        :param cache: Where responses are stored.
+        """
+        super().__init__(llm=llm, **kwargs)
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedLLMPredictor"
+
+    def _cache_key(self, prompt: BasePromptTemplate, prompt_args: dict) -> str:
+        return LLMResponseCache.make_key(
+            # Azure models are identified by their deployment
+            model=getattr(self._llm, "engine", None) or self._llm.metadata.model_name,
+            temperature=getattr(self._llm, "temperature", None),
+            max_tokens=getattr(self._llm, "max_tokens", None),
+            system_prompt=self.system_prompt,
+            template=prompt.get_template(llm=self._llm),
+            prompt_args=prompt_args,
+        )
+
+    def predict(
+        self, prompt: BasePromptTemplate, output_cls=None, **prompt_args: Any
+    ) -> str:
+        if output_cls is not None:
+            return super().predict(prompt, output_cls=output_cls, **prompt_args)
+        cache_key = self._cache_key(prompt, prompt_args)
+        response = self._cache.get(cache_key)
+        if response is None:
+            response = super().predict(prompt, **prompt_args)
+            self._cache.put(cache_key, response)
+        return response
+
+    async def apredict(
+        self, prompt: BasePromptTemplate, output_cls=None, **prompt_args: Any
+    ) -> str:
+        if output_cls is not None:
+            return await super().apredict(prompt, output_cls=output_cls, **prompt_args)
+        cache_key = self._cache_key(prompt, prompt_args)
+        # SQLite reads and writes block, the extractors run many predictions concurrently on the event loop
+        response = await asyncio.to_thread(self._cache.get, cache_key)
+        if response is None:
+            logging.debug(f"LLM response cache miss: {cache_key}")
+            response = await super().apredict(prompt, **prompt_args)
+            await asyncio.to_thread(self._cache.put, cache_key, response)
+        return response
@@ -0,0 +1,239 @@
+# /src/services/sparse_encoder.py
+# Local BM25 sparse vectors for hybrid search. Nodes are encoded at ingestion with their term frequencies, queries
+# with the inverse document frequency of their terms, so the dot product Qdrant computes between them is BM25.
+
+# Utilities
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+from functools import partial
+from typing import List, Tuple
+
+# Primary Components
+import sqlite3
+
+# Custom modules
+from src.utils.config import load_config
+from src.utils.lexical import tokenize
+
+# Global variable to store the sparse encoder instance.
+_sparse_encoder_instance = None
+_sparse_encoder_lock = threading.Lock()
+
+
+def term_id(term: str) -> int:
+    """Stable index of a term in the sparse vector space, the same in every process."""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+class TermStatistics:
+    """
+    SQLite backed document frequencies of the terms in each collection, and the collection's node count and length.
+    Counts are only added to, so after points are replaced they are an estimate, which is all BM25 needs.
+    """
+
+    def __init__(self, db_file: str = None):
+        """
+        :param db_file: Path of the SQLite database file, its directory is created if it doesn't exist.
+            None keeps the statistics in memory.
+        """
+        if db_file is None:
+            db_file = ":memory:"
+        else:
+            os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS sparse_terms (collection TEXT, term_id INTEGER, documents INTEGER, PRIMARY KEY (collection, term_id))"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS sparse_collections (collection TEXT PRIMARY KEY, documents INTEGER, total_length INTEGER)"""
+            )
+
+    def add(self, collection: str, documents: List[Counter]):
+        """
+        Count the documents encoded for a collection.
+
+        :param documents: Term id counts of each document.
+        """
+        document_frequencies = Counter()
+        for counts in documents:
+            document_frequencies.update(counts.keys())
+        total_length = sum(sum(counts.values()) for counts in documents)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO sparse_terms (collection, term_id, documents) VALUES (?, ?, ?) "
+                "ON CONFLICT (collection, term_id) DO UPDATE SET documents = documents + excluded.documents",
+                [
+                    (collection, term, count)
+                    for term, count in document_frequencies.items()
+                ],
+            )
+            self._conn.execute(
+                "INSERT INTO sparse_collections (collection, documents, total_length) VALUES (?, ?, ?) "
+                "ON CONFLICT (collection) DO UPDATE SET documents = documents + excluded.documents, "
+                "total_length = total_length + excluded.total_length",
+                (collection, len(documents), total_length),
+            )
+
+    def collection_stats(self, collection: str) -> Tuple[int, int]:
+        """Return the number of documents counted for the collection and their total length in terms."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT documents, total_length FROM sparse_collections WHERE collection = ?",
+                (collection,),
+            ).fetchone()
+        return row if row is not None else (0, 0)
+
+    def document_frequencies(self, collection: str, term_ids) -> dict:
+        term_ids = list(term_ids)
+        if not term_ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT term_id, documents FROM sparse_terms WHERE collection = ? AND term_id IN ({','.join('?' * len(term_ids))})",
+                (collection, *term_ids),
+            ).fetchall()
+        return dict(rows)
+
+    def reset(self, collection: str):
+        """Forget a collection's statistics, e.g. because it was recreated."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sparse_terms WHERE collection = ?", (collection,)
+            )
+            self._conn.execute(
+                "DELETE FROM sparse_collections WHERE collection = ?", (collection,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class BM25SparseEncoder:
+    """
+    Encodes documents and queries as BM25 sparse vectors, for QdrantVectorStore's sparse_doc_fn and sparse_query_fn.
+
+    Document vectors hold the saturated, length normalized frequency of each term, query vectors the IDF of each
+    term, both indexed by term_id().
+    """
+
+    def __init__(
+        self,
+        statistics: TermStatistics = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        average_length: float = 256,
+    ):
+        """
+        :param statistics: Where document frequencies are counted, in memory if None.
+        :param k1: Term frequency saturation.
+        :param b: Document length normalization.
+        :param average_length: Average document length used until the collection has statistics.
+        """
+        self.statistics = statistics or TermStatistics()
+        self.k1 = k1
+        self.b = b
+        self.average_length = average_length
+
+    @staticmethod
+    def _term_counts(text: str) -> Counter:
+        return Counter(term_id(term) for term in tokenize(text))
+
+    def encode_documents(
+        self, collection: str, texts: List[str]
+    ) -> Tuple[List[List[int]], List[List[float]]]:
+        """
+        Encode the texts of nodes being added to a collection, and count them in the collection's statistics.
+
+        :return: Tuple of the indices and the values of each text's sparse vector.
+        """
+        documents = [self._term_counts(text) for text in texts]
+        self.statistics.add(collection, documents)
+        count, total_length = self.statistics.collection_stats(collection)
+        average_length = total_length / count if count else self.average_length
+        indices, values = [], []
+        for counts in documents:
+            length_norm = self.k1 * (
+                1 - self.b + self.b * sum(counts.values()) / (average_length or 1)
+            )
+            indices.append(list(counts.keys()))
+            values.append(
+                [
+                    frequency * (self.k1 + 1) / (frequency + length_norm)
+                    for frequency in counts.values()
+                ]
+            )
+        return indices, values
+
+    def encode_queries(
+        self, collection: str, texts: List[str]
+    ) -> Tuple[List[List[int]], List[List[float]]]:
+        """
+        Encode search queries against a collection.
+
+        :return: Tuple of the indices and the values of each query's sparse vector.
+        """
+        count, _ = self.statistics.collection_stats(collection)
+        indices, values = [], []
+        for text in texts:
+            terms = list(self._term_counts(text).keys())
+            frequencies = self.statistics.document_frequencies(collection, terms)
+            indices.append(terms)
+            values.append(
+                [
+                    math.log(
+                        1
+                        + (count - frequencies.get(term, 0) + 0.5)
+                        / (frequencies.get(term, 0) + 0.5)
+                    )
+                    for term in terms
+                ]
+            )
+        return indices, values
+
+    def vector_store_kwargs(self, collection: str) -> dict:
+        """
+        Keyword arguments enabling hybrid search on a QdrantVectorStore for the collection.
+        """
+        return {
+            "enable_hybrid": True,
+            "sparse_doc_fn": partial(self.encode_documents, collection),
+            "sparse_query_fn": partial(self.encode_queries, collection),
+        }
+
+
+def get_sparse_encoder() -> BM25SparseEncoder:
+    """
+    Return the process-wide BM25SparseEncoder, configured from the SparseVectors section of the config.
+    """
+    global _sparse_encoder_instance
+    with _sparse_encoder_lock:
+        if _sparse_encoder_instance is None:
+            sparse_config = load_config().get("SparseVectors") or {}
+            _sparse_encoder_instance = BM25SparseEncoder(
+                statistics=TermStatistics(sparse_config.get("stats_db_file")),
+                k1=sparse_config.get("k1", 1.2),
+                b=sparse_config.get("b", 0.75),
+                average_length=sparse_config.get("average_length", 256),
+            )
+        return _sparse_encoder_instance
+
+
+def hybrid_vector_store_kwargs(qdrant, collection_name: str) -> dict:
+    """
+    Keyword arguments for the QdrantVectorStore of a collection: hybrid search if the collection stores sparse
+    vectors, otherwise none so dense only collections keep working.
+
+    :param qdrant: QdrantManager connected to the collection's Qdrant.
+    """
+    if not qdrant.is_hybrid_collection(collection_name):
+        return {}
+    return get_sparse_encoder().vector_store_kwargs(collection_name)
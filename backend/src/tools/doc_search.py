@@ -1,6 +1,7 @@
 # /src/tools/doc_search.py
 # Utilities
 import logging
+import threading
 import traceback
 import langchain
 import llama_index
@@ -16,16 +17,26 @@ from src.utils.arize_phoenix import ArizePhoenix
 
 from llama_index.indices.vector_store.retrievers import (
     VectorIndexAutoRetriever,
+    VectorIndexRetriever,
 )
-from llama_index.vector_stores.types import MetadataInfo, VectorStoreInfo
+from llama_index.vector_stores.types import MetadataFilters, VectorStoreQueryMode
 from llama_index.schema import QueryBundle
-from llama_index.postprocessor import RankGPTRerank
 from llama_index.callbacks import CallbackManager
 
 # Custom modules
 from src.utils.config import load_config
 from src.services.azure_llm_service import AzureLlmBuilder, LLmType
+from src.services.sparse_encoder import get_sparse_encoder
 from src.core.errors import DocumentSearchError
+from src.tools.hybrid_fusion import reciprocal_rank_fusion
+from src.tools.index_registry import get_index_registry
+from src.tools.query_filters import (
+    VECTOR_STORE_INFO,
+    QueryFilterParser,
+    RetrievalMode,
+    single_value_filters,
+)
+from src.tools.rerankers import RerankerType, build_reranker
 
 
 # Set up logging
@@ -35,6 +46,10 @@ langchain.verbose = True
 llama_index.debug = True
 llama_index.verbose = True
 
+# Shared DocumentSearch per tracer, see get_document_search()
+_document_searches = {}
+_document_searches_lock = threading.Lock()
+
 
 class DocumentSearch:
     """
@@ -57,7 +72,10 @@ class DocumentSearch:
         """
         self.CONFIG = load_config()
         self.text_summary_llm = AzureLlmBuilder().get_llm(LLmType.AZURE_OPENAI_GPT4)
-        self.embedding_llm = AzureLlmBuilder().get_llm(LLmType.AZURE_EMBEDDINGS)
+        # Not the shared model, the ServiceContext below sets the tracer's callback manager on it
+        self.embedding_llm = AzureLlmBuilder().get_llm(
+            LLmType.AZURE_EMBEDDINGS, shared=False
+        )
         self.phoenix_tracer = phoenix_tracer
 
         if self.phoenix_tracer is None:
@@ -74,10 +92,24 @@ class DocumentSearch:
             callback_manager=callback_manager,  # For tracing and logging
         )
         self.qdrant = QdrantManager()
+        self.registry = get_index_registry(
+            ttl_seconds=(self.CONFIG.get("DocumentSearch") or {}).get(
+                "index_ttl_seconds", 600
+            )
+        )
+        self._rerankers = {}
+        self._rerankers_lock = threading.Lock()
+        self.retrieval_mode = RetrievalMode(
+            (self.CONFIG.get("DocumentSearch") or {}).get(
+                "retrieval_mode", RetrievalMode.ADAPTIVE
+            )
+        )
+        self.query_filter_parser = QueryFilterParser(VECTOR_STORE_INFO)
 
     def setup_index(self, collection_name) -> VectorStoreIndex:
         """
-        Sets up and returns the vector store index for the collection.
+        Returns the vector store index for the collection, built on first use and then
+        reused from the process-wide IndexRegistry until it expires or is invalidated.
 
         Returns:
         - VectorStoreIndex: The set up vector store index.
@@ -85,14 +117,28 @@ class DocumentSearch:
         Raises:
         - Exception: Propagates any exceptions that occur during the index setup.
         """
+        return self.registry.get(
+            collection_name,
+            ("index", self.phoenix_tracer),
+            lambda: self._build_index(collection_name),
+        )
+
+    def _build_index(self, collection_name) -> VectorStoreIndex:
         try:
             logging.debug(
                 f"setup_index: Setting up index for collection - {collection_name}"
             )
+            hybrid_kwargs = {}
+            if self.is_hybrid(collection_name):
+                hybrid_kwargs = get_sparse_encoder().vector_store_kwargs(
+                    collection_name
+                )
+                hybrid_kwargs["hybrid_fusion_fn"] = reciprocal_rank_fusion
             vector_store = QdrantVectorStore(
                 client=self.qdrant.get_client(),
                 collection_name=collection_name,
                 prefer_grpc=True,
+                **hybrid_kwargs,
             )
             collection_storage_context = StorageContext.from_defaults(
                 vector_store=vector_store
@@ -107,13 +153,135 @@ class DocumentSearch:
             logging.error(f"setup_index: Error - {str(e)}")
             raise e
 
-    def search_documents(self, collection_name: str, query: str):
+    def is_hybrid(self, collection_name) -> bool:
+        """
+        Whether the collection stores sparse vectors, checked once and cached alongside its index.
+        """
+        return self.registry.get(
+            collection_name,
+            "hybrid",
+            lambda: self.qdrant.is_hybrid_collection(collection_name),
+        )
+
+    def _query_mode_kwargs(self, collection_name) -> dict:
+        # Hybrid collections name their dense vector, so they can't be searched in the default mode
+        if not self.is_hybrid(collection_name):
+            return {}
+        search_config = self.CONFIG.get("DocumentSearch") or {}
+        return {
+            "vector_store_query_mode": VectorStoreQueryMode.HYBRID,
+            "sparse_top_k": search_config.get("sparse_top_k", 8),
+            "alpha": search_config.get("hybrid_alpha", 0.5),
+        }
+
+    def setup_retriever(self, collection_name, similarity_top_k=8):
+        """
+        Returns the auto retriever for the collection, cached alongside its index.
+        """
+
+        def build():
+            return VectorIndexAutoRetriever(
+                self.setup_index(collection_name),
+                vector_store_info=VECTOR_STORE_INFO,
+                similarity_top_k=similarity_top_k,
+                # verbose=True,
+                **self._query_mode_kwargs(collection_name),
+            )
+
+        return self.registry.get(
+            collection_name,
+            ("auto_retriever", self.phoenix_tracer, similarity_top_k),
+            build,
+        )
+
+    def setup_vector_retriever(
+        self, collection_name, similarity_top_k=8, filters: list = None
+    ) -> VectorIndexRetriever:
+        """
+        Returns a plain vector similarity retriever for the collection, optionally restricted by metadata filters.
+        Unlike the auto retriever it makes no LLM call, so it is cheap to create per search.
+        Hybrid collections are searched with both their dense and sparse vectors, fused by reciprocal rank.
+        Filters are combined with AND, keys given several values are left unfiltered.
+        """
+        if filters:
+            filters = single_value_filters(filters)
+        return VectorIndexRetriever(
+            self.setup_index(collection_name),
+            similarity_top_k=similarity_top_k,
+            filters=MetadataFilters(filters=filters) if filters else None,
+            **self._query_mode_kwargs(collection_name),
+        )
+
+    def retrieve(
+        self,
+        collection_name: str,
+        query_bundle: QueryBundle,
+        retrieval_mode: RetrievalMode = None,
+    ) -> list:
+        """
+        Retrieves the nodes for a query with the configured RetrievalMode.
+
+        Args:
+            collection_name (str): The name of the collection to be queried.
+            query_bundle (QueryBundle): The query.
+            retrieval_mode (RetrievalMode): Overrides DocumentSearch.retrieval_mode from the config.
+
+        Returns:
+            list: The retrieved NodeWithScore objects.
+        """
+        retrieval_mode = RetrievalMode(retrieval_mode or self.retrieval_mode)
+        if retrieval_mode == RetrievalMode.AUTO:
+            return self.setup_retriever(collection_name).retrieve(query_bundle)
+
+        parsed = self.query_filter_parser.parse(query_bundle.query_str)
+        if parsed.needs_auto_retriever and retrieval_mode == RetrievalMode.ADAPTIVE:
+            logging.debug("retrieve: Query asks for filters, using the auto retriever")
+            return self.setup_retriever(collection_name).retrieve(query_bundle)
+        if parsed.filters:
+            logging.debug(f"retrieve: Filters parsed from the query - {parsed.filters}")
+            retrieved_nodes = self.setup_vector_retriever(
+                collection_name, filters=parsed.filters
+            ).retrieve(query_bundle)
+            if retrieved_nodes:
+                return retrieved_nodes
+            # The rules can misread a query, e.g. a file name that is only mentioned
+            logging.debug("retrieve: No nodes match the parsed filters, ignoring them")
+        return self.setup_vector_retriever(collection_name).retrieve(query_bundle)
+
+    def reranker_type(self, collection_name: str, reranker: str = None) -> RerankerType:
+        """
+        Resolve the reranker for a search: the one requested by the caller (e.g. from the agent's config.json),
+        then the collection's entry in DocumentSearch.collection_rerankers, then DocumentSearch.reranker.
+        """
+        search_config = self.CONFIG.get("DocumentSearch") or {}
+        if reranker is None:
+            reranker = (search_config.get("collection_rerankers") or {}).get(
+                collection_name, search_config.get("reranker", RerankerType.BM25)
+            )
+        return RerankerType(reranker)
+
+    def get_reranker(self, reranker_type: RerankerType):
+        """
+        Returns the shared reranker of the given type, created on first use.
+        """
+        with self._rerankers_lock:
+            if reranker_type not in self._rerankers:
+                self._rerankers[reranker_type] = build_reranker(
+                    reranker_type,
+                    top_n=(self.CONFIG.get("DocumentSearch") or {}).get(
+                        "reranker_top_n", 3
+                    ),
+                )
+            return self._rerankers[reranker_type]
+
+    def search_documents(self, collection_name: str, query: str, reranker: str = None):
         """
         Searches the documents in the collection using the user input query.
 
         Args:
             collection_name (str): The name of the collection to be queried.
             user_input (str): The user input query for searching documents.
+            reranker (str): Optional RerankerType value overriding the configured reranker, e.g. "rank_gpt".
 
         Raises:
             e: _description_
@@ -126,99 +294,14 @@ class DocumentSearch:
             logging.debug(
                 f"search_documents: Searching documents in collection - {collection_name}"
             )
-            index = self.setup_index(collection_name=collection_name)
             query_bundle = QueryBundle(query)
-            vector_store_info = VectorStoreInfo(
-                content_info="Technical Documentation and Loaded Web Documents",
-                metadata_info=[
-                    MetadataInfo(
-                        name="creation_date",
-                        type="str",
-                        description=("File Creation Date in YYYY-MM-DD format"),
-                    ),
-                    MetadataInfo(
-                        name="doc_id",
-                        type="str",
-                        description=("Document ID in Vector Store"),
-                    ),
-                    MetadataInfo(
-                        name="excerpt_keywords",
-                        type="str",
-                        description=("List of keywords"),
-                    ),
-                    MetadataInfo(
-                        name="file_name",
-                        type="str",
-                        description=("File Name"),
-                    ),
-                    MetadataInfo(
-                        name="file_path",
-                        type="str",
-                        description=("Full File Path"),
-                    ),
-                    MetadataInfo(
-                        name="file_size",
-                        type="int",
-                        description=("File Size in bytes"),
-                    ),
-                    MetadataInfo(
-                        name="file_type",
-                        type="str",
-                        description=("File MIME Type"),
-                    ),
-                    MetadataInfo(
-                        name="last_accessed_date",
-                        type="str",
-                        description=("File Last Accessed Date in YYYY-MM-DD format"),
-                    ),
-                    MetadataInfo(
-                        name="last_modified_date",
-                        type="str",
-                        description=("File Last Modified Date in YYYY-MM-DD format"),
-                    ),
-                    MetadataInfo(
-                        name="next_section_summary",
-                        type="str",
-                        description=("Summary of the next section of text"),
-                    ),
-                    MetadataInfo(
-                        name="prev_section_summary",
-                        type="str",
-                        description=("Summary of the previous section of text"),
-                    ),
-                    MetadataInfo(
-                        name="questions_this_excerpt_can_answer",
-                        type="str",
-                        description=(
-                            "List of questions that can be answered by this section of text"
-                        ),
-                    ),
-                    MetadataInfo(
-                        name="section_summary",
-                        type="str",
-                        description=("Summary of the current section of text"),
-                    ),
-                    MetadataInfo(
-                        name="url",
-                        type="str",
-                        description=("Reference source URL of text"),
-                    ),
-                ],
-            )
-            retriever = VectorIndexAutoRetriever(
-                index,
-                vector_store_info=vector_store_info,
-                similarity_top_k=8,
-                # verbose=True,
+            retrieved_nodes = self.retrieve(collection_name, query_bundle)
+            postprocessor = self.get_reranker(
+                self.reranker_type(collection_name, reranker)
             )
-            logging.debug(f"retriever set {retriever}")
-            retrieved_nodes = retriever.retrieve(query_bundle)
-            reranker = RankGPTRerank(
-                llm=AzureLlmBuilder().get_llm(LLmType.LLAMA_AZURE_OPENAI_GPT4_32K),
-                top_n=3,
-                # verbose=True,
+            retrieved_nodes = postprocessor.postprocess_nodes(
+                retrieved_nodes, query_bundle
             )
-            retrieved_nodes = reranker.postprocess_nodes(retrieved_nodes, query_bundle)
             logging.debug(f"search_documents: Qdrant Response - {retrieved_nodes}")
             return retrieved_nodes
 
@@ -231,5 +314,20 @@ class DocumentSearch:
         except Exception as e:
             logging.error(f"search_documents: Error - {str(e)}")
             traceback.print_exc()
+            # The collection may have been dropped or recreated, rebuild its objects next time
+            self.registry.invalidate(collection_name)
 
             raise DocumentSearchError(str(e))
+
+
+def get_document_search(phoenix_tracer: ArizePhoenix = None) -> DocumentSearch:
+    """
+    Return the process-wide DocumentSearch for phoenix_tracer, so the LLM clients and the
+    Qdrant connection (and its health check) are only set up once rather than per search.
+    """
+    with _document_searches_lock:
+        search = _document_searches.get(phoenix_tracer)
+        if search is None:
+            search = DocumentSearch(phoenix_tracer=phoenix_tracer)
+            _document_searches[phoenix_tracer] = search
+        return search
@@ -0,0 +1,47 @@
+# /src/tools/hybrid_fusion.py
+# Fusion of the dense and sparse result lists of a hybrid Qdrant search. Reciprocal rank fusion only uses the rank of
+# each node in each list, so cosine similarities and BM25 scores don't have to be made comparable.
+
+# Utilities
+from typing import Dict
+
+# Primary Components
+from llama_index.vector_stores.types import VectorStoreQueryResult
+
+# Rank offset from the RRF paper, it keeps the first few ranks from dominating the fused score
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    dense_result: VectorStoreQueryResult,
+    sparse_result: VectorStoreQueryResult,
+    alpha: float = 0.5,
+    top_k: int = 2,
+    k: int = RRF_K,
+) -> VectorStoreQueryResult:
+    """
+    Fuse dense and sparse results with weighted reciprocal rank fusion, for QdrantVectorStore's hybrid_fusion_fn.
+
+    :param dense_result: Result of the dense vector search.
+    :param sparse_result: Result of the sparse vector search.
+    :param alpha: Weight of the dense ranks, the sparse ranks get 1 - alpha.
+    :param top_k: Number of nodes returned.
+    :param k: Rank offset.
+    """
+    scores: Dict[str, float] = {}
+    nodes = {}
+    for result, weight in ((dense_result, alpha), (sparse_result, 1 - alpha)):
+        for rank, node in enumerate(result.nodes or []):
+            scores[node.node_id] = scores.get(node.node_id, 0.0) + weight / (
+                k + rank + 1
+            )
+            nodes.setdefault(node.node_id, node)
+    if not scores:
+        return VectorStoreQueryResult(nodes=None, similarities=None, ids=None)
+    # sorted is stable, ties keep the dense order
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return VectorStoreQueryResult(
+        nodes=[nodes[node_id] for node_id in ranked],
+        similarities=[scores[node_id] for node_id in ranked],
+        ids=ranked,
+    )
@@ -0,0 +1,89 @@
+# /src/tools/index_registry.py
+# Process-wide cache of the per-collection objects used by document search (vector store, index, retrievers), so a
+# RAG tool call reuses warm objects instead of rebuilding them on every search.
+
+# Utilities
+import threading
+import time
+
+# Global variable to store the registry instance.
+_index_registry_instance = None
+_index_registry_lock = threading.Lock()
+
+
+class IndexRegistry:
+    """
+    Thread-safe, lazily populated cache of objects keyed by collection name and a name within the collection.
+
+    Entries are created on first use by the factory passed to get(), and rebuilt once they are older than
+    ttl_seconds. While an entry is being created, other threads asking for the same entry wait for it instead of
+    building their own, and threads asking for other entries aren't blocked.
+    """
+
+    def __init__(self, ttl_seconds: float = None):
+        """
+        :param ttl_seconds: Age after which an entry is rebuilt, None keeps entries until they are invalidated.
+        """
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._entry_locks = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, created_at = entry
+        if (
+            self.ttl_seconds is not None
+            and time.monotonic() - created_at > self.ttl_seconds
+        ):
+            return None
+        return entry
+
+    def get(self, collection_name: str, name, factory):
+        """
+        Return the cached object, creating it with factory() if it is missing or expired.
+
+        :param collection_name: Collection the object belongs to.
+        :param name: Hashable name of the object within the collection, e.g. "index" or ("retriever", 8).
+        :param factory: Function called without arguments to create the object.
+        """
+        key = (collection_name, name)
+        with self._lock:
+            if (entry := self._fresh(key)) is not None:
+                return entry[0]
+            entry_lock = self._entry_locks.setdefault(key, threading.Lock())
+        with entry_lock:
+            with self._lock:
+                # Another thread may have created it while this one waited
+                if (entry := self._fresh(key)) is not None:
+                    return entry[0]
+            value = factory()
+            with self._lock:
+                self._entries[key] = (value, time.monotonic())
+            return value
+
+    def invalidate(self, collection_name: str = None):
+        """
+        Drop the cached objects of a collection, e.g. after it was recreated, or of every collection.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if collection_name is None or key[0] == collection_name:
+                    del self._entries[key]
+
+    def collections(self) -> list:
+        with self._lock:
+            return sorted({key[0] for key in self._entries})
+
+
+def get_index_registry(ttl_seconds: float = None) -> IndexRegistry:
+    """
+    Return the process-wide IndexRegistry, ttl_seconds only applies when it is first created.
+    """
+    global _index_registry_instance
+    with _index_registry_lock:
+        if _index_registry_instance is None:
+            _index_registry_instance = IndexRegistry(ttl_seconds=ttl_seconds)
+        return _index_registry_instance
@@ -0,0 +1,238 @@
+# /src/tools/query_filters.py
+# Rule based metadata filters for document search. Exact file names, urls and dates are read from the query without
+# an LLM call, so only queries that ask for a filter the rules can't express need VectorIndexAutoRetriever.
+
+# Utilities
+import re
+from collections import Counter
+from enum import Enum
+from typing import List
+
+# Primary Components
+from llama_index.vector_stores.types import (
+    MetadataFilter,
+    MetadataInfo,
+    VectorStoreInfo,
+)
+
+URL = re.compile(r"https?://[^\s<>\"'`]+", re.IGNORECASE)
+FILE_NAME = re.compile(
+    r"(?<![\w/.-])([\w][\w.-]*\.(?:pdf|docx?|pptx?|xlsx?|csv|txt|md|json|ya?ml|html?))\b",
+    re.IGNORECASE,
+)
+DATE = r"((?:19|20)\d{2})[-/](\d{1,2})[-/](\d{1,2})"
+DATE_LINK = r"\s+(?:on\s+|at\s+|date\s+(?:of\s+|is\s+)?)?"
+# Words placed before a date that tie it to a metadata field, e.g. "modified on 2024-01-15"
+DATE_FIELDS = [
+    (
+        re.compile(
+            r"\b(?:created|creation(?: date)?)" + DATE_LINK + DATE, re.IGNORECASE
+        ),
+        "creation_date",
+    ),
+    (
+        re.compile(
+            r"\b(?:modified|updated|changed|edited)" + DATE_LINK + DATE, re.IGNORECASE
+        ),
+        "last_modified_date",
+    ),
+    (
+        re.compile(
+            r"\b(?:accessed|loaded|crawled|scraped)" + DATE_LINK + DATE, re.IGNORECASE
+        ),
+        "last_accessed_date",
+    ),
+]
+# Queries that clearly ask for a filter the rules above can't express, e.g. "updated since March 2023" or
+# "documents larger than 1 MB", are left to VectorIndexAutoRetriever
+DATE_INTENT = re.compile(
+    r"\b(?:created|modified|updated|accessed|uploaded|published|dated|before|after|since|between|"
+    r"older than|newer than)\b",
+    re.IGNORECASE,
+)
+MONTH = r"(?:january|february|march|april|may|june|july|august|september|october|november|december)"
+DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+# Month names only count next to a day, "may" and "march" are common words, and a year counts on its own
+TIME_REFERENCE = re.compile(
+    rf"\b(?:(?:19|20)\d{{2}}|{MONTH}\s+{DAY}|{DAY}\s+{MONTH}|yesterday|today|"
+    r"last (?:week|month|year)|this (?:week|month|year))\b",
+    re.IGNORECASE,
+)
+ATTRIBUTE_INTENT = re.compile(
+    r"\b(?:file ?types?|mime ?types?|file ?sizes?|larger than|smaller than|bigger than|doc(?:ument)? ?ids?)\b",
+    re.IGNORECASE,
+)
+TRAILING_PUNCTUATION = ".,;:!?)]}"
+
+
+# Describes the collections to VectorIndexAutoRetriever, which infers metadata filters from it
+VECTOR_STORE_INFO = VectorStoreInfo(
+    content_info="Technical Documentation and Loaded Web Documents",
+    metadata_info=[
+        MetadataInfo(
+            name="creation_date",
+            type="str",
+            description=("File Creation Date in YYYY-MM-DD format"),
+        ),
+        MetadataInfo(
+            name="doc_id",
+            type="str",
+            description=("Document ID in Vector Store"),
+        ),
+        MetadataInfo(
+            name="excerpt_keywords",
+            type="str",
+            description=("List of keywords"),
+        ),
+        MetadataInfo(
+            name="file_name",
+            type="str",
+            description=("File Name"),
+        ),
+        MetadataInfo(
+            name="file_path",
+            type="str",
+            description=("Full File Path"),
+        ),
+        MetadataInfo(
+            name="file_size",
+            type="int",
+            description=("File Size in bytes"),
+        ),
+        MetadataInfo(
+            name="file_type",
+            type="str",
+            description=("File MIME Type"),
+        ),
+        MetadataInfo(
+            name="last_accessed_date",
+            type="str",
+            description=("File Last Accessed Date in YYYY-MM-DD format"),
+        ),
+        MetadataInfo(
+            name="last_modified_date",
+            type="str",
+            description=("File Last Modified Date in YYYY-MM-DD format"),
+        ),
+        MetadataInfo(
+            name="next_section_summary",
+            type="str",
+            description=("Summary of the next section of text"),
+        ),
+        MetadataInfo(
+            name="prev_section_summary",
+            type="str",
+            description=("Summary of the previous section of text"),
+        ),
+        MetadataInfo(
+            name="questions_this_excerpt_can_answer",
+            type="str",
+            description=(
+                "List of questions that can be answered by this section of text"
+            ),
+        ),
+        MetadataInfo(
+            name="section_summary",
+            type="str",
+            description=("Summary of the current section of text"),
+        ),
+        MetadataInfo(
+            name="url",
+            type="str",
+            description=("Reference source URL of text"),
+        ),
+    ],
+)
+
+
+def single_value_filters(filters: List[MetadataFilter]) -> List[MetadataFilter]:
+    """
+    Drop the filters of keys given more than one value. QdrantVectorStore requires every filter to match and ignores
+    FilterCondition.OR and the in operator, so e.g. two file names would match nothing; the search is left
+    unrestricted on that key instead.
+    """
+    counts = Counter(f.key for f in filters)
+    return [f for f in filters if counts[f.key] == 1]
+
+
+class RetrievalMode(str, Enum):
+    # Always let the LLM infer metadata filters with VectorIndexAutoRetriever
+    AUTO = "auto"
+    # Vector similarity, with the filters the rules find in the query
+    VECTOR = "vector"
+    # Like vector, but queries that ask for a filter the rules can't parse go to VectorIndexAutoRetriever
+    ADAPTIVE = "adaptive"
+
+
+class ParsedQuery:
+    """
+    Result of QueryFilterParser.parse().
+
+    Attributes:
+    filters (List[MetadataFilter]): Exact match filters read from the query.
+    needs_auto_retriever (bool): The query asks for a filter the rules couldn't express.
+    """
+
+    def __init__(self, filters: List[MetadataFilter], needs_auto_retriever: bool):
+        self.filters = filters
+        self.needs_auto_retriever = needs_auto_retriever
+
+
+class QueryFilterParser:
+    """
+    Reads exact match filters on urls, file names and dates from a query, for the fields of a VectorStoreInfo.
+    """
+
+    def __init__(self, vector_store_info: VectorStoreInfo):
+        self.fields = {info.name for info in vector_store_info.metadata_info}
+
+    @staticmethod
+    def _iso_date(year: str, month: str, day: str) -> str:
+        return f"{year}-{int(month):02d}-{int(day):02d}"
+
+    def _url_filters(self, query: str) -> list:
+        if "url" not in self.fields:
+            return []
+        urls = [match.rstrip(TRAILING_PUNCTUATION) for match in URL.findall(query)]
+        return [MetadataFilter(key="url", value=url) for url in dict.fromkeys(urls)]
+
+    def _file_name_filters(self, query: str) -> list:
+        if "file_name" not in self.fields:
+            return []
+        # File names inside urls belong to the url
+        names = FILE_NAME.findall(URL.sub(" ", query))
+        return [
+            MetadataFilter(key="file_name", value=name) for name in dict.fromkeys(names)
+        ]
+
+    def _date_filters(self, query: str) -> list:
+        filters = []
+        for pattern, field in DATE_FIELDS:
+            if field not in self.fields:
+                continue
+            for year, month, day in pattern.findall(query):
+                filters.append(
+                    MetadataFilter(key=field, value=self._iso_date(year, month, day))
+                )
+        return filters
+
+    def parse(self, query: str) -> ParsedQuery:
+        """
+        Parse the filters of a query.
+
+        :param query: The search query.
+        """
+        filters = single_value_filters(
+            self._url_filters(query)
+            + self._file_name_filters(query)
+            + self._date_filters(query)
+        )
+        needs_auto_retriever = False
+        if not filters:
+            # Dates inside urls and file names don't count
+            remainder = FILE_NAME.sub(" ", URL.sub(" ", query))
+            needs_auto_retriever = bool(
+                (DATE_INTENT.search(remainder) and TIME_REFERENCE.search(remainder))
+                or ATTRIBUTE_INTENT.search(remainder)
+            )
+        return ParsedQuery(filters=filters, needs_auto_retriever=needs_auto_retriever)
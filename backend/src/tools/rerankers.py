@@ -0,0 +1,165 @@
+# /src/tools/rerankers.py
+# Rerankers applied to the nodes retrieved by document search. BM25 scores the candidates locally on the CPU, RankGPT
+# asks GPT-4 to order them and costs an extra LLM round trip per search.
+
+# Utilities
+import logging
+import math
+from collections import Counter
+from enum import Enum
+from typing import List, Optional
+
+# Primary Components
+from llama_index.bridge.pydantic import Field
+from llama_index.postprocessor import RankGPTRerank
+from llama_index.postprocessor.types import BaseNodePostprocessor
+from llama_index.schema import MetadataMode, NodeWithScore, QueryBundle
+
+# Custom modules
+from src.services.azure_llm_service import AzureLlmBuilder, LLmType
+from src.utils.lexical import tokenize
+
+
+class RerankerType(str, Enum):
+    # Lexical BM25 scores blended with the vector similarity, computed locally
+    BM25 = "bm25"
+    # GPT-4 orders the nodes, see RankGPTRerank
+    RANK_GPT = "rank_gpt"
+    # Keep the retriever's order and only cut it to top_n
+    NONE = "none"
+
+
+class BM25Reranker(BaseNodePostprocessor):
+    """
+    Reranks retrieved nodes by BM25 over the candidate set, blended with their vector similarity.
+
+    Term statistics come from the candidates themselves, so nothing needs to be indexed beforehand. Nodes are
+    scored on their text and embedded metadata, which includes extracted keywords and questions when present.
+    """
+
+    top_n: int = Field(default=3, description="Top N nodes to return.")
+    k1: float = Field(default=1.2, description="BM25 term frequency saturation.")
+    b: float = Field(default=0.75, description="BM25 document length normalization.")
+    lexical_weight: float = Field(
+        default=0.5,
+        description="Weight of the BM25 score, the vector similarity gets the rest.",
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BM25Reranker"
+
+    @staticmethod
+    def _normalize(scores: List[float]) -> List[float]:
+        # Scaled by the best score rather than min-max, so near identical vector similarities stay near identical
+        high = max(scores)
+        if high <= 0:
+            return [0.0 for _ in scores]
+        return [max(score, 0.0) / high for score in scores]
+
+    def bm25_scores(self, query: str, texts: List[str]) -> List[float]:
+        query_terms = set(tokenize(query))
+        documents = [Counter(tokenize(text)) for text in texts]
+        if not query_terms or not documents:
+            return [0.0] * len(texts)
+        lengths = [sum(counts.values()) for counts in documents]
+        average_length = (sum(lengths) / len(lengths)) or 1.0
+        scores = []
+        for counts, length in zip(documents, lengths):
+            score = 0.0
+            for term in query_terms:
+                frequency = counts.get(term)
+                if not frequency:
+                    continue
+                document_frequency = sum(1 for other in documents if term in other)
+                idf = math.log(
+                    1
+                    + (len(documents) - document_frequency + 0.5)
+                    / (document_frequency + 0.5)
+                )
+                score += (
+                    idf
+                    * frequency
+                    * (self.k1 + 1)
+                    / (
+                        frequency
+                        + self.k1 * (1 - self.b + self.b * length / average_length)
+                    )
+                )
+            scores.append(score)
+        return scores
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Query bundle must be provided.")
+        if not nodes:
+            return []
+        lexical = self._normalize(
+            self.bm25_scores(
+                query_bundle.query_str,
+                [
+                    node.node.get_content(metadata_mode=MetadataMode.EMBED)
+                    for node in nodes
+                ],
+            )
+        )
+        semantic = self._normalize([node.score or 0.0 for node in nodes])
+        reranked = [
+            NodeWithScore(
+                node=node.node,
+                score=self.lexical_weight * lexical_score
+                + (1 - self.lexical_weight) * semantic_score,
+            )
+            for node, lexical_score, semantic_score in zip(nodes, lexical, semantic)
+        ]
+        # sorted is stable, ties keep the retriever's order
+        reranked = sorted(reranked, key=lambda node: node.score, reverse=True)
+        return reranked[: self.top_n]
+
+
+class TopNReranker(BaseNodePostprocessor):
+    """Keeps the first top_n nodes in the retriever's order."""
+
+    top_n: int = Field(default=3, description="Top N nodes to return.")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "TopNReranker"
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        return nodes[: self.top_n]
+
+
+def build_reranker(
+    reranker_type: RerankerType, top_n: int = 3
+) -> BaseNodePostprocessor:
+    """
+    Create the reranker for reranker_type.
+
+    :param reranker_type: A RerankerType or its value, e.g. "bm25".
+    :param top_n: Number of nodes the reranker returns.
+    """
+    try:
+        reranker_type = RerankerType(reranker_type)
+    except ValueError:
+        logging.error(
+            f"Unknown reranker {reranker_type}, expected one of {[t.value for t in RerankerType]}"
+        )
+        raise
+    if reranker_type == RerankerType.RANK_GPT:
+        return RankGPTRerank(
+            llm=AzureLlmBuilder().get_llm(LLmType.LLAMA_AZURE_OPENAI_GPT4_32K),
+            top_n=top_n,
+            # verbose=True,
+        )
+    if reranker_type == RerankerType.BM25:
+        return BM25Reranker(top_n=top_n)
+    return TopNReranker(top_n=top_n)
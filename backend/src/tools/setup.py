@@ -12,7 +12,7 @@ from langchain.agents import Tool
 from src.utils.arize_phoenix import ArizePhoenix
 
 from src.loader.web_document import WebDocumentLoader
-from src.tools.doc_search import DocumentSearch
+from src.tools.doc_search import get_document_search
 from src.tools.corporate_jargonifier import JargonGenius
 
 
@@ -25,9 +25,13 @@ class ToolSetup:
         self.phoenix_tracer = phoenix_tracer
 
     @staticmethod
-    def setup_tools(tools_enabled: list, phoenix_tracer: ArizePhoenix) -> list:
+    def setup_tools(
+        tools_enabled: list, phoenix_tracer: ArizePhoenix, reranker: str = None
+    ) -> list:
         """
         Static method to initialize and return a list of tools for the agent.
+        Args:
+        - reranker (str): Optional reranker for the document search tools, e.g. from the agent's config.json.
         Returns:
         - list: A list of initialized tools for agent's use.
         """
@@ -99,9 +103,9 @@ class ToolSetup:
 
             try:
                 nonlocal phoenix_tracer
-                search = DocumentSearch(phoenix_tracer=phoenix_tracer)
+                search = get_document_search(phoenix_tracer=phoenix_tracer)
                 response = search.search_documents(
-                    collection_name=collection, query=query
+                    collection_name=collection, query=query, reranker=reranker
                 )
             except Exception as e:
                 response = e
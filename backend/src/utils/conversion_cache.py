@@ -0,0 +1,106 @@
+# /src/utils/conversion_cache.py
+# On-disk cache of PDFs converted from PPTX files, keyed by the SHA256 of the PPTX content.
+# LibreOffice conversion is the slowest ingestion stage, so re-processing a deck that hasn't changed should reuse its PDF.
+
+# Utilities
+import logging
+import os
+import shutil
+import threading
+import uuid
+
+
+class ConversionCache:
+    """
+    Size bounded, least recently used cache of converted PDF files.
+
+    Each entry is stored as <content_hash>.pdf in cache_dir. The file's mtime is bumped on every hit and the
+    oldest entries are evicted once the cache grows past max_size_bytes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "/app/backend/cache/converted_pptx/",
+        max_size_bytes: int = 2 * 1024**3,
+    ):
+        """
+        :param cache_dir: Directory the cached PDFs are stored in, created if it doesn't exist.
+        :param max_size_bytes: Total size the cache is trimmed back to after each insert.
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}.pdf")
+
+    def get(self, content_hash: str, output_full_path: str) -> bool:
+        """
+        Copy a cached PDF to output_full_path if one exists for content_hash.
+
+        :param content_hash: SHA256 of the source PPTX file.
+        :param output_full_path: Where the PDF should be written.
+        :return: True on a cache hit, False otherwise.
+        """
+        entry_path = self._entry_path(content_hash)
+        try:
+            os.makedirs(os.path.dirname(output_full_path), exist_ok=True)
+            shutil.copyfile(entry_path, output_full_path)
+            # Bump mtime so this entry is evicted last
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            self.logger.warning(f"Unable to read cached conversion {entry_path}: {e}")
+            return False
+
+        self.logger.info(
+            f"Reused cached conversion {entry_path} for {output_full_path}"
+        )
+        return True
+
+    def put(self, content_hash: str, pdf_path: str):
+        """
+        Store a converted PDF for content_hash, then evict old entries if the cache is over its size limit.
+
+        :param content_hash: SHA256 of the source PPTX file.
+        :param pdf_path: Path of the converted PDF.
+        """
+        entry_path = self._entry_path(content_hash)
+        # Copy to a temporary name first so a concurrent get never sees a partially written PDF
+        temporary_path = f"{entry_path}.{uuid.uuid4()}.tmp"
+        try:
+            shutil.copyfile(pdf_path, temporary_path)
+            os.replace(temporary_path, entry_path)
+        except OSError as e:
+            self.logger.warning(f"Unable to cache conversion {pdf_path}: {e}")
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(".pdf"):
+                    entry_stat = entry.stat()
+                    entries.append(
+                        (entry_stat.st_mtime_ns, entry_stat.st_size, entry.path)
+                    )
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_size_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total_size -= size
+                    self.logger.info(f"Evicted cached conversion {path}")
+                except OSError as e:
+                    self.logger.warning(
+                        f"Unable to evict cached conversion {path}: {e}"
+                    )
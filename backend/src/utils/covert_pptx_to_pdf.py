@@ -1,21 +1,82 @@
 import uuid
 import subprocess
 import os
+import shutil
 import asyncio
 import logging
 
+from src.utils.conversion_cache import ConversionCache
+
 
 class PPTXToPDFConverter:
-    def __init__(self, max_retries: int = 3):
+    def __init__(
+        self,
+        max_retries: int = 3,
+        timeout: float = None,
+        cache: ConversionCache = None,
+    ):
+        """
+        :param max_retries: Number of conversion attempts per file.
+        :param timeout: Seconds a single LibreOffice run may take before it is killed, None waits forever.
+        :param cache: Optional cache of previous conversions, used for files whose content hash is known.
+        """
         self.max_retries = max_retries
+        self.timeout = timeout
+        self.cache = cache
         self.logger = logging.getLogger(__name__)
 
-    async def convert(self, source_path: str, output_file: str) -> (bool, str):
-        user_profile_path = self._create_user_profile_path()
-        output_path, output_file_name = self._prepare_output_paths(output_file)
-        return await self._attempt_conversion(
-            source_path, output_path, output_file_name, user_profile_path
+    async def convert(
+        self, source_path: str, output_file: str, user_profile_path: str = None
+    ) -> (bool, str):
+        """
+        Convert a PPTX file to PDF.
+
+        :param source_path: Path of the PPTX file.
+        :param output_file: Path of the PDF, it is written to a converted_from_pptx directory next to it.
+        :param user_profile_path: LibreOffice user profile to reuse. If not given a temporary profile is created and removed afterwards.
+        """
+        results = await self.convert_batch(
+            [(source_path, output_file)], user_profile_path=user_profile_path
         )
+        return results[0]
+
+    async def convert_batch(
+        self,
+        conversions: list,
+        user_profile_path: str = None,
+        source_hashes: dict = None,
+    ) -> list:
+        """
+        Convert several PPTX files to PDF with a single LibreOffice process, LibreOffice startup takes several seconds.
+        Files that fail are retried together until they succeed or max_retries is reached. If LibreOffice itself fails
+        or times out, the files it didn't convert are retried one at a time instead.
+
+        :param conversions: List of (source_path, output_file) pairs, all output files must be in the same directory.
+        :param user_profile_path: LibreOffice user profile to reuse. If not given a temporary profile is created and removed afterwards.
+        :param source_hashes: Optional dict of source path to SHA256, files with a cached conversion skip LibreOffice.
+        :return: One (success, output_path) tuple per conversion, in the same order.
+        """
+        output_paths = {
+            self._prepare_output_paths(output_file)[0] for _, output_file in conversions
+        }
+        if len(output_paths) > 1:
+            raise ValueError(
+                f"All files in a conversion batch must share an output directory, got: {output_paths}"
+            )
+
+        temporary_profile = user_profile_path is None
+        if temporary_profile:
+            user_profile_path = self._create_user_profile_path()
+        try:
+            return await self._attempt_conversion(
+                [source_path for source_path, _ in conversions],
+                output_paths.pop(),
+                user_profile_path,
+                source_hashes or {},
+            )
+        finally:
+            if temporary_profile:
+                shutil.rmtree(user_profile_path, ignore_errors=True)
 
     def _create_user_profile_path(self) -> str:
         return f"/tmp/libreoffice_user_{uuid.uuid4()}"
@@ -25,55 +86,133 @@ class PPTXToPDFConverter:
         output_file_name = os.path.basename(output_file)
         return output_path, output_file_name
 
+    def _output_full_path(self, source_path: str, output_path: str) -> str:
+        # LibreOffice names each output after its source file, this is how outputs are mapped back to their source
+        source_stem = os.path.splitext(os.path.basename(source_path))[0]
+        return os.path.join(output_path, f"{source_stem}.pdf")
+
     async def _attempt_conversion(
         self,
-        source_path: str,
+        source_paths: list,
         output_path: str,
-        output_file_name: str,
         user_profile_path: str,
-    ) -> (bool, str):
-        attempts = 0
-        output_full_path = os.path.join(
-            output_path, output_file_name.replace(".pptx", ".pdf")
+        source_hashes: dict,
+    ) -> list:
+        output_full_paths = {
+            source_path: self._output_full_path(source_path, output_path)
+            for source_path in source_paths
+        }
+        # Remove stale outputs so an old PDF is never mistaken for a successful conversion
+        for output_full_path in output_full_paths.values():
+            self._remove_existing_output_file(output_full_path)
+
+        converted = set()
+        if self.cache is not None:
+            # Cache reads and writes copy whole PDFs, keep them off the event loop
+            for source_path in source_paths:
+                if source_path in source_hashes and await asyncio.to_thread(
+                    self.cache.get,
+                    source_hashes[source_path],
+                    output_full_paths[source_path],
+                ):
+                    converted.add(source_path)
+        cached = set(converted)
+
+        pending = [
+            source_path for source_path in source_paths if source_path not in converted
+        ]
+        converted |= await self._convert_pending(
+            pending, output_full_paths, output_path, user_profile_path
         )
+        pending = [
+            source_path for source_path in pending if source_path not in converted
+        ]
 
-        while attempts < self.max_retries:
+        if self.cache is not None:
+            for source_path in converted - cached:
+                if source_path in source_hashes:
+                    await asyncio.to_thread(
+                        self.cache.put,
+                        source_hashes[source_path],
+                        output_full_paths[source_path],
+                    )
+
+        for source_path in pending:
+            self.logger.error(
+                f"Conversion failed after {self.max_retries} attempts: Source: {source_path}, Output: {output_full_paths[source_path]}"
+            )
+
+        return [
+            (source_path in converted, output_full_paths[source_path])
+            for source_path in source_paths
+        ]
+
+    async def _convert_pending(
+        self,
+        pending: list,
+        output_full_paths: dict,
+        output_path: str,
+        user_profile_path: str,
+    ) -> set:
+        """
+        Run LibreOffice over the pending files until each one converts or max_retries is reached.
+
+        :return: The source paths that were converted.
+        """
+        converted = set()
+        attempts = 0
+        while pending and attempts < self.max_retries:
+            process_failed = True
             try:
-                await self._execute_conversion(
-                    source_path, output_path, user_profile_path
+                await self._execute_conversion(pending, output_path, user_profile_path)
+                process_failed = False
+            except subprocess.CalledProcessError as e:
+                self.logger.error(
+                    f"LibreOffice conversion failed with CalledProcessError: {e}"
+                )
+            except asyncio.TimeoutError:
+                self.logger.error(
+                    f"LibreOffice conversion timed out after {self._batch_timeout(pending)}s: {pending}"
                 )
+            except Exception as e:
+                self.logger.error(f"Unexpected error during conversion: {e}")
 
-                # Verify output file's existence and integrity
+            # Verify each output file's existence and integrity, a batch can partially succeed
+            for source_path in pending:
+                output_full_path = output_full_paths[source_path]
                 if (
                     os.path.exists(output_full_path)
                     and os.path.getsize(output_full_path) > 0
                 ):
-                    return True, output_full_path
+                    converted.add(source_path)
                 else:
                     self.logger.error(
-                        f"Conversion completed but output file is missing or empty: {output_full_path}"
+                        f"Conversion output file is missing or empty: {output_full_path}"
                     )
-                    attempts += 1
-            except subprocess.CalledProcessError as e:
-                self.logger.error(
-                    f"LibreOffice conversion failed with CalledProcessError: {e}"
-                )
-                attempts += 1
-            except Exception as e:
-                self.logger.error(f"Unexpected error during conversion: {e}")
-                attempts += 1
+            pending = [
+                source_path for source_path in pending if source_path not in converted
+            ]
+            attempts += 1
 
-        self.logger.error(
-            f"Conversion failed after {self.max_retries} attempts: Source: {source_path}, Output: {output_full_path}"
-        )
-        return False, output_full_path
+            if process_failed and len(pending) > 1:
+                # Likely one file hung or crashed LibreOffice, rerunning the batch would fail again after waiting out
+                # the timeout of every file in it. One at a time, the bad file only costs its own attempts
+                self.logger.warning(
+                    f"Converting the remaining {len(pending)} files of the batch one at a time"
+                )
+                for source_path in pending:
+                    converted |= await self._convert_pending(
+                        [source_path], output_full_paths, output_path, user_profile_path
+                    )
+                break
+        return converted
 
-    def _prepare_environment_and_output_file(
-        self, output_full_path: str, user_profile_path: str
-    ):
-        env = os.environ.copy()
-        env["UserInstallation"] = f"file://{user_profile_path}"
+    def _batch_timeout(self, source_paths: list) -> float:
+        if self.timeout is None:
+            return None
+        return self.timeout * len(source_paths)
 
+    def _remove_existing_output_file(self, output_full_path: str):
         if os.path.exists(output_full_path):
             os.remove(output_full_path)
             self.logger.info(
@@ -81,29 +220,38 @@ class PPTXToPDFConverter:
             )
 
     async def _execute_conversion(
-        self, source_path: str, output_path: str, user_profile_path: str
+        self, source_paths: list, output_path: str, user_profile_path: str
     ):
-        # Set the user profile path in the environment variable
-        env = os.environ.copy()
-        env["UserInstallation"] = f"file://{user_profile_path}"
-
-        self.logger.info(f"Attempting to convert file: {source_path} to {output_path}")
+        self.logger.info(
+            f"Attempting to convert files: {source_paths} to {output_path}"
+        )
 
         process = await asyncio.create_subprocess_exec(
             "libreoffice",
+            # LibreOffice only reads the profile location from its command line
+            f"-env:UserInstallation=file://{user_profile_path}",
             "--headless",
             "--norestore",
             "--convert-to",
             "pdf",
-            source_path,
+            *source_paths,
             "--outdir",
             output_path,
-            env=env,  # Use the modified environment
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
         )
 
-        stdout, stderr = await process.communicate()
+        try:
+            # A batch gets the per-file timeout for each of its files
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(), timeout=self._batch_timeout(source_paths)
+            )
+        except asyncio.TimeoutError:
+            # Don't leave a hung soffice process holding on to the user profile
+            process.kill()
+            await process.wait()
+            raise
+
         if process.returncode != 0:
             self.logger.error(
                 f"LibreOffice conversion failed, Return Code: {process.returncode}, Stdout: {stdout.decode()}, Stderr: {stderr.decode()}"
@@ -115,3 +263,111 @@ class PPTXToPDFConverter:
         self.logger.info(
             f"LibreOffice conversion command executed, Stdout: {stdout.decode()}, Stderr: {stderr.decode()}"
         )
+
+
+class PPTXConversionPool:
+    """
+    Converts many PPTX files to PDF with a bounded number of LibreOffice processes running at once.
+
+    Files are grouped into batches of up to batch_size files sharing an output directory, and each batch is converted
+    by a single LibreOffice process so startup cost is paid once per batch instead of once per file.
+    Each worker owns one LibreOffice user profile and reuses it for every batch it converts, so only the first
+    conversion per worker pays for creating the profile and one profile is never used by two processes at once.
+    Profiles are removed once all conversions finish.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_retries: int = 3,
+        timeout: float = 300,
+        batch_size: int = 10,
+        cache: ConversionCache = None,
+    ):
+        """
+        :param max_workers: Maximum number of LibreOffice processes running at once.
+        :param max_retries: Number of conversion attempts per file.
+        :param timeout: Seconds LibreOffice may take per file before the process is killed.
+        :param batch_size: Maximum number of files converted by one LibreOffice process.
+        :param cache: Optional cache of previous conversions.
+        """
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+        self.converter = PPTXToPDFConverter(
+            max_retries=max_retries, timeout=timeout, cache=cache
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def _create_batches(self, conversions: list) -> list:
+        """Group (index, (source_path, output_file)) items by output directory and split them into batches."""
+        conversions_by_output_path = {}
+        for index, (source_path, output_file) in enumerate(conversions):
+            output_path, _ = self.converter._prepare_output_paths(output_file)
+            conversions_by_output_path.setdefault(output_path, []).append(
+                (index, (source_path, output_file))
+            )
+
+        batches = []
+        for output_path_conversions in conversions_by_output_path.values():
+            for i in range(0, len(output_path_conversions), self.batch_size):
+                batches.append(output_path_conversions[i : i + self.batch_size])
+        return batches
+
+    async def convert_all(self, conversions: list, source_hashes: dict = None) -> list:
+        """
+        Convert a list of (source_path, output_file) pairs.
+
+        :param conversions: List of (source_path, output_file) pairs.
+        :param source_hashes: Optional dict of source path to SHA256, files with a cached conversion skip LibreOffice.
+        :return: One result per conversion, in the same order. Each result is the (success, output_path) tuple
+                 returned by PPTXToPDFConverter.convert or the exception raised while converting.
+        """
+        queue = asyncio.Queue()
+        for batch in self._create_batches(conversions):
+            queue.put_nowait(batch)
+
+        results = [None] * len(conversions)
+        worker_count = min(self.max_workers, queue.qsize())
+        user_profile_paths = [
+            self.converter._create_user_profile_path() for _ in range(worker_count)
+        ]
+        try:
+            await asyncio.gather(
+                *[
+                    self._worker(queue, results, user_profile_path, source_hashes)
+                    for user_profile_path in user_profile_paths
+                ]
+            )
+        finally:
+            for user_profile_path in user_profile_paths:
+                shutil.rmtree(user_profile_path, ignore_errors=True)
+
+        return results
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue,
+        results: list,
+        user_profile_path: str,
+        source_hashes: dict,
+    ):
+        while True:
+            try:
+                batch = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                batch_results = await self.converter.convert_batch(
+                    [conversion for _, conversion in batch],
+                    user_profile_path=user_profile_path,
+                    source_hashes=source_hashes,
+                )
+                for (index, _), result in zip(batch, batch_results):
+                    results[index] = result
+            except Exception as e:
+                self.logger.error(
+                    f"Unexpected error converting {[conversion for _, conversion in batch]}: {e}"
+                )
+                for index, _ in batch:
+                    results[index] = e
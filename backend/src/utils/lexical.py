@@ -0,0 +1,25 @@
+# /src/utils/lexical.py
+# Tokenization shared by the lexical scorers, so queries and document text are split into terms the same way.
+
+# Utilities
+import re
+
+TOKEN = re.compile(r"[a-z0-9]+(?:[._'-][a-z0-9]+)*")
+# Common English words that carry no signal for matching a query to a passage
+STOPWORDS = frozenset(
+    """a an and are as at be but by can do does for from has have how i if in into is it its of on or our
+    should so than that the their them then there these they this to was we were what when where which who
+    why will with you your""".split()
+)
+
+
+def tokenize(text: str) -> list:
+    """
+    Split text into lowercase terms, without stopwords.
+
+    Terms joined by dots, hyphens, apostrophes or underscores, e.g. file names, versions and identifiers, are kept
+    whole.
+    """
+    if not text:
+        return []
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
@@ -1,10 +1,14 @@
 import logging
 
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from src.utils.config import load_config
 import time
 from qdrant_client.http import models as qdrant_models
 
+# Vector names QdrantVectorStore uses for collections with hybrid search enabled
+DENSE_VECTOR_NAME = "text-dense"
+SPARSE_VECTOR_NAME = "text-sparse"
+
 
 class QdrantManager:
     """
@@ -18,11 +22,18 @@ class QdrantManager:
         if not self.QDRANT_URL:
             raise ValueError("QDRANT_URL is not set")
         self.client = QdrantClient(url=self.QDRANT_URL)
+        self.async_client = None
         self.check_qdrant()
 
     def get_client(self):
         return self.client
 
+    def get_async_client(self):
+        """Async client for the llama_index async paths (IngestionPipeline.arun), created on first use."""
+        if self.async_client is None:
+            self.async_client = AsyncQdrantClient(url=self.QDRANT_URL)
+        return self.async_client
+
     def check_qdrant(self):
         """check_qdrant function checks if qdrant is available \n
         Returns:
@@ -48,15 +59,50 @@ class QdrantManager:
         except Exception:
             return False
 
-    def create_collection(self, collection_name: str, vector_size: int):
+    def create_collection(
+        self, collection_name: str, vector_size: int, hybrid: bool = None
+    ):
+        """
+        (Re)create a collection.
+
+        :param hybrid: Store a named sparse vector next to the dense one, for hybrid search.
+            Defaults to Qdrant.hybrid_search in the config.
+        """
+        if hybrid is None:
+            hybrid = self.CONFIG["Qdrant"].get("hybrid_search", False)
+        if not hybrid:
+            self.client.recreate_collection(
+                collection_name=collection_name,
+                vectors_config={"size": vector_size, "distance": "Cosine"},
+            )
+            return
         self.client.recreate_collection(
             collection_name=collection_name,
-            vectors_config={"size": vector_size, "distance": "Cosine"},
+            vectors_config={
+                DENSE_VECTOR_NAME: qdrant_models.VectorParams(
+                    size=vector_size, distance=qdrant_models.Distance.COSINE
+                )
+            },
+            sparse_vectors_config={
+                SPARSE_VECTOR_NAME: qdrant_models.SparseVectorParams(
+                    index=qdrant_models.SparseIndexParams()
+                )
+            },
         )
 
-    def ensure_collection(self, collection_name: str, vector_size: int):
+    def ensure_collection(
+        self, collection_name: str, vector_size: int, hybrid: bool = None
+    ):
         if not self.collection_exists(collection_name):
-            self.create_collection(collection_name, vector_size)
+            self.create_collection(collection_name, vector_size, hybrid=hybrid)
+
+    def is_hybrid_collection(self, collection_name: str) -> bool:
+        """Whether the collection stores sparse vectors, collections created before hybrid search are dense only."""
+        try:
+            params = self.client.get_collection(collection_name).config.params
+        except Exception:
+            return False
+        return SPARSE_VECTOR_NAME in (params.sparse_vectors or {})
 
     def check_record_in_collection(
         self, collection_name: str, count_filter: qdrant_models.Filter = None
@@ -97,3 +143,26 @@ class QdrantManager:
                 ]
             ),
         )
+
+    def delete_url_points(self, collection_name: str, url: str, keep_ids=None):
+        """
+        Delete the points loaded from url, including copies left by earlier loads.
+
+        :param keep_ids: Ids of points to keep, e.g. those just upserted for url.
+        """
+        must_not = []
+        if keep_ids:
+            must_not.append(qdrant_models.HasIdCondition(has_id=list(keep_ids)))
+        self.client.delete(
+            collection_name=collection_name,
+            points_selector=qdrant_models.FilterSelector(
+                filter=qdrant_models.Filter(
+                    must=[
+                        qdrant_models.FieldCondition(
+                            key="url", match=qdrant_models.MatchValue(value=url)
+                        )
+                    ],
+                    must_not=must_not,
+                )
+            ),
+        )
@@ -0,0 +1,155 @@
+# test_crawler.py
+
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+import httpx
+
+from src.loader.crawler import AsyncWebCrawler
+from src.loader.http_cache import HttpCache
+
+SITE = {
+    "/robots.txt": "User-agent: *\nDisallow: /private/\n",
+    "/docs/": '<a href="/docs/a">a</a> <a href="/docs/b#intro">b</a> <a href="/private/c">c</a>',
+    "/docs/a": '<a href="/docs/b">b</a> <a href="/docs/deep">deep</a>',
+    "/docs/b": '<a href="/docs/">home</a>',
+    "/docs/deep": "too deep",
+    "/private/c": "disallowed",
+}
+
+
+def crawl(requested, **kwargs):
+    def handler(request):
+        requested.append(request.url.path)
+        body = SITE.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        return httpx.Response(200, text=body, headers={"content-type": "text/html"})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            crawler = AsyncWebCrawler(client=client, **kwargs)
+            return [page async for page in crawler.crawl("https://example.com/docs/")]
+
+    return asyncio.run(run())
+
+
+def test_crawl_dedups_and_respects_depth_and_robots():
+    requested = []
+    pages = crawl(requested, max_depth=2, prevent_outside=False)
+
+    assert sorted(page.url for page in pages) == [
+        "https://example.com/docs/",
+        "https://example.com/docs/a",
+        "https://example.com/docs/b",
+    ]
+    # Pages past max_depth and those disallowed by robots.txt are never requested, nor is anything twice
+    assert "/docs/deep" not in requested
+    assert "/private/c" not in requested
+    assert requested.count("/docs/b") == 1
+
+
+def test_crawl_stops_at_max_documents():
+    requested = []
+    pages = crawl(requested, max_depth=3, max_documents=2, max_concurrency=1)
+
+    assert len(pages) == 2
+    assert len([path for path in requested if path != "/robots.txt"]) == 2
+
+
+def test_crawl_sends_conditional_requests_and_detects_unchanged_pages(tmp_path):
+    http_cache = HttpCache(str(tmp_path / "http_cache.db"))
+    bodies = {"/docs/": '<a href="/docs/a">a</a>', "/docs/a": "version 1"}
+
+    def handler(request):
+        if (
+            request.url.path == "/docs/"
+            and request.headers.get("if-none-match") == '"v1"'
+        ):
+            return httpx.Response(304)
+        body = bodies.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        headers = {"content-type": "text/html"}
+        if request.url.path == "/docs/":
+            headers["etag"] = '"v1"'
+        return httpx.Response(200, text=body, headers=headers)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            crawler = AsyncWebCrawler(client=client, max_depth=2, http_cache=http_cache)
+            pages = [page async for page in crawler.crawl("https://example.com/docs/")]
+            crawler.remember(pages)
+            return {page.url: page.changed for page in pages}
+
+    assert asyncio.run(run()) == {
+        "https://example.com/docs/": True,
+        "https://example.com/docs/a": True,
+    }
+    # The root answers 304 but its cached links keep the crawl going, the child is unchanged by body hash
+    assert asyncio.run(run()) == {
+        "https://example.com/docs/": False,
+        "https://example.com/docs/a": False,
+    }
+    bodies["/docs/a"] = "version 2"
+    assert asyncio.run(run())["https://example.com/docs/a"] is True
+
+
+def recrawl_site(http_cache, bodies, max_documents):
+    def handler(request):
+        body = bodies.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200, text=body, headers={"content-type": "text/html", "etag": '"v1"'}
+        )
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            crawler = AsyncWebCrawler(
+                client=client,
+                max_depth=2,
+                max_documents=max_documents,
+                http_cache=http_cache,
+            )
+            pages = [page async for page in crawler.crawl("https://example.com/docs/")]
+            return crawler, pages
+
+    return asyncio.run(run())
+
+
+def test_pages_dropped_at_max_documents_are_not_cached(tmp_path):
+    http_cache = HttpCache(str(tmp_path / "http_cache.db"))
+    bodies = {
+        "/docs/": " ".join(f'<a href="/docs/{i}">{i}</a>' for i in range(5)),
+        **{f"/docs/{i}": f"page {i}" for i in range(5)},
+    }
+
+    crawler, pages = recrawl_site(http_cache, bodies, max_documents=2)
+    assert len(pages) == 2
+    # Children fetched concurrently past the limit were dropped, only what was processed is remembered
+    crawler.remember(pages)
+
+    _, pages = recrawl_site(http_cache, bodies, max_documents=10)
+    changed = {page.url for page in pages if page.changed}
+    assert len(pages) == 6
+    assert len(changed) == 4
+    assert "https://example.com/docs/" not in changed
+
+
+def test_aborted_load_leaves_the_cache_untouched(tmp_path):
+    http_cache = HttpCache(str(tmp_path / "http_cache.db"))
+    bodies = {"/docs/": '<a href="/docs/a">a</a>', "/docs/a": "page a"}
+
+    # The crawl completes but its pages are never remembered, e.g. because ingestion raised
+    recrawl_site(http_cache, bodies, max_documents=None)
+    assert http_cache.get("https://example.com/docs/") is None
+
+    _, pages = recrawl_site(http_cache, bodies, max_documents=None)
+    assert all(page.changed for page in pages)
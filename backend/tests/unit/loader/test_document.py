@@ -0,0 +1,190 @@
+# test_document.py
+
+import asyncio
+import pytest
+import sys
+import os
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from llama_index import VectorStoreIndex
+from llama_index.callbacks import LlamaDebugHandler
+from llama_index.schema import TransformComponent
+from llama_index.token_counter.mock_embed_model import MockEmbedding
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import AsyncQdrantClient
+
+import src.loader.file_hash_manager as file_hash_manager
+from src.loader.document import DocumentLoader
+from src.loader.file_hash_manager import create_database, get_file_hash
+from src.loader.metadata_extraction import MetadataIngestionPipeline
+
+
+class FakeQdrantManager:
+    def __init__(self):
+        # The pipeline only writes through the async client
+        self.aclient = AsyncQdrantClient(location=":memory:")
+
+    def get_client(self):
+        return None
+
+    def get_async_client(self):
+        return self.aclient
+
+    def is_hybrid_collection(self, collection_name):
+        return False
+
+
+class FakePhoenix:
+    def __init__(self):
+        self.callback_handler = LlamaDebugHandler()
+
+
+class FailingExtractor(TransformComponent):
+    def __call__(self, nodes, **kwargs):
+        raise KeyError("title")
+
+
+class FailingEmbedding(MockEmbedding):
+    async def _aget_text_embeddings(self, texts):
+        raise RuntimeError("embedding deployment unavailable")
+
+
+def build_loader(tmp_path, files):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    for name, text in files.items():
+        (source_dir / name).write_text(text)
+
+    loader = DocumentLoader.__new__(DocumentLoader)
+    loader.source_dir = str(source_dir)
+    loader.collection_name = "test"
+    loader.move_after_processing = False
+    loader.re_process_files = False
+    loader.extensions_to_process = [".md"]
+    loader.extraction_profile = "fast"
+    loader.embed_model = MockEmbedding(embed_dim=8)
+    loader.qdrant = FakeQdrantManager()
+    loader.phoenix_tracer = FakePhoenix()
+    # Hash stores are shared per name for the life of the process
+    loader.hashes_db_name = f"{tmp_path.name}_file_hashes.db"
+    loader.hash_workers = 1
+    loader.hash_with_processes = False
+    loader.document_batch_size = 2
+    loader.pipeline_persist_dir = str(tmp_path / "pipeline")
+    loader.transformation_cache = False
+    create_database(loader.hashes_db_name)
+    return loader
+
+
+@pytest.fixture(autouse=True)
+def environment(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_hash_manager, "db_path", f"{tmp_path}/")
+    # ServiceContext.from_defaults resolves its default LLM even when only embeddings are used
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+
+def test_file_hashes_are_recorded_as_each_batch_succeeds(tmp_path, monkeypatch):
+    loader = build_loader(
+        tmp_path, {f"{name}.md": f"# {name}\n\nBody of {name}" for name in "abcd"}
+    )
+    ingest_batch = loader._ingest_batch
+    batches = []
+
+    async def fail_second_batch(batch_files, *args):
+        batches.append(batch_files)
+        if len(batches) == 2:
+            raise RuntimeError("embedding deployment unavailable")
+        return await ingest_batch(batch_files, *args)
+
+    monkeypatch.setattr(loader, "_ingest_batch", fail_second_batch)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(loader.load_documents())
+
+    assert all(get_file_hash(loader.hashes_db_name, file) for file in batches[0])
+    assert not any(get_file_hash(loader.hashes_db_name, file) for file in batches[1])
+    # The docstore is saved on the way out, so the next run skips the first batch's documents
+    pipeline = MetadataIngestionPipeline.build_pipeline(
+        profile="fast", persist_dir=loader.pipeline_persist_dir
+    )
+    assert {
+        doc_id.rsplit("_part_", 1)[0]
+        for doc_id in pipeline.docstore.get_all_document_hashes().values()
+    } == set(batches[0])
+
+
+def test_pipeline_is_persisted_once_per_run(tmp_path, monkeypatch):
+    loader = build_loader(
+        tmp_path, {f"{name}.md": f"# {name}\n\nBody of {name}" for name in "abcde"}
+    )
+    persisted = []
+    persist_pipeline = MetadataIngestionPipeline.persist_pipeline
+    monkeypatch.setattr(
+        MetadataIngestionPipeline,
+        "persist_pipeline",
+        staticmethod(lambda *args: persisted.append(persist_pipeline(*args))),
+    )
+
+    asyncio.run(loader.load_documents())
+
+    # Three batches of document_batch_size files
+    assert len(persisted) == 1
+
+
+def test_extraction_failure_falls_back_off_the_event_loop(tmp_path, monkeypatch):
+    loader = build_loader(tmp_path, {"a.md": "# a\n\nBody of a"})
+    pipeline = MetadataIngestionPipeline.build_pipeline(
+        profile="fast",
+        vector_store=QdrantVectorStore(
+            aclient=loader.qdrant.get_async_client(), collection_name="test"
+        ),
+        persist_dir=loader.pipeline_persist_dir,
+    )
+    pipeline.transformations.append(FailingExtractor())
+    threads = []
+    monkeypatch.setattr(
+        VectorStoreIndex,
+        "from_documents",
+        classmethod(
+            lambda cls, *args, **kwargs: threads.append(threading.current_thread())
+        ),
+    )
+
+    documents, _ = asyncio.run(
+        loader._ingest_batch(
+            [os.path.join(loader.source_dir, "a.md")], pipeline, None, None
+        )
+    )
+
+    assert threads and threads[0] is not threading.main_thread()
+    # Its metadata is extracted next run instead of the document being skipped as unchanged
+    assert pipeline.docstore.get_document_hash(documents[0].doc_id) is None
+
+
+def test_changed_file_stays_searchable_when_its_ingestion_fails(tmp_path):
+    loader = build_loader(tmp_path, {"a.md": "# a\n\nFirst version"})
+    client = loader.qdrant.get_async_client()
+
+    async def texts():
+        points, _ = await client.scroll("test", with_payload=True)
+        return [point.payload["_node_content"] for point in points]
+
+    asyncio.run(loader.load_documents())
+    assert [text for text in asyncio.run(texts()) if "First version" in text]
+
+    (tmp_path / "source" / "a.md").write_text("# a\n\nSecond version")
+    loader.embed_model = FailingEmbedding(embed_dim=8)
+    with pytest.raises(RuntimeError):
+        asyncio.run(loader.load_documents())
+
+    # The old points are only replaced once the new ones are upserted
+    assert len(asyncio.run(texts())) == 1
+    assert "First version" in asyncio.run(texts())[0]
+
+    loader.embed_model = MockEmbedding(embed_dim=8)
+    asyncio.run(loader.load_documents())
+    (text,) = asyncio.run(texts())
+    assert "Second version" in text
@@ -0,0 +1,57 @@
+# test_enrichment.py
+
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from llama_index import Document
+from llama_index.llms import MockLLM
+from llama_index.token_counter.mock_embed_model import MockEmbedding
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from llama_index.vector_stores.types import VectorStoreQuery
+from qdrant_client import QdrantClient
+
+from src.loader.enrichment import MetadataEnricher
+from src.loader.metadata_extraction import MetadataIngestionPipeline
+
+
+def test_enricher_patches_fast_profile_points_in_place():
+    client = QdrantClient(location=":memory:")
+    vector_store = QdrantVectorStore(client=client, collection_name="test")
+    pipeline = MetadataIngestionPipeline.build_pipeline(
+        profile="fast",
+        vector_store=vector_store,
+        embed_model=MockEmbedding(embed_dim=8),
+    )
+    pipeline.run(
+        documents=[
+            Document(text="# Vector search\nQdrant stores the embeddings.", id_="a.md"),
+            Document(text="# Retrieval\nNodes are reranked.", id_="b.md"),
+        ]
+    )
+    points, _ = client.scroll(collection_name="test", with_payload=True)
+    assert all("section_summary" not in point.payload for point in points)
+
+    enricher = MetadataEnricher(
+        client=client,
+        collection_name="test",
+        extractors=MetadataIngestionPipeline.build_enrichment_extractors(
+            llm=MockLLM(max_tokens=5), cache_llm_responses=False
+        ),
+        batch_size=1,
+    )
+    assert asyncio.run(enricher.enrich()) == 2
+    # Nothing is left pending on a second run
+    assert asyncio.run(enricher.enrich()) == 0
+
+    # Queried nodes carry the new metadata, and the fast profile's title is kept
+    result = vector_store.query(
+        VectorStoreQuery(query_embedding=[0.5] * 8, similarity_top_k=2)
+    )
+    for node in result.nodes:
+        assert node.metadata["section_summary"]
+        assert node.metadata["questions_this_excerpt_can_answer"]
+        assert node.metadata["document_title"] in ("Vector search", "Retrieval")
@@ -12,7 +12,11 @@ from src.loader.file_hash_manager import (
     insert_or_update_file_hash,
     get_file_hash,
     calculate_file_hash,
+    filter_unchanged_files,
+    afilter_unchanged_files,
     hash_and_store_processed_files,
+    get_hash_store,
+    FileHashRecord,
 )
 
 
@@ -56,3 +60,116 @@ def test_hash_and_store_processed_files(db_name):
     assert get_file_hash(db_name, test_file_path) == calculate_file_hash(test_file_path)
 
     os.remove(test_file_path)
+
+
+def test_filter_unchanged_files(db_name):
+    # Create files for testing, only one of them has been processed before
+    unchanged_file_path = "unchanged.txt"
+    changed_file_path = "changed.txt"
+    with open(unchanged_file_path, "w") as f:
+        f.write("This file has already been processed.")
+    with open(changed_file_path, "w") as f:
+        f.write("This file is new.")
+    hash_and_store_processed_files([unchanged_file_path], [], db_name)
+
+    changed_files, unchanged_files, current_records = filter_unchanged_files(
+        [unchanged_file_path, changed_file_path], db_name
+    )
+
+    assert changed_files == [changed_file_path]
+    assert unchanged_files == [unchanged_file_path]
+    assert current_records[changed_file_path].file_hash == calculate_file_hash(
+        changed_file_path
+    )
+
+    os.remove(unchanged_file_path)
+    os.remove(changed_file_path)
+
+
+def test_hash_store_bulk_upsert_and_get(db_name):
+    # Test FileHashStore.upsert_many and FileHashStore.get_many
+    store = get_hash_store(db_name)
+    records = [
+        FileHashRecord("bulk_1.txt", "hash_1", 10, 1000),
+        FileHashRecord("bulk_2.txt", "hash_2", 20, 2000),
+    ]
+    store.upsert_many(records)
+
+    stored_records = store.get_many(["bulk_1.txt", "bulk_2.txt", "missing.txt"])
+
+    assert stored_records == {record.file_path: record for record in records}
+    assert get_file_hash(db_name, "bulk_2.txt") == "hash_2"
+
+
+def test_hash_store_is_shared(db_name):
+    assert get_hash_store(db_name) is get_hash_store(db_name)
+
+
+def test_hash_and_store_processed_files_stores_size_and_mtime(db_name):
+    test_file_path = "test_stat.txt"
+    with open(test_file_path, "w") as f:
+        f.write("This is a test file.")
+
+    hash_and_store_processed_files([test_file_path], [], db_name)
+
+    record = get_hash_store(db_name).get(test_file_path)
+    assert record.file_size == os.path.getsize(test_file_path)
+    assert record.mtime_ns == os.stat(test_file_path).st_mtime_ns
+
+    os.remove(test_file_path)
+
+
+def test_filter_unchanged_files_skips_hashing_when_stat_matches(db_name):
+    test_file_path = "test_fast_path.txt"
+    with open(test_file_path, "w") as f:
+        f.write("This is a test file.")
+    file_stat = os.stat(test_file_path)
+
+    # Store a hash that doesn't match the content, it's only trusted while the stat is unchanged
+    get_hash_store(db_name).upsert(
+        test_file_path,
+        "stored_hash",
+        file_stat.st_size,
+        file_stat.st_mtime_ns,
+        file_stat.st_ino,
+    )
+    _, unchanged_files, current_records = filter_unchanged_files(
+        [test_file_path], db_name
+    )
+    assert unchanged_files == [test_file_path]
+    assert current_records[test_file_path].file_hash == "stored_hash"
+
+    # Touching the file changes its mtime, so it gets re-hashed
+    os.utime(test_file_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1))
+    changed_files, _, current_records = filter_unchanged_files(
+        [test_file_path], db_name
+    )
+    assert changed_files == [test_file_path]
+    assert current_records[test_file_path].file_hash == calculate_file_hash(
+        test_file_path
+    )
+
+    os.remove(test_file_path)
+
+
+@pytest.mark.asyncio
+async def test_afilter_unchanged_files_matches_filter_unchanged_files(db_name):
+    test_file_paths = [f"test_concurrent_{i}.txt" for i in range(5)]
+    for i, test_file_path in enumerate(test_file_paths):
+        with open(test_file_path, "w") as f:
+            f.write(f"This is test file {i}.")
+    hash_and_store_processed_files(test_file_paths[:2], [], db_name)
+
+    changed_files, unchanged_files, current_records = await afilter_unchanged_files(
+        test_file_paths + ["missing_file.txt"], db_name, max_workers=2
+    )
+
+    assert unchanged_files == test_file_paths[:2]
+    assert changed_files == test_file_paths[2:] + ["missing_file.txt"]
+    assert all(
+        current_records[path].file_hash == calculate_file_hash(path)
+        for path in test_file_paths
+    )
+
+    for test_file_path in test_file_paths:
+        os.remove(test_file_path)
@@ -0,0 +1,37 @@
+# test_freshness_index.py
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from src.loader.freshness_index import FreshnessIndex, RefreshDecision
+
+URL = "https://example.com/docs/"
+
+
+def test_change_policy_replaces_pages_whose_text_changed(tmp_path):
+    index = FreshnessIndex(str(tmp_path / "index.db"), policy="change")
+
+    assert index.decide("techdocs", URL, "version 1") == RefreshDecision.ADD
+    index.record("techdocs", {URL: "version 1"})
+    assert index.decide("techdocs", URL, "version 1") == RefreshDecision.SKIP
+    assert index.decide("techdocs", URL, "version 2") == RefreshDecision.REPLACE
+    # Pages are tracked per collection
+    assert index.decide("other", URL, "version 1") == RefreshDecision.ADD
+
+
+def test_ttl_policy_waits_before_replacing_changed_pages(tmp_path):
+    index = FreshnessIndex(str(tmp_path / "index.db"), policy="ttl", ttl_seconds=60)
+    index.record("techdocs", {URL: "version 1"})
+    ingested_at = index.get("techdocs", URL).ingested_at
+
+    assert (
+        index.decide("techdocs", URL, "version 2", now=ingested_at + 30)
+        == RefreshDecision.DEFER
+    )
+    assert (
+        index.decide("techdocs", URL, "version 2", now=ingested_at + 90)
+        == RefreshDecision.REPLACE
+    )
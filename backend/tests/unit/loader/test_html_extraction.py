@@ -0,0 +1,85 @@
+# test_html_extraction.py
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from src.loader.html_extraction import extract_page
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <title>Retrievers | Docs</title>
+  <meta name="description" content="How retrievers work">
+  <script>var tracking = "<p>not content</p>";</script>
+  <style>p { color: red; }</style>
+</head>
+<body>
+  <header><a href="/">Home</a></header>
+  <nav><ul><li><a href="/docs/a">Sidebar link</a></li></ul></nav>
+  <main>
+    <h1>Retrievers</h1>
+    <p>A <strong>retriever</strong> returns <a href="nodes">nodes</a> for a query.</p>
+    <pre><code class="language-python">retriever = index.as_retriever()
+nodes = retriever.retrieve("query")</code></pre>
+    <ul><li>Dense</li><li>Sparse<ul><li>BM25</li></ul></li></ul>
+    <table><tr><th>Name</th><th>Type</th></tr><tr><td>top_k</td><td>int</td></tr></table>
+  </main>
+  <footer>Copyright</footer>
+</body>
+</html>"""
+
+
+def test_extract_page_returns_markdown_and_metadata_from_one_parse():
+    text, metadata = extract_page(PAGE, "https://example.com/docs/retrievers/")
+
+    assert metadata["url"] == "https://example.com/docs/retrievers/"
+    assert metadata["title"] == "Retrievers | Docs"
+    assert metadata["description"] == "How retrievers work"
+    assert metadata["language"] == "en"
+    assert text == (
+        "# Retrievers\n\n"
+        "A **retriever** returns [nodes](https://example.com/docs/retrievers/nodes) for a query.\n\n"
+        "```python\n"
+        "retriever = index.as_retriever()\n"
+        'nodes = retriever.retrieve("query")\n'
+        "```\n\n"
+        "- Dense\n"
+        "- Sparse\n"
+        "  - BM25\n\n"
+        "| Name | Type |\n"
+        "| --- | --- |\n"
+        "| top_k | int |"
+    )
+
+
+def test_extract_page_drops_boilerplate_without_main_element():
+    text, _ = extract_page(
+        "<html><body><nav>Menu</nav><p>Body text</p><footer>Footer</footer></body></html>",
+        "https://example.com/",
+    )
+
+    assert text == "Body text"
+
+
+def test_extract_page_keeps_pages_wrapped_in_a_form():
+    text, _ = extract_page(
+        "<html><body><form><div><h1>Title</h1><p>Real page body</p></div>"
+        "<select><option>Choose</option></select><button>Submit</button></form></body></html>",
+        "https://example.com/",
+    )
+
+    assert text == "# Title\n\nReal page body"
+
+
+def test_extract_page_keeps_every_article_of_an_index():
+    text, _ = extract_page(
+        "<html><body><nav>Menu</nav>"
+        "<article><h2>First post</h2><p>One</p></article>"
+        "<article><h2>Second post</h2><p>Two</p></article></body></html>",
+        "https://example.com/blog/",
+    )
+
+    assert text == "## First post\n\nOne\n\n## Second post\n\nTwo"
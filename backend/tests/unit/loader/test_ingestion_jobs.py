@@ -0,0 +1,63 @@
+# test_ingestion_jobs.py
+
+import asyncio
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from src.loader.ingestion_jobs import (
+    IngestionJobManager,
+    IngestionJobStatus,
+    IngestionFileStatus,
+)
+
+
+@pytest.mark.asyncio
+async def test_job_reports_progress_and_result():
+    manager = IngestionJobManager()
+
+    async def run(progress):
+        progress.set_file_status(["a.md", "b.md"], IngestionFileStatus.QUEUED)
+        progress.set_file_status(["c.md"], IngestionFileStatus.SKIPPED)
+        progress.record_batch(["a.md", "b.md"], nodes=4, tokens=100)
+        return "done"
+
+    job = manager.submit(run)
+    assert manager.get(job.job_id) is job
+    await job.task
+
+    assert job.status == IngestionJobStatus.COMPLETED
+    assert job.result == "done"
+    progress = job.progress.to_dict()
+    assert progress["total_files"] == 3
+    assert progress["processed_files"] == 2
+    assert progress["skipped_files"] == 1
+    assert progress["nodes"] == 4
+    assert progress["tokens"] == 100
+    assert progress["files"]["a.md"] == "processed"
+
+
+@pytest.mark.asyncio
+async def test_job_failure_and_cancellation():
+    manager = IngestionJobManager()
+
+    async def fail(progress):
+        raise ValueError("bad source directory")
+
+    async def block(progress):
+        await asyncio.Event().wait()
+
+    failed_job = manager.submit(fail)
+    await failed_job.task
+    assert failed_job.status == IngestionJobStatus.FAILED
+    assert failed_job.error == "bad source directory"
+
+    blocked_job = manager.submit(block)
+    await asyncio.sleep(0)
+    manager.cancel(blocked_job.job_id)
+    await blocked_job.task
+    assert blocked_job.status == IngestionJobStatus.CANCELLED
+    assert manager.cancel("unknown") is None
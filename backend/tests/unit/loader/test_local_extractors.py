@@ -0,0 +1,45 @@
+# test_local_extractors.py
+
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from llama_index.schema import NodeRelationship, RelatedNodeInfo, TextNode
+
+from src.loader.local_extractors import HeadingTitleExtractor, RakeKeywordExtractor
+
+
+def node(text, doc_id="doc", **metadata):
+    return TextNode(
+        text=text,
+        metadata=metadata,
+        relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=doc_id)},
+    )
+
+
+@pytest.mark.asyncio
+async def test_title_comes_from_first_heading_of_the_document():
+    nodes = [
+        node("Intro text\n# Retrieval Augmented Generation\nMore text"),
+        node("A later chunk without headings"),
+        node("No headings here", doc_id="other", file_name="pitch_card.pdf"),
+    ]
+
+    titles = await HeadingTitleExtractor().aextract(nodes)
+
+    assert titles == [
+        {"document_title": "Retrieval Augmented Generation"},
+        {"document_title": "Retrieval Augmented Generation"},
+        {"document_title": "pitch card"},
+    ]
+
+
+def test_rake_prefers_multi_word_phrases():
+    keywords = RakeKeywordExtractor(keywords=2).extract_keywords(
+        "Vector search is fast. The retrieval pipeline uses vector search."
+    )
+
+    assert keywords == ["retrieval pipeline", "vector search"]
@@ -0,0 +1,98 @@
+# test_metadata_extraction.py
+
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from llama_index import Document
+from llama_index.token_counter.mock_embed_model import MockEmbedding
+from llama_index.llms import MockLLM
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from src.loader.metadata_extraction import MetadataIngestionPipeline
+
+
+def build_pipeline(vector_store, persist_dir):
+    return MetadataIngestionPipeline.build_pipeline(
+        llm=MockLLM(),
+        extract_summary=False,
+        extract_questions_answered=False,
+        vector_store=vector_store,
+        embed_model=MockEmbedding(embed_dim=8),
+        persist_dir=persist_dir,
+        cache_llm_responses=False,
+    )
+
+
+def count_points(client):
+    return client.count(collection_name="test").count
+
+
+def test_pipeline_upserts_documents_across_runs(tmp_path):
+    persist_dir = str(tmp_path / "pipeline")
+    client = QdrantClient(location=":memory:")
+    vector_store = QdrantVectorStore(client=client, collection_name="test")
+
+    pipeline = build_pipeline(vector_store, persist_dir)
+    nodes = pipeline.run(documents=[Document(text="first version", id_="doc.md")])
+    MetadataIngestionPipeline.persist_pipeline(pipeline, persist_dir)
+    assert len(nodes) == 1
+    assert count_points(client) == 1
+
+    # A fresh pipeline loads the persisted docstore and skips the unchanged document
+    pipeline = build_pipeline(vector_store, persist_dir)
+    assert pipeline.run(documents=[Document(text="first version", id_="doc.md")]) == []
+
+    # A changed document replaces its points instead of adding to them
+    nodes = pipeline.run(documents=[Document(text="second version", id_="doc.md")])
+    assert len(nodes) == 1
+    assert count_points(client) == 1
+
+    # Marking a document for re-processing runs it again even though it is unchanged
+    MetadataIngestionPipeline.mark_for_reprocessing(pipeline, ["doc.md"])
+    nodes = pipeline.run(documents=[Document(text="second version", id_="doc.md")])
+    assert len(nodes) == 1
+    assert count_points(client) == 1
+
+
+def test_fast_profile_only_uses_local_extractors():
+    pipeline = MetadataIngestionPipeline.build_pipeline(profile="fast")
+
+    assert [type(t).__name__ for t in pipeline.transformations] == [
+        "SentenceSplitter",
+        "HeadingTitleExtractor",
+        "RakeKeywordExtractor",
+    ]
+
+
+def test_pages_a_changed_file_no_longer_has_are_deleted(tmp_path):
+    client = AsyncQdrantClient(location=":memory:")
+    vector_store = QdrantVectorStore(aclient=client, collection_name="test")
+    pipeline = build_pipeline(vector_store, str(tmp_path / "pipeline"))
+
+    def pages(path, texts):
+        return [
+            Document(text=text, id_=f"{path}_part_{i}", metadata={"file_path": path})
+            for i, text in enumerate(texts)
+        ]
+
+    async def ingest(documents):
+        await pipeline.arun(documents=documents)
+        deleted = await MetadataIngestionPipeline.adelete_stale_documents(
+            pipeline, documents
+        )
+        return deleted, (await client.count(collection_name="test")).count
+
+    assert asyncio.run(
+        ingest(pages("deck.pdf", ["one", "two", "three"]) + pages("other.pdf", ["x"]))
+    ) == ([], 4)
+    # The deck lost its last page, the other file isn't in this batch and is left alone
+    assert asyncio.run(ingest(pages("deck.pdf", ["one", "two"]))) == (
+        ["deck.pdf_part_2"],
+        3,
+    )
+    assert not pipeline.docstore.get_document_hash("deck.pdf_part_2")
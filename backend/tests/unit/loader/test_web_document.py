@@ -0,0 +1,146 @@
+# test_web_document.py
+
+import sys
+import os
+import asyncio
+import functools
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+import httpx
+from llama_index.token_counter.mock_embed_model import MockEmbedding
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import AsyncQdrantClient
+
+import src.loader.web_document as web_document
+from src.loader.crawler import AsyncWebCrawler
+from src.loader.freshness_index import get_freshness_index
+from src.loader.http_cache import get_http_cache
+from src.loader.metadata_extraction import MetadataIngestionPipeline
+from src.loader.web_document import WebDocumentLoader
+
+URL = "https://example.com/docs/"
+
+
+class FailingEmbedding(MockEmbedding):
+    async def _aget_text_embeddings(self, texts):
+        raise RuntimeError("embedding deployment unavailable")
+
+
+class FakeQdrantManager:
+    def __init__(self):
+        self.deleted = []
+
+    def check_url_in_collection(self, collection_name, url):
+        return False
+
+    def delete_url_points(self, collection_name, url, keep_ids=None):
+        self.deleted.append((url, keep_ids))
+
+
+def build_loader(tmp_path, client, site):
+    def handler(request):
+        body, etag = site.get(request.url.path, (None, None))
+        if body is None:
+            return httpx.Response(404)
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(
+            200, text=body, headers={"content-type": "text/html", "etag": etag}
+        )
+
+    loader = WebDocumentLoader.__new__(WebDocumentLoader)
+    loader.collection_name = "test"
+    loader.CONFIG = {
+        "Crawler": {"http_cache_db_file": str(tmp_path / "http_cache.db")},
+        "Ingestion": {
+            "web_index_db_file": str(tmp_path / "web_index.db"),
+            "web_refresh_policy": "ttl",
+            "web_refresh_ttl_hours": 24,
+        },
+    }
+    loader.embed_model = MockEmbedding(embed_dim=8)
+    loader.qdrant = FakeQdrantManager()
+    loader.phoenix_tracer = None
+    loader.vector_store = QdrantVectorStore(aclient=client, collection_name="test")
+    loader.pipeline_persist_dir = str(tmp_path / "pipeline")
+    loader.transformation_cache = False
+    loader.max_concurrent_documents = 1
+    loader.insert_batch_size = 5
+    return loader, httpx.MockTransport(handler)
+
+
+def setup_site(tmp_path, monkeypatch, site):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    build_pipeline = MetadataIngestionPipeline.build_pipeline
+    monkeypatch.setattr(
+        MetadataIngestionPipeline,
+        "build_pipeline",
+        staticmethod(functools.partial(build_pipeline, profile="fast")),
+    )
+    # The pipeline only writes through the async client
+    client = AsyncQdrantClient(location=":memory:")
+    loader, transport = build_loader(tmp_path, client, site)
+    monkeypatch.setattr(
+        web_document,
+        "AsyncWebCrawler",
+        functools.partial(
+            AsyncWebCrawler, client=httpx.AsyncClient(transport=transport)
+        ),
+    )
+
+    def points():
+        points, _ = asyncio.run(client.scroll("test", with_payload=True))
+        return points
+
+    return loader, points
+
+
+def test_deferred_pages_are_fetched_again_once_due(tmp_path, monkeypatch):
+    site = {"/docs/": ("<h1>Docs</h1><p>version 1</p>", '"v1"')}
+    loader, points = setup_site(tmp_path, monkeypatch, site)
+
+    def texts():
+        return [point.payload["_node_content"] for point in points()]
+
+    assert loader.load_documents(URL)
+    assert any("version 1" in text for text in texts())
+    assert get_http_cache(str(tmp_path / "http_cache.db")).get(URL).etag == '"v1"'
+
+    # Changed, but ingested less than web_refresh_ttl_hours ago: the new validators must not be cached
+    site["/docs/"] = ("<h1>Docs</h1><p>version 2</p>", '"v2"')
+    assert loader.load_documents(URL)
+    assert any("version 1" in text for text in texts())
+    assert get_http_cache(str(tmp_path / "http_cache.db")).get(URL).etag == '"v1"'
+
+    # Once due the page is downloaded in full instead of being answered 304, and replaced
+    get_freshness_index(str(tmp_path / "web_index.db")).ttl_seconds = 0
+    assert loader.load_documents(URL)
+    assert [text for text in texts() if "version" in text]
+    assert all("version 1" not in text for text in texts())
+    # Older copies of the page are deleted after the new points are in, keeping those
+    assert loader.qdrant.deleted == [(URL, [point.id for point in points()])]
+    assert get_http_cache(str(tmp_path / "http_cache.db")).get(URL).etag == '"v2"'
+
+
+def test_replaced_page_keeps_its_points_when_the_new_load_fails(tmp_path, monkeypatch):
+    site = {"/docs/": ("<h1>Docs</h1><p>version 1</p>", '"v1"')}
+    loader, points = setup_site(tmp_path, monkeypatch, site)
+    assert loader.load_documents(URL)
+    (old_point,) = points()
+
+    get_freshness_index(str(tmp_path / "web_index.db")).ttl_seconds = 0
+    site["/docs/"] = ("<h1>Docs</h1><p>version 2</p>", '"v2"')
+    loader.embed_model = FailingEmbedding(embed_dim=8)
+    assert loader.load_documents(URL)
+
+    assert points() == [old_point]
+    assert loader.qdrant.deleted == []
+    assert get_http_cache(str(tmp_path / "http_cache.db")).get(URL).etag == '"v1"'
+
+    # The next load retries the page
+    loader.embed_model = MockEmbedding(embed_dim=8)
+    assert loader.load_documents(URL)
+    (new_point,) = points()
+    assert "version 2" in new_point.payload["_node_content"]
@@ -0,0 +1,68 @@
+# test_azure_llm_service.py
+
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from src.services.azure_llm_service import (
+    AzureLlmBuilder,
+    LLmType,
+    clear_llm_instances,
+)
+from src.services.llm_clients import get_http_client
+
+
+def test_llms_are_shared_per_type_and_settings(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test-key")
+    clear_llm_instances()
+
+    llm = AzureLlmBuilder().get_llm(LLmType.LLAMA_AZURE_OPENAI_GPT4)
+
+    assert AzureLlmBuilder().get_llm(LLmType.LLAMA_AZURE_OPENAI_GPT4) is llm
+    assert AzureLlmBuilder().get_llm(LLmType.LLAMA_AZURE_OPENAI_GPT4_32K) is not llm
+    assert (
+        AzureLlmBuilder().get_llm(LLmType.LLAMA_AZURE_OPENAI_GPT4, max_tokens=64)
+        is not llm
+    )
+    assert (
+        AzureLlmBuilder().get_llm(LLmType.LLAMA_AZURE_OPENAI_GPT4, shared=False)
+        is not llm
+    )
+    clear_llm_instances()
+    assert AzureLlmBuilder().get_llm(LLmType.LLAMA_AZURE_OPENAI_GPT4) is not llm
+
+
+def test_llm_reuses_http_clients(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test-key")
+    llm = AzureLlmBuilder().get_llm(LLmType.LLAMA_AZURE_OPENAI_GPT4, shared=False)
+
+    assert llm._get_client() is llm._get_client()
+    assert llm._get_client()._client is get_http_client()
+
+    async def aclients():
+        return llm._get_aclient(), llm._get_aclient()
+
+    first, second = asyncio.run(aclients())
+    assert first is second
+    # Connections of a closed event loop can't be reused by the next one
+    third, _ = asyncio.run(aclients())
+    assert third is not first
+
+
+def test_langchain_llms_share_the_http_client(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test-key")
+
+    for llm_type in (
+        LLmType.AZURE_OPENAI_GPT_35_TURBO,
+        LLmType.AZURE_OPENAI_GPT4,
+        LLmType.AZURE_OPENAI_GPT4_32K,
+    ):
+        llm = AzureLlmBuilder().get_llm(llm_type, shared=False)
+        assert llm.client._client._client is get_http_client()
+        # Still the same endpoint of the model's deployment
+        assert llm.client._client.base_url == llm.async_client._client.base_url
+        # Chat models keep the chat completions endpoint
+        assert type(llm.client).__module__ == type(llm.async_client).__module__
@@ -0,0 +1,33 @@
+# test_embedding_cache.py
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from src.services.embedding_cache import EmbeddingCache
+
+
+def test_cache_is_keyed_by_deployment_and_normalized_text(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+    cache.put_many("ada", ["hello  world"], [[0.5, 0.25]])
+
+    assert cache.get_many("ada", ["hello world\n", "other"]) == [[0.5, 0.25], None]
+    assert cache.get_many("other-deployment", ["hello world"]) == [None]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_entries=2)
+    cache.put_many("ada", ["a"], [[1.0]])
+    cache.put_many("ada", ["b"], [[2.0]])
+    cache.get_many("ada", ["a"])
+    cache.put_many("ada", ["c"], [[3.0]])
+
+    assert cache.get_many("ada", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+    assert cache.stats()["entries"] == 2
+    cache.close()
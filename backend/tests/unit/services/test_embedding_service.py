@@ -0,0 +1,99 @@
+# test_embedding_service.py
+
+import httpx
+import openai
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from src.services.embedding_service import BatchedAzureEmbedding
+from src.services.embedding_cache import EmbeddingCache
+from src.services.llm_clients import LoopLocalClients
+
+
+class FakeEmbeddings:
+    def __init__(self, rate_limited_calls=0):
+        self.batches = []
+        self.rate_limited_calls = rate_limited_calls
+
+    def _response(self, input, model):
+        if self.rate_limited_calls:
+            self.rate_limited_calls -= 1
+            request = httpx.Request("POST", "https://example.com")
+            raise openai.RateLimitError(
+                "rate limited",
+                response=httpx.Response(
+                    429, headers={"retry-after": "0"}, request=request
+                ),
+                body=None,
+            )
+        self.batches.append(list(input))
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(text))])
+            for i, text in enumerate(input)
+        ]
+        # Responses aren't guaranteed to be in input order
+        return SimpleNamespace(data=list(reversed(data)))
+
+    def create(self, input, model):
+        return self._response(input, model)
+
+
+class FakeAsyncEmbeddings(FakeEmbeddings):
+    async def create(self, input, model):
+        return self._response(input, model)
+
+
+def build_embedding(**kwargs):
+    return BatchedAzureEmbedding(
+        azure_endpoint="https://example.com",
+        api_key="test",
+        api_version="2023-07-01-preview",
+        deployment_name="text-embedding-ada-002",
+        **kwargs,
+    )
+
+
+def test_batches_are_bounded_by_size_and_tokens():
+    embedding = build_embedding(
+        initial_batch_size=3, max_batch_size=3, max_batch_tokens=4
+    )
+    fake = FakeEmbeddings()
+    embedding._client = SimpleNamespace(embeddings=fake)
+    texts = ["one", "two", "three", "four", "five", "six", "seven"]
+
+    embeddings = embedding.get_text_embedding_batch(texts)
+
+    assert embeddings == [[float(len(text))] for text in texts]
+    assert all(len(batch) <= 3 for batch in fake.batches)
+    assert sorted(text for batch in fake.batches for text in batch) == sorted(texts)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_shrinks_batch_size_and_retries():
+    embedding = build_embedding(initial_batch_size=8, max_concurrent_requests=1)
+    fake = FakeAsyncEmbeddings(rate_limited_calls=1)
+    embedding._aclients = LoopLocalClients(lambda: SimpleNamespace(embeddings=fake))
+
+    embeddings = await embedding.aget_text_embedding_batch(["a", "bb", "ccc"])
+
+    assert embeddings == [[1.0], [2.0], [3.0]]
+    assert fake.batches == [["a", "bb", "ccc"]]
+    # Halved by the 429, then grown by one successful request
+    assert embedding.batch_size == 5
+
+
+def test_cached_texts_are_not_sent_again(tmp_path):
+    embedding = build_embedding(cache=EmbeddingCache(str(tmp_path / "embeddings.db")))
+    fake = FakeEmbeddings()
+    embedding._client = SimpleNamespace(embeddings=fake)
+
+    embedding.get_text_embedding_batch(["a", "bb"])
+    embeddings = embedding.get_text_embedding_batch(["bb", "ccc"])
+
+    assert embeddings == [[2.0], [3.0]]
+    assert fake.batches == [["a", "bb"], ["ccc"]]
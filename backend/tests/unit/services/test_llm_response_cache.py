@@ -0,0 +1,39 @@
+# test_llm_response_cache.py
+
+import pytest
+import sys
+import os
+from typing import Any
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from llama_index.extractors import KeywordExtractor
+from llama_index.llms import CompletionResponse, MockLLM
+from llama_index.schema import TextNode
+
+from src.services.llm_response_cache import CachedLLMPredictor, LLMResponseCache
+
+
+class CountingLLM(MockLLM):
+    calls: int = 0
+
+    async def acomplete(self, prompt: str, **kwargs: Any) -> CompletionResponse:
+        self.calls += 1
+        return CompletionResponse(text=f"keywords {self.calls}")
+
+
+@pytest.mark.asyncio
+async def test_unchanged_nodes_make_no_llm_calls(tmp_path):
+    llm = CountingLLM()
+    predictor = CachedLLMPredictor(
+        llm=llm, cache=LLMResponseCache(str(tmp_path / "llm.db"))
+    )
+    extractor = KeywordExtractor(llm=predictor, keywords=3)
+
+    first = await extractor.aextract([TextNode(text="a"), TextNode(text="b")])
+    second = await extractor.aextract([TextNode(text="a"), TextNode(text="c")])
+
+    assert llm.calls == 3
+    assert second[0] == first[0]
+    assert predictor._cache.stats()["hits"] == 1
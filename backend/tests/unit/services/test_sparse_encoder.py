@@ -0,0 +1,94 @@
+# test_sparse_encoder.py
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qdrant_models
+from llama_index.schema import TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from llama_index.vector_stores.types import VectorStoreQuery, VectorStoreQueryMode
+
+from src.services.sparse_encoder import BM25SparseEncoder, TermStatistics, term_id
+from src.tools.hybrid_fusion import reciprocal_rank_fusion
+from src.utils.qdrant import DENSE_VECTOR_NAME, SPARSE_VECTOR_NAME
+
+
+def test_query_terms_are_weighted_by_rarity(tmp_path):
+    encoder = BM25SparseEncoder(TermStatistics(str(tmp_path / "terms.db")))
+    indices, values = encoder.encode_documents(
+        "docs",
+        [
+            "Claim rejected with code CO-45.",
+            "Claim paid in full.",
+            "Claim pending review.",
+        ],
+    )
+    # "with" is a stopword
+    assert len(indices[0]) == len(values[0]) == 4
+
+    (query_indices,), (query_values,) = encoder.encode_queries(
+        "docs", ["Why was the claim rejected with CO-45?"]
+    )
+    weights = dict(zip(query_indices, query_values))
+    assert weights[term_id("co-45")] > weights[term_id("claim")]
+
+    encoder.statistics.reset("docs")
+    assert encoder.statistics.collection_stats("docs") == (0, 0)
+
+
+def test_hybrid_search_finds_exact_codes():
+    client = QdrantClient(":memory:")
+    client.recreate_collection(
+        "docs",
+        vectors_config={
+            DENSE_VECTOR_NAME: qdrant_models.VectorParams(
+                size=2, distance=qdrant_models.Distance.COSINE
+            )
+        },
+        sparse_vectors_config={
+            SPARSE_VECTOR_NAME: qdrant_models.SparseVectorParams(
+                index=qdrant_models.SparseIndexParams()
+            )
+        },
+    )
+    vector_store = QdrantVectorStore(
+        client=client,
+        collection_name="docs",
+        hybrid_fusion_fn=reciprocal_rank_fusion,
+        **BM25SparseEncoder().vector_store_kwargs("docs"),
+    )
+    texts_and_embeddings = [
+        ("Denial code CO-45: charge exceeds the fee schedule.", [0.8, 0.6]),
+        ("Overview of the medical billing process.", [1.0, 0.0]),
+        ("Office opening hours.", [0.0, 1.0]),
+    ]
+    vector_store.add(
+        [
+            TextNode(
+                text=text,
+                id_=f"00000000-0000-0000-0000-00000000000{i}",
+                embedding=embedding,
+            )
+            for i, (text, embedding) in enumerate(texts_and_embeddings)
+        ]
+    )
+
+    # The embedding alone prefers the overview
+    result = vector_store.query(
+        VectorStoreQuery(
+            query_embedding=[1.0, 0.1],
+            query_str="What does CO-45 mean?",
+            similarity_top_k=2,
+            sparse_top_k=2,
+            mode=VectorStoreQueryMode.HYBRID,
+        )
+    )
+
+    assert [node.text for node in result.nodes] == [
+        "Denial code CO-45: charge exceeds the fee schedule.",
+        "Overview of the medical billing process.",
+    ]
@@ -0,0 +1,51 @@
+# test_index_registry.py
+
+import sys
+import os
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from src.tools.index_registry import IndexRegistry
+
+
+def test_registry_builds_each_entry_once_across_threads():
+    registry = IndexRegistry()
+    builds = []
+
+    def factory():
+        builds.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(registry.get("techdocs", "index", factory))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_registry_rebuilds_expired_and_invalidated_entries():
+    registry = IndexRegistry(ttl_seconds=0.05)
+    first = registry.get("techdocs", "index", object)
+    registry.get("other", "index", object)
+
+    assert registry.get("techdocs", "index", object) is first
+    time.sleep(0.1)
+    assert registry.get("techdocs", "index", object) is not first
+
+    second = registry.get("techdocs", "index", object)
+    registry.invalidate("techdocs")
+    assert registry.get("techdocs", "index", object) is not second
+    assert registry.collections() == ["other", "techdocs"]
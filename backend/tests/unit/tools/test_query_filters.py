@@ -0,0 +1,55 @@
+# test_query_filters.py
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from src.tools.query_filters import VECTOR_STORE_INFO, QueryFilterParser
+
+
+def filters(query):
+    parsed = QueryFilterParser(VECTOR_STORE_INFO).parse(query)
+    return {(f.key, f.value) for f in parsed.filters}, parsed.needs_auto_retriever
+
+
+def test_plain_semantic_queries_have_no_filters():
+    assert filters("How do I configure autoscaling for a Kubernetes deployment?") == (
+        set(),
+        False,
+    )
+    # A year alone isn't a filter
+    assert filters("What changed in Python 3.12, released in 2023?") == (set(), False)
+    # Nor is a month name that is just a word
+    assert filters("What happens after a retry may fail?") == (set(), False)
+    assert filters("Which settings may be created before startup?") == (set(), False)
+
+
+def test_urls_file_names_and_dates_are_parsed():
+    assert filters("Summarize https://example.com/docs/setup.html.") == (
+        {("url", "https://example.com/docs/setup.html")},
+        False,
+    )
+    assert filters("What does Q3_report-v2.pdf say about revenue?") == (
+        {("file_name", "Q3_report-v2.pdf")},
+        False,
+    )
+    assert filters("Pages loaded on 2024/1/5 about pricing") == (
+        {("last_accessed_date", "2024-01-05")},
+        False,
+    )
+    # Filters are ANDed, a key with several values would match nothing and is left out
+    assert filters("Compare setup.md with https://example.com/docs/install.md") == (
+        {("file_name", "setup.md"), ("url", "https://example.com/docs/install.md")},
+        False,
+    )
+    assert filters("Compare setup.md and install.md") == (set(), False)
+
+
+def test_filters_the_rules_cant_express_need_the_auto_retriever():
+    assert filters("Documents updated since March 2023 about pricing") == (
+        set(),
+        True,
+    )
+    assert filters("Which file types cover onboarding?") == (set(), True)
@@ -0,0 +1,55 @@
+# test_rerankers.py
+
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+from llama_index.schema import NodeWithScore, QueryBundle, TextNode
+
+from src.tools.rerankers import (
+    BM25Reranker,
+    RerankerType,
+    TopNReranker,
+    build_reranker,
+)
+
+
+def nodes(*texts):
+    # Retrieved in order, with decreasing vector similarity
+    return [
+        NodeWithScore(node=TextNode(text=text, id_=str(i)), score=0.80 - i * 0.01)
+        for i, text in enumerate(texts)
+    ]
+
+
+def test_bm25_promotes_nodes_matching_the_query_terms():
+    retrieved = nodes(
+        "General notes about cloud platforms and their pricing.",
+        "Another overview of managed services.",
+        "Kubernetes autoscaling: the horizontal pod autoscaler scales kubernetes deployments.",
+    )
+
+    reranked = BM25Reranker(top_n=2).postprocess_nodes(
+        retrieved, QueryBundle("How does kubernetes autoscaling work?")
+    )
+
+    assert [node.node.node_id for node in reranked] == ["2", "0"]
+
+
+def test_bm25_keeps_vector_order_without_matching_terms():
+    retrieved = nodes("alpha", "beta", "gamma")
+
+    reranked = BM25Reranker(top_n=3).postprocess_nodes(retrieved, QueryBundle("delta"))
+
+    assert [node.node.node_id for node in reranked] == ["0", "1", "2"]
+
+
+def test_build_reranker():
+    assert isinstance(build_reranker("bm25", top_n=5), BM25Reranker)
+    assert build_reranker(RerankerType.NONE, top_n=1).top_n == 1
+    assert isinstance(build_reranker("none"), TopNReranker)
+    with pytest.raises(ValueError):
+        build_reranker("cross_encoder")
@@ -0,0 +1,43 @@
+# test_conversion_cache.py
+
+import os
+
+from src.utils.conversion_cache import ConversionCache
+
+
+def write_file(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+    return str(path)
+
+
+def test_conversion_cache_put_and_get(tmp_path):
+    cache = ConversionCache(cache_dir=str(tmp_path / "cache"))
+    pdf_path = write_file(tmp_path / "deck.pdf", "converted deck")
+    output_path = str(tmp_path / "out" / "deck.pdf")
+
+    assert not cache.get("deck_hash", output_path)
+
+    cache.put("deck_hash", pdf_path)
+
+    assert cache.get("deck_hash", output_path)
+    with open(output_path) as f:
+        assert f.read() == "converted deck"
+
+
+def test_conversion_cache_evicts_least_recently_used(tmp_path):
+    cache = ConversionCache(cache_dir=str(tmp_path / "cache"), max_size_bytes=20)
+    output_path = str(tmp_path / "out.pdf")
+
+    cache.put("old", write_file(tmp_path / "old.pdf", "0123456789"))
+    cache.put("used", write_file(tmp_path / "used.pdf", "0123456789"))
+    # Make "old" the oldest entry, then use "used" so it is the most recent
+    os.utime(cache._entry_path("old"), ns=(0, 0))
+    os.utime(cache._entry_path("used"), ns=(1, 1))
+    assert cache.get("used", output_path)
+
+    cache.put("new", write_file(tmp_path / "new.pdf", "0123456789"))
+
+    assert not cache.get("old", output_path)
+    assert cache.get("used", output_path)
+    assert cache.get("new", output_path)
@@ -0,0 +1,209 @@
+# test_covert_pptx_to_pdf.py
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from src.utils.conversion_cache import ConversionCache
+from src.utils.covert_pptx_to_pdf import PPTXConversionPool, PPTXToPDFConverter
+
+# Stands in for LibreOffice: converts each source to "<stem>.pdf" in --outdir unless its content says otherwise,
+# "broken" never converts, "flaky" fails the first time and "hang" never returns
+FAKE_LIBREOFFICE = """#!{python}
+import json, os, sys, time
+
+args = sys.argv[1:]
+profile = next(a for a in args if a.startswith("-env:UserInstallation=file://"))
+profile = profile[len("-env:UserInstallation=file://"):]
+outdir = args[args.index("--outdir") + 1]
+sources = [a for a in args if a.endswith(".pptx")]
+
+
+def log(event):
+    with open(os.environ["FAKE_LIBREOFFICE_LOG"], "a") as f:
+        f.write(json.dumps(dict(event, pid=os.getpid(), profile=profile, sources=sources, at=time.time())) + "\\n")
+
+
+os.makedirs(profile, exist_ok=True)
+os.makedirs(outdir, exist_ok=True)
+log({{"event": "start"}})
+for source in sources:
+    with open(source) as f:
+        content = f.read()
+    if content == "hang":
+        time.sleep(60)
+    if content == "broken":
+        continue
+    if content == "flaky" and not os.path.exists(source + ".seen"):
+        open(source + ".seen", "w").close()
+        continue
+    time.sleep(0.2)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    with open(os.path.join(outdir, stem + ".pdf"), "w") as f:
+        f.write("%PDF " + content)
+log({{"event": "end"}})
+"""
+
+
+@pytest.fixture
+def libreoffice_log(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "libreoffice"
+    script.write_text(FAKE_LIBREOFFICE.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    log_path = tmp_path / "libreoffice.log"
+    monkeypatch.setenv("FAKE_LIBREOFFICE_LOG", str(log_path))
+
+    def read():
+        if not log_path.exists():
+            return []
+        return [json.loads(line) for line in log_path.read_text().splitlines()]
+
+    return read
+
+
+def write_decks(directory, contents):
+    directory.mkdir(exist_ok=True)
+    conversions = []
+    for name, content in contents.items():
+        source = directory / f"{name}.pptx"
+        source.write_text(content)
+        conversions.append((str(source), str(directory / f"{name}.pdf")))
+    return conversions
+
+
+def max_running(events):
+    running = peak = 0
+    for event in sorted(events, key=lambda event: event["at"]):
+        running += 1 if event["event"] == "start" else -1
+        peak = max(peak, running)
+    return peak
+
+
+def test_pool_bounds_libreoffice_processes_and_keeps_result_order(
+    tmp_path, libreoffice_log
+):
+    conversions = write_decks(
+        tmp_path / "decks", {f"deck{i}": f"slides {i}" for i in range(5)}
+    )
+    pool = PPTXConversionPool(max_workers=2, batch_size=1, timeout=10)
+
+    results = asyncio.run(pool.convert_all(conversions))
+
+    output_dir = tmp_path / "decks" / "converted_from_pptx"
+    assert results == [(True, str(output_dir / f"deck{i}.pdf")) for i in range(5)]
+    events = libreoffice_log()
+    # Five batches queued for two workers
+    assert len([event for event in events if event["event"] == "start"]) == 5
+    assert max_running(events) == 2
+
+
+def test_each_worker_reuses_its_own_profile(tmp_path, libreoffice_log):
+    conversions = write_decks(
+        tmp_path / "decks", {f"deck{i}": f"slides {i}" for i in range(4)}
+    )
+    pool = PPTXConversionPool(max_workers=2, batch_size=1, timeout=10)
+
+    asyncio.run(pool.convert_all(conversions))
+
+    events = libreoffice_log()
+    profiles = {event["profile"] for event in events}
+    assert len(profiles) == 2
+    # A profile is never used by two LibreOffice processes at once
+    for profile in profiles:
+        assert max_running([e for e in events if e["profile"] == profile]) == 1
+    assert not any(os.path.exists(profile) for profile in profiles)
+
+
+def test_hung_conversion_is_killed_at_the_timeout(tmp_path, libreoffice_log):
+    conversions = write_decks(tmp_path / "decks", {"hung": "hang"})
+    pool = PPTXConversionPool(max_workers=1, max_retries=1, timeout=1)
+
+    results = asyncio.run(pool.convert_all(conversions))
+
+    assert results == [
+        (False, str(tmp_path / "decks" / "converted_from_pptx" / "hung.pdf"))
+    ]
+    (started,) = libreoffice_log()
+    with pytest.raises(ProcessLookupError):
+        os.kill(started["pid"], 0)
+
+
+def test_convert_batch_maps_outputs_to_sources_by_stem(tmp_path, libreoffice_log):
+    # Output file names don't have to match their source, LibreOffice names outputs after the source
+    conversions = [
+        (source, os.path.join(os.path.dirname(output), "renamed.pdf"))
+        for source, output in write_decks(
+            tmp_path / "decks", {"intro": "a", "roadmap": "b"}
+        )
+    ]
+
+    results = asyncio.run(PPTXToPDFConverter(timeout=10).convert_batch(conversions))
+
+    output_dir = tmp_path / "decks" / "converted_from_pptx"
+    assert results == [
+        (True, str(output_dir / "intro.pdf")),
+        (True, str(output_dir / "roadmap.pdf")),
+    ]
+    assert (output_dir / "roadmap.pdf").read_text() == "%PDF b"
+    (started,) = [e for e in libreoffice_log() if e["event"] == "start"]
+    assert len(started["sources"]) == 2
+
+
+def test_convert_batch_retries_only_pending_files(tmp_path, libreoffice_log):
+    conversions = write_decks(
+        tmp_path / "decks", {"good": "a", "flaky": "flaky", "broken": "broken"}
+    )
+
+    results = asyncio.run(
+        PPTXToPDFConverter(max_retries=3, timeout=10).convert_batch(conversions)
+    )
+
+    assert [success for success, _ in results] == [True, True, False]
+    started = [e for e in libreoffice_log() if e["event"] == "start"]
+    assert [len(e["sources"]) for e in started] == [3, 2, 1]
+    assert all("good.pptx" not in " ".join(e["sources"]) for e in started[1:])
+
+
+def test_file_that_hangs_a_batch_is_retried_on_its_own(tmp_path, libreoffice_log):
+    conversions = write_decks(
+        tmp_path / "decks", {"first": "a", "hung": "hang", "last": "c"}
+    )
+
+    results = asyncio.run(
+        PPTXToPDFConverter(max_retries=2, timeout=1).convert_batch(conversions)
+    )
+
+    assert [success for success, _ in results] == [True, False, True]
+    started = [e for e in libreoffice_log() if e["event"] == "start"]
+    # The batch timed out on the hung deck, the files it didn't convert were then retried one at a time
+    assert [[os.path.basename(s) for s in e["sources"]] for e in started] == [
+        ["first.pptx", "hung.pptx", "last.pptx"],
+        ["hung.pptx"],
+        ["hung.pptx"],
+        ["last.pptx"],
+    ]
+
+
+def test_convert_batch_uses_cached_conversions(tmp_path, libreoffice_log):
+    cache = ConversionCache(cache_dir=str(tmp_path / "cache"))
+    (conversion,) = write_decks(tmp_path / "decks", {"deck": "slides"})
+    converter = PPTXToPDFConverter(timeout=10, cache=cache)
+
+    assert asyncio.run(
+        converter.convert_batch([conversion], source_hashes={conversion[0]: "hash"})
+    ) == [(True, str(tmp_path / "decks" / "converted_from_pptx" / "deck.pdf"))]
+    assert asyncio.run(
+        converter.convert_batch([conversion], source_hashes={conversion[0]: "hash"})
+    )[0][0]
+
+    # The second batch was served from the cache without starting LibreOffice
+    assert len([e for e in libreoffice_log() if e["event"] == "start"]) == 1
+    assert (
+        tmp_path / "decks" / "converted_from_pptx" / "deck.pdf"
+    ).read_text() == "%PDF slides"